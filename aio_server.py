@@ -0,0 +1,377 @@
+import asyncio
+import queue
+import threading
+from concurrent import futures
+
+import grpc
+import card_game_pb2 as pb
+import card_game_pb2_grpc as stub
+from channel_pool import SERVER_OPTIONS
+from routing import MATCHMAKING_GROUP
+from server import (
+    CardGameService,
+    HEARTBEAT_INTERVAL,
+    HEARTBEAT_TIMEOUT,
+    MATCH_RECHECK_SECONDS,
+    REPLICATION_TIMEOUT,
+    STALE_REPLICA_MESSAGE,
+    STATE_TICK_SECONDS,
+)
+
+# Threads for the calls that still block: SQLite, bcrypt, fsync waits, forwarding.
+BLOCKING_WORKERS = 16
+
+# RPCs answered straight from memory on the event loop.
+INLINE_RPCS = (
+    "WhoIsLeader", "AcceptMatch", "RequestVote", "UpdateReplicaList", "GetRoutingTable",
+    "ReadIndex", "GetMatchmakingStats",
+)
+# RPCs that touch SQLite, call another node or wait on a session lock, so they run on the blocking pool.
+BLOCKING_RPCS = (
+    "Login", "Logout", "DeleteAccount", "StartMatch", "CancelMatch", "GetGameState", "AppendLog",
+    "AnnounceLeader", "SyncAllGames", "RegisterReplica", "SyncDatabase", "CreateGame",
+    "RecordResult", "GetWinRates", "SyncGames",
+)
+
+
+def wrap_future(call):
+    """Await a grpc future (e.g. from `stub.Method.future()`) without tying up a thread."""
+    loop = asyncio.get_running_loop()
+    result = loop.create_future()
+
+    def settle():
+        if result.done():
+            return
+        error = call.exception()
+        if error is not None:
+            result.set_exception(error)
+        else:
+            result.set_result(call.result())
+
+    call.add_done_callback(lambda _: loop.call_soon_threadsafe(settle))
+    return result
+
+
+class AsyncCardGameService(stub.CardGameServiceServicer):
+    """
+    Serves a CardGameService from a grpc.aio event loop. Game state streams,
+    quorum waits and the heartbeat, election and game-sync loops are all
+    awaited on the loop, so thousands of open streams cost no threads and a
+    slow PlayCard cannot hold up Heartbeat. What still blocks runs on a small
+    thread pool.
+    """
+
+    def __init__(self, service: CardGameService, workers=BLOCKING_WORKERS):
+        self.service = service
+        self.pool = futures.ThreadPoolExecutor(max_workers=workers)
+
+    async def blocking(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+
+    async def wait_for_quorum(self, waiter):
+        loop = asyncio.get_running_loop()
+        decided = loop.create_future()
+
+        def resolve(replicated):
+            if not decided.done():
+                decided.set_result(replicated)
+
+        waiter.add_done_callback(lambda replicated: loop.call_soon_threadsafe(resolve, replicated))
+        try:
+            return await asyncio.wait_for(decided, REPLICATION_TIMEOUT)
+        except asyncio.TimeoutError:
+            return False
+
+    async def replicate_and_apply(self, command):
+        # shielded: once propose hands out an index, that entry must be decided even
+        # if the caller cancels, or every later entry waits behind it in `decided`
+        return await asyncio.shield(asyncio.ensure_future(self._replicate_and_apply(command)))
+
+    async def _replicate_and_apply(self, command):
+        service = self.service
+        proposal = await self.blocking(service.propose, command)
+        if proposal is None:
+            return False, "Not the leader"
+        index, ticket, waiter = proposal
+
+        # the local fsync and the replicas' acks are awaited side by side
+        synced = asyncio.ensure_future(self.blocking(service.log.sync, ticket))
+        replicated = await self.wait_for_quorum(waiter)
+        await synced
+
+        # entries apply in log order; ours may wait for earlier ones without holding a pool thread
+        loop = asyncio.get_running_loop()
+        applied = loop.create_future()
+
+        def done(result):
+            loop.call_soon_threadsafe(lambda: applied.done() or applied.set_result(result))
+
+        await self.blocking(service.decide, index, command, replicated, done)
+        result = await applied
+        if not replicated:
+            # the abort must be on disk before we report the failure
+            await self.blocking(service.log.sync)
+        await self.blocking(service.compact_log)
+        return result
+
+    async def _replicated_action(self, rpc_name, command, request, context):
+        if not self.service.is_leader:
+            return await self.blocking(getattr(self.service, rpc_name), request, context)
+        success, msg = await self.replicate_and_apply(command)
+        return pb.Response(status="success" if success else "error", message=msg)
+
+    async def PlayCard(self, request, context):
+        return await self._replicated_action("PlayCard", pb.Command(play_card=request), request, context)
+
+    async def PassTurn(self, request, context):
+        return await self._replicated_action("PassTurn", pb.Command(pass_turn=request), request, context)
+
+    async def QuitGame(self, request, context):
+        return await self._replicated_action("QuitGame", pb.Command(quit_game=request), request, context)
+
+    async def Heartbeat(self, request, context):
+        if request.HasField("commit"):
+            # a replica applies the entries the leader's commit covers, which writes to SQLite
+            return await self.blocking(self.service.Heartbeat, request, context)
+        return self.service.Heartbeat(request, context)
+
+    async def SubscribeGameState(self, request, context):
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+
+        def wake():
+            loop.call_soon_threadsafe(changed.set)
+
+        session = None
+        try:
+            while True:
+                if not self.service.is_leader and not await self.blocking(
+                        self.service.can_serve_read, request.max_staleness_seconds):
+                    yield pb.GameStateResponse(status="error", message=STALE_REPLICA_MESSAGE)
+                    return
+                current = self.service.active_games.get(request.game_id)
+                if not current:
+                    yield pb.GameStateResponse(status="error", message="Invalid game ID")
+                    return
+                if current is not session:
+                    if session:
+                        session.remove_listener(wake)
+                    session = current
+                    session.add_listener(wake)
+
+                changed.clear()
+                state = self.service._build_game_state(session, request.username)
+                yield state
+                if state.game_over:
+                    return
+                try:
+                    await asyncio.wait_for(changed.wait(), STATE_TICK_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if session:
+                session.remove_listener(wake)
+
+    async def WaitForMatch(self, request, context):
+        service = self.service
+        if not service.is_leader:
+            yield pb.MatchUpdate(status="error", message="Only leader can start matches")
+            return
+        if service.group != MATCHMAKING_GROUP:
+            async for update in self.relay_wait_for_match(request, context):
+                yield update
+            return
+        if not service.match_queue.accepts(request.num_players):
+            yield pb.MatchUpdate(status="error", message="Invalid player count")
+            return
+
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+
+        def wake():
+            loop.call_soon_threadsafe(changed.set)
+
+        service.add_match_listener(wake)
+        last_message = None
+        try:
+            while True:
+                changed.clear()
+                status, message, game_id = await self.blocking(service.join_match, request.username, request.num_players)
+                if status == "success":
+                    yield pb.MatchUpdate(status=status, message=message, game_id=game_id)
+                    return
+                if status == "error":
+                    # the table was requeued; the stream keeps waiting for the next try
+                    status, message = "waiting", "Failed to start game. Retrying..."
+                if message != last_message:
+                    yield pb.MatchUpdate(status=status, message=message)
+                    last_message = message
+                try:
+                    await asyncio.wait_for(changed.wait(), MATCH_RECHECK_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            service.remove_match_listener(wake)
+            service.leave_match(request.username)
+
+    async def relay_wait_for_match(self, request, context):
+        """The event-loop counterpart of CardGameService.relay_wait_for_match."""
+        service = self.service
+        leader = await self.blocking(service.group_leader, MATCHMAKING_GROUP)
+        if not leader:
+            yield pb.MatchUpdate(status="error", message="Leader unavailable")
+            return
+        # an aio channel, so the relayed stream waits on the loop rather than a pool thread
+        async with grpc.aio.insecure_channel(leader) as channel:
+            try:
+                async for update in stub.CardGameServiceStub(channel).WaitForMatch(request):
+                    yield update
+            except grpc.RpcError as e:
+                if e.code() == grpc.StatusCode.RESOURCE_EXHAUSTED:
+                    await context.abort(e.code(), e.details())
+                service.routes.pop(MATCHMAKING_GROUP, None)
+                yield pb.MatchUpdate(status="error", message="Leader unavailable")
+
+    async def StreamDatabase(self, request, context):
+        chunks = self.service.StreamDatabase(request, context)
+        # a read left running by a cancelled client must finish before the generator is closed
+        reading = threading.Lock()
+
+        def read():
+            with reading:
+                return next(chunks, None)
+
+        def close():
+            with reading:
+                chunks.close()
+
+        try:
+            while True:
+                chunk = await self.blocking(read)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            # releases the snapshot's temp file and handle now, not at garbage collection
+            await self.blocking(close)
+
+    async def InstallSnapshot(self, request_iterator, context):
+        # the service reads chunks on a pool thread while the loop receives them
+        received = queue.Queue()
+
+        def chunks():
+            while True:
+                chunk = received.get()
+                if chunk is None:
+                    return
+                yield chunk
+
+        result = asyncio.ensure_future(self.blocking(self.service.InstallSnapshot, chunks(), context))
+        try:
+            async for chunk in request_iterator:
+                received.put(chunk)
+        finally:
+            received.put(None)
+        return await result
+
+    async def monitor_heartbeat(self):
+        """The event-loop counterpart of CardGameService.monitor_heartbeat."""
+        service = self.service
+        while True:
+            try:
+                if service.is_leader:
+                    await self.send_heartbeats()
+                else:
+                    await self.check_leader()
+                if service.group_members:
+                    await self.blocking(service.refresh_routes)
+            except Exception as e:
+                print(f"[Monitor] Heartbeat round failed: {e}")
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+    async def send_heartbeats(self):
+        calls = self.service.start_heartbeats()
+        results = await asyncio.gather(*(wrap_future(call) for _, call in calls), return_exceptions=True)
+        alive = [addr for (addr, _), result in zip(calls, results) if not isinstance(result, BaseException)]
+        await self.blocking(self.service.record_heartbeats, [addr for addr, _ in calls], alive)
+
+    async def check_leader(self):
+        service = self.service
+        try:
+            await wrap_future(service.leader_stub.Heartbeat.future(pb.HeartbeatRequest(), timeout=HEARTBEAT_TIMEOUT))
+        except grpc.RpcError:
+            print("[Replica] Leader is down. Needs election handling here.")
+            await self.initiate_election()
+
+        if service.is_leader:
+            return
+        if service.leader_id is None:
+            await self.blocking(service.learn_leader_id)
+        more = True
+        while more:
+            try:
+                res = await wrap_future(service.leader_stub.SyncGames.future(
+                    pb.GameSyncRequest(known_versions=service.game_versions())
+                ))
+            except grpc.RpcError as e:
+                print(f"[Replica] Failed to pull games from leader: {e}")
+                return
+            service.apply_game_sync(res)
+            more = res.status == "success" and res.more
+
+    async def initiate_election(self):
+        service = self.service
+        request, majority = service.start_election()
+        calls = [
+            wrap_future(service.channels.stub(addr).RequestVote.future(request, timeout=HEARTBEAT_TIMEOUT))
+            for addr in list(service.replica_addresses)
+        ]
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        votes = 1 + sum(1 for r in results if not isinstance(r, BaseException) and r.vote_granted)
+        await self.blocking(service.finish_election, votes, majority)
+
+
+def _inline(name):
+    async def handler(self, request, context):
+        return getattr(self.service, name)(request, context)
+    handler.__name__ = name
+    return handler
+
+
+def _blocking(name):
+    async def handler(self, request, context):
+        return await self.blocking(getattr(self.service, name), request, context)
+    handler.__name__ = name
+    return handler
+
+
+for _name in INLINE_RPCS:
+    setattr(AsyncCardGameService, _name, _inline(_name))
+for _name in BLOCKING_RPCS:
+    setattr(AsyncCardGameService, _name, _blocking(_name))
+
+
+async def serve_async(is_leader=False, leader_address=None, replica_addresses=None, port=50051,
+                      group=0, group_members=None, match_tick=0):
+    service = CardGameService(
+        port=port,
+        is_leader=is_leader,
+        leader_address=leader_address,
+        replica_addresses=replica_addresses,
+        monitor=False,
+        group=group,
+        group_members=group_members,
+        match_tick=match_tick
+    )
+    async_service = AsyncCardGameService(service)
+    server = grpc.aio.server(options=SERVER_OPTIONS)
+    stub.add_CardGameServiceServicer_to_server(async_service, server)
+    server.add_insecure_port(f"0.0.0.0:{port}")
+    print(f"Starting {'leader' if is_leader else 'replica'} server on port {port} (asyncio)...")
+    await server.start()
+    monitor = asyncio.create_task(async_service.monitor_heartbeat())
+    try:
+        await server.wait_for_termination()
+    finally:
+        monitor.cancel()
+        await server.stop(0)
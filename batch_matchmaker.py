@@ -0,0 +1,139 @@
+import threading
+import time
+import uuid
+
+import numpy as np
+
+import card_game_pb2 as pb
+from session import GameSession
+
+# Win-rate gap allowed at a table of players who just joined.
+RATING_TOLERANCE = 0.1
+# How much that gap widens per second the longest-waiting player at the table has waited.
+TOLERANCE_PER_SECOND = 0.02
+# Bucket upper bounds: players waiting at a tick, and seconds from joining to being seated.
+QUEUE_DEPTH_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+TIME_TO_MATCH_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120)
+
+
+class Histogram:
+    """Counts per bucket; bucket i holds values <= bounds[i], the last bucket everything above."""
+
+    def __init__(self, bounds):
+        self.bounds = np.asarray(bounds, dtype=float)
+        self.counts = np.zeros(len(bounds) + 1, dtype=np.int64)
+        self.lock = threading.Lock()
+
+    def observe(self, values):
+        buckets = np.searchsorted(self.bounds, np.atleast_1d(values), side="left")
+        with self.lock:
+            np.add.at(self.counts, buckets, 1)
+
+    def to_proto(self):
+        with self.lock:
+            return pb.Histogram(bounds=self.bounds.tolist(), counts=self.counts.tolist())
+
+
+def form_tables(ratings, waits, size, tolerance=RATING_TOLERANCE, widen=TOLERANCE_PER_SECOND):
+    """
+    Group waiting players into tables of `size`, as rows of indices into
+    `ratings` and `waits`. The players who joined last sit out if the count
+    does not divide evenly; the rest are sorted by rating and cut into
+    consecutive tables. A table is kept when its rating spread is within
+    `tolerance`, widened by `widen` per second its longest-waiting player has
+    waited, so everyone is seated eventually.
+    """
+    spare = len(ratings) % size
+    candidates = np.argsort(waits, kind="stable")[spare:]
+    seated = candidates[np.argsort(ratings[candidates], kind="stable")]
+    tables = seated.reshape(-1, size)
+    table_ratings = ratings[tables]
+    spread = table_ratings[:, -1] - table_ratings[:, 0]
+    allowed = tolerance + widen * waits[tables].max(axis=1)
+    return tables[spread <= allowed]
+
+
+class BatchMatchmaker:
+    """
+    Leader: forms games from the match queues every `tick` seconds instead of
+    on the StartMatch path. Players are grouped by win rate, and by how long
+    they have waited, and all tables found in a tick are started together
+    with CardGameService.create_games. Queue depth and time to match are
+    recorded in histograms for GetMatchmakingStats.
+    """
+
+    def __init__(self, service, tick, clock=time.monotonic):
+        self.service = service
+        self.tick_seconds = tick
+        self.clock = clock
+        self.queue_depth = Histogram(QUEUE_DEPTH_BUCKETS)
+        self.time_to_match = Histogram(TIME_TO_MATCH_BUCKETS)
+        self.games_formed = 0
+        self.running = True
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+
+    def _run(self):
+        while self.running:
+            time.sleep(self.tick_seconds)
+            if not self.service.is_leader:
+                continue
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"[Matchmaker] Tick failed: {e}")
+
+    def tick(self):
+        service = self.service
+        queue = service.match_queue
+        with service.match_lock:
+            waiting = {size: queue.entries(size) for size in queue.queues}
+        now = self.clock()
+        self.queue_depth.observe(sum(len(entries) for entries in waiting.values()))
+
+        tables = []  # (size, players, joined_at)
+        for size, entries in waiting.items():
+            if len(entries) < size:
+                continue
+            names = [username for username, _ in entries]
+            joined = np.array([joined for _, joined in entries])
+            service.refresh_win_rates(names)
+            ratings = np.array([service.win_rate(username) for username in names])
+            for row in form_tables(ratings, now - joined, size):
+                tables.append((size, [names[i] for i in row], {names[i]: joined[i] for i in row}))
+        if not tables:
+            return
+
+        with service.match_lock:
+            # players may have left or switched queues since we looked
+            tables = [t for t in tables if all(queue.waiting_for(p) == t[0] for p in t[1])]
+            for _, players, _ in tables:
+                for player in players:
+                    queue.cancel(player)
+                    service.match_results[player] = None
+
+        sessions = [GameSession(str(uuid.uuid4())[:8], players) for _, players, _ in tables]
+        started = service.create_games(sessions)
+
+        with service.match_lock:
+            for (size, players, joined_at), session, ok in zip(tables, sessions, started):
+                service.settle_match(players, size, session.game_id if ok else None, joined_at)
+            listeners = service.match_listeners
+        for callback in listeners:
+            callback()
+
+        seated_at = self.clock()
+        for (_, _, joined_at), ok in zip(tables, started):
+            if ok:
+                self.games_formed += 1
+                self.time_to_match.observe(seated_at - np.array(list(joined_at.values())))
+
+    def stats(self):
+        return pb.MatchmakingStats(
+            status="success",
+            queue_depth=self.queue_depth.to_proto(),
+            time_to_match=self.time_to_match.to_proto(),
+            games_formed=self.games_formed
+        )
@@ -0,0 +1,63 @@
+"""
+GetGameState polls answered per second for one game between moves: building
+the GameStateResponse from a fresh get_game_state() copy on every poll, as
+before, versus the response cached per session version and viewer, where a
+poll only refreshes countdown_seconds.
+
+    python benchmarks/bench_game_state.py [--polls N] [--players N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import card_game_pb2 as pb
+from server import CardGameService
+from session import GameSession
+
+PORT = 60099
+
+
+def rebuild(service, request):
+    session = service.active_games[request.game_id]
+    return service._game_state_response(session.get_game_state(), request.username)
+
+
+def cached(service, request):
+    return service.GetGameState(request, None)
+
+
+def run(name, poll, service, requests, polls):
+    start = time.perf_counter()
+    for i in range(polls):
+        poll(service, requests[i % len(requests)])
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10}{polls / elapsed:>16.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--polls", type=int, default=200000)
+    parser.add_argument("--players", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # the service keeps its database and log in the working directory
+        service = CardGameService(port=PORT, is_leader=True, monitor=False)
+        names = [f"player{i}" for i in range(args.players)]
+        service.active_games["bench"] = GameSession("bench", names)
+        requests = [pb.GameStateRequest(game_id="bench", username=name) for name in names]
+
+        print(f"{'state':<10}{'polls/sec':>16}")
+        run("rebuild", rebuild, service, requests, args.polls)
+        run("cached", cached, service, requests, args.polls)
+
+        service.turn_timer.stop()
+        service.storage.close()
+        service.log.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Durable log appends per second: each writer appends a command and waits for
+it to reach disk. One writer pays a full fsync per entry; with many writers
+the log's group commit folds their entries into shared fsyncs.
+
+    python benchmarks/bench_log_file.py [--entries N] [--writers N ...]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import card_game_pb2 as pb
+from raft_log import RaftLog
+
+COMMAND = pb.Command(play_card=pb.PlayCardRequest(username="alice", game_id="3f9c2a1b", cards=[7, 7, 7, 2]))
+
+
+def run(entries, writers):
+    with tempfile.TemporaryDirectory() as tmp:
+        log = RaftLog(os.path.join(tmp, "bench.log"))
+        lock = threading.Lock()
+        counter = iter(range(entries))
+        per_writer = entries // writers
+
+        def writer():
+            for _ in range(per_writer):
+                with lock:
+                    ticket = log.append(next(counter), COMMAND)
+                log.sync(ticket)
+
+        threads = [threading.Thread(target=writer) for _ in range(writers)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+        fsyncs = log.file.fsyncs
+        log.close()
+
+    total = per_writer * writers
+    print(f"{writers:<10}{total / elapsed:>14.1f}{total / fsyncs:>18.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=2000)
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    print(f"{'writers':<10}{'entries/sec':>14}{'entries/fsync':>18}")
+    for writers in args.writers:
+        run(args.entries, writers)
+
+
+if __name__ == "__main__":
+    main()
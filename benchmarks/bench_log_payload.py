@@ -0,0 +1,63 @@
+"""
+Per-entry cost of encoding and decoding a replicated log command:
+the old str(dict) + eval payload versus the typed Command message.
+
+    python benchmarks/bench_log_payload.py [--iterations N]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import card_game_pb2 as pb
+
+CARDS = [7, 7, 7, 2]
+
+
+def legacy_encode():
+    command = {
+        "type": "play_card",
+        "username": "alice",
+        "game_id": "3f9c2a1b",
+        "cards": CARDS,
+    }
+    return str(command).encode()
+
+
+def legacy_decode(payload):
+    return eval(payload.decode())
+
+
+def typed_encode():
+    command = pb.Command(play_card=pb.PlayCardRequest(
+        username="alice",
+        game_id="3f9c2a1b",
+        cards=CARDS,
+    ))
+    return command.SerializeToString()
+
+
+def typed_decode(payload):
+    return pb.Command.FromString(payload)
+
+
+def report(name, encode, decode, iterations):
+    payload = encode()
+    encode_us = timeit.timeit(encode, number=iterations) / iterations * 1e6
+    decode_us = timeit.timeit(lambda: decode(payload), number=iterations) / iterations * 1e6
+    print(f"{name:<16}{len(payload):>8}{encode_us:>12.2f}{decode_us:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'payload':<16}{'bytes':>8}{'encode us':>12}{'decode us':>12}")
+    report("str + eval", legacy_encode, legacy_decode, args.iterations)
+    report("Command proto", typed_encode, typed_decode, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
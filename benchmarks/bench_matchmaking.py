@@ -0,0 +1,82 @@
+"""
+Matchmaking operations per second as a crowd of waiting users joins, re-polls,
+partly cancels and is then seated four to a table: the old list per table
+size versus MatchQueue. The list is slow enough at 100k users that it runs
+on a smaller crowd by default.
+
+    python benchmarks/bench_matchmaking.py [--users N] [--list-users N] [--polls N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from matchmaking import MatchQueue
+
+TABLE = 4
+
+
+class ListQueue:
+    """The matchmaking queues as StartMatch used to keep them: a plain list per table size."""
+
+    def __init__(self):
+        self.queues = {2: [], 3: [], 4: []}
+
+    def enqueue(self, username, size):
+        if username not in self.queues[size]:
+            self.queues[size].append(username)
+
+    def cancel(self, username):
+        for queue in self.queues.values():
+            if username in queue:
+                queue.remove(username)
+                return True
+        return False
+
+    def take(self, size):
+        queue = self.queues[size]
+        if len(queue) < size:
+            return None
+        players, self.queues[size] = queue[:size], queue[size:]
+        return players
+
+
+def run(name, queue, users, polls):
+    names = [f"user{i}" for i in range(users)]
+    ops = 0
+    start = time.perf_counter()
+    for _ in range(polls):
+        # everyone joins, then keeps re-calling StartMatch while they wait
+        for username in names:
+            queue.enqueue(username, TABLE)
+        ops += users
+    for username in names[::10]:
+        queue.cancel(username)
+        ops += 1
+    seated = 0
+    while True:
+        players = queue.take(TABLE)
+        ops += 1
+        if not players:
+            break
+        seated += len(players)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12}{users:>10}{ops / elapsed:>16.0f}{seated:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--list-users", type=int, default=5000)
+    parser.add_argument("--polls", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'queue':<12}{'users':>10}{'ops/sec':>16}{'seated':>10}")
+    run("list", ListQueue(), args.list_users, args.polls)
+    run("MatchQueue", MatchQueue(), args.list_users, args.polls)
+    run("MatchQueue", MatchQueue(), args.users, args.polls)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Plays classified per second by is_valid_play: the old get_pattern_type, which
+built a Counter for the new play and again for last_played, versus the
+precomputed PATTERNS table with last_played's pattern cached on the session.
+
+    python benchmarks/bench_patterns.py [--plays N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from session import PATTERNS, GameSession, _classify
+
+
+def old_is_valid_play(session, cards, player):
+    """is_valid_play as it was, classifying both plays with a Counter each time."""
+    if not session.last_played or player == session.last_played_player:
+        return _classify(cards)[0] != "invalid"
+    current_type, current_rank = _classify(cards)
+    previous_type, previous_rank = _classify(session.last_played)
+    if current_type == "invalid":
+        return False
+    if current_type == "bomb":
+        return previous_type != "bomb" or current_rank > previous_rank
+    return current_type == previous_type and current_rank > previous_rank
+
+
+def run(name, check, session, plays):
+    start = time.perf_counter()
+    valid = sum(check(session, list(cards), "alice") for cards in plays)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12}{len(plays) / elapsed:>16.0f}{valid:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plays", type=int, default=500000)
+    args = parser.parse_args()
+
+    session = GameSession("bench", ["alice", "bob"])
+    session.last_played = [5, 5]
+    session.last_played_player = "bob"
+    candidates = list(PATTERNS)
+    plays = [random.choice(candidates) for _ in range(args.plays)]
+
+    print(f"{'classifier':<12}{'plays/sec':>16}{'valid':>10}")
+    run("Counter", old_is_valid_play, session, plays)
+    run("PATTERNS", GameSession.is_valid_play, session, plays)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Turns and games per second through the rules engine (play_cards, pass_turn,
+is_valid_play), with thousands of bot-driven GameSessions played at once by
+simulator.Simulator. Run it before and after changing session.py to catch
+regressions.
+
+    python benchmarks/bench_rules.py [--games N] [--players N] [--seconds S] [--bots NAME ...]
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from simulator import BOTS, Simulator
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=5000)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--bots", nargs="*", default=list(BOTS), choices=BOTS)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    print(f"{'bot':<12}{'games':>8}{'turns/sec':>14}{'games/sec':>12}{'rejected':>10}")
+    for bot in args.bots:
+        result = Simulator(args.games, players=args.players, bot=bot, seed=args.seed).run(seconds=args.seconds)
+        print(f"{bot:<12}{args.games:>8}{result['turns_per_sec']:>14.0f}{result['games_per_sec']:>12.0f}"
+              f"{result['rejected']:>10}")
+
+
+if __name__ == "__main__":
+    main()
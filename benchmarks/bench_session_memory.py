@@ -0,0 +1,67 @@
+"""
+Bytes per live game: GameSession laid out as it used to be (a __dict__, a
+dict of hands by username, the winner and last player as usernames, a set of
+quit players, an eager Condition and a listeners list) versus the current
+__slots__ GameSession. Measured with tracemalloc over many live sessions.
+
+    python benchmarks/bench_session_memory.py [--games N] [--players N]
+"""
+import argparse
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from session import GameSession, Hand, get_pattern_type
+
+
+class DictSession:
+    """The state a GameSession kept per game before it used __slots__, dealt the same way."""
+
+    def __init__(self, game_id, players):
+        self.game_id = game_id
+        self.players = players
+        dealt = GameSession(game_id, players).hands
+        self.hands = {p: Hand(hand) for p, hand in zip(players, dealt)}
+        self.current_turn_index = 0
+        self.last_played = []
+        self.last_pattern = get_pattern_type([])
+        self.last_played_player = None
+        self.winner = None
+        self.quit_players = set()
+        self.turn_start_time = time.time()
+        self.version = 0
+        self.lock = threading.RLock()
+        self.changed = threading.Condition(self.lock)
+        self.listeners = []
+
+
+def measure(name, factory, games, players):
+    names = [f"player{i}" for i in range(players)]
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    live = [factory(f"game{i}", list(names)) for i in range(games)]
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    print(f"{name:<14}{games:>10}{used / len(live):>16.0f}")
+    del live
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=20000)
+    parser.add_argument("--players", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'session':<14}{'games':>10}{'bytes/game':>16}")
+    measure("dict", DictSession, args.games, args.players)
+    measure("GameSession", GameSession, args.games, args.players)
+
+
+if __name__ == "__main__":
+    main()
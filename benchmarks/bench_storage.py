@@ -0,0 +1,63 @@
+"""
+Games persisted per second by Storage: the writes of a full game (create,
+seat every player, declare the winner) with a commit per statement on the
+default rollback journal, versus one transaction per game in WAL mode.
+
+    python benchmarks/bench_storage.py [--games N] [--players N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from storage import Storage
+
+
+def persist_game(storage, game_id, players):
+    storage.create_game(game_id)
+    for player in players:
+        storage.add_player_to_game(game_id, player, list(range(1, 11)))
+    storage.declare_winner(game_id, players[0])
+
+
+def persist_game_batched(storage, game_id, players):
+    with storage.transaction():
+        persist_game(storage, game_id, players)
+
+
+def run(name, wal, persist, games, players):
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = Storage(os.path.join(tmp, "bench.db"), wal=wal)
+        names = [f"player{i}" for i in range(players)]
+        for player in names:
+            storage.execute_query(
+                "INSERT INTO users (username, password_hash) VALUES (?, ?)",
+                (player, b"x"),
+                commit=True
+            )
+
+        start = time.perf_counter()
+        for i in range(games):
+            persist(storage, f"game{i}", names)
+        elapsed = time.perf_counter() - start
+        storage.close()
+
+    print(f"{name:<36}{games / elapsed:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=500)
+    parser.add_argument("--players", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{'mode':<36}{'games/sec':>12}")
+    run("commit per statement, rollback jrnl", False, persist_game, args.games, args.players)
+    run("commit per statement, WAL", True, persist_game, args.games, args.players)
+    run("transaction per game, WAL", True, persist_game_batched, args.games, args.players)
+
+
+if __name__ == "__main__":
+    main()
@@ -25,13 +25,15 @@ _sym_db = _symbol_database.Default()
 from google.protobuf import empty_pb2 as google_dot_protobuf_dot_empty__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0f\x63\x61rd_game.proto\x1a\x1bgoogle/protobuf/empty.proto\"2\n\x0cLoginRequest\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x10\n\x08password\x18\x02 \x01(\t\"!\n\rLogoutRequest\x12\x10\n\x08username\x18\x01 \x01(\t\":\n\x14\x44\x65leteAccountRequest\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x10\n\x08password\x18\x02 \x01(\t\"5\n\x0cMatchRequest\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x13\n\x0bnum_players\x18\x02 \x01(\x05\"&\n\x12MatchCancelRequest\x12\x10\n\x08username\x18\x01 \x01(\t\"7\n\x12\x41\x63\x63\x65ptMatchRequest\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x0f\n\x07game_id\x18\x02 \x01(\t\"C\n\x0fPlayCardRequest\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x0f\n\x07game_id\x18\x02 \x01(\t\x12\r\n\x05\x63\x61rds\x18\x03 \x03(\x05\"6\n\x11GameActionRequest\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x0f\n\x07game_id\x18\x02 \x01(\t\"5\n\x10GameStateRequest\x12\x0f\n\x07game_id\x18\x01 \x01(\t\x12\x10\n\x08username\x18\x02 \x01(\t\"\x82\x01\n\nPlayerInfo\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x12\n\ncard_count\x18\x02 \x01(\x05\x12\x10\n\x08win_rate\x18\x03 \x01(\x01\x12\r\n\x05\x63\x61rds\x18\x04 \x03(\x05\x12\x17\n\x0fis_current_turn\x18\x05 \x01(\x08\x12\x14\n\x0cis_connected\x18\x06 \x01(\x08\"\xc1\x01\n\x11GameStateResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x14\n\x0c\x63urrent_turn\x18\x03 \x01(\t\x12\x19\n\x11last_played_cards\x18\x04 \x03(\x05\x12\x1c\n\x07players\x18\x05 \x03(\x0b\x32\x0b.PlayerInfo\x12\x19\n\x11\x63ountdown_seconds\x18\x06 \x01(\x05\x12\x11\n\tgame_over\x18\x07 \x01(\x08\x12\x0e\n\x06winner\x18\x08 \x01(\t\"\x12\n\x10HeartbeatRequest\"1\n\x17\x46ollowerSyncDataRequest\x12\x16\n\x0eleader_address\x18\x01 \x01(\t\"*\n\x0fSyncDataRequest\x12\x17\n\x0freplica_address\x18\x01 \x01(\t\"\"\n\x10SyncDataResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\"?\n\x12LeaderInfoResponse\x12\x16\n\x0eleader_address\x18\x01 \x01(\t\x12\x11\n\tis_leader\x18\x02 \x01(\x08\"+\n\x08Response\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\";\n\x08LogEntry\x12\r\n\x05index\x18\x01 \x01(\x05\x12\x0f\n\x07\x63ommand\x18\x02 \x01(\t\x12\x0f\n\x07payload\x18\x03 \x01(\t\"1\n\x0bVoteRequest\x12\x0c\n\x04term\x18\x01 \x01(\x05\x12\x14\n\x0c\x63\x61ndidate_id\x18\x02 \x01(\t\"2\n\x0cVoteResponse\x12\x0c\n\x04term\x18\x01 \x01(\x05\x12\x14\n\x0cvote_granted\x18\x02 \x01(\x08\"0\n\x12\x43oordinatorMessage\x12\x1a\n\x12new_leader_address\x18\x01 \x01(\t\"/\n\x0cSyncResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\"1\n\x16RegisterReplicaRequest\x12\x17\n\x0freplica_address\x18\x01 \x01(\t\":\n\x18ReplicaListUpdateRequest\x12\x1e\n\x16replica_addresses_json\x18\x01 \x01(\t\"=\n\x14SyncDatabaseResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x15\n\rdatabase_dump\x18\x02 \x01(\x0c\x32\xfe\x07\n\x0f\x43\x61rdGameService\x12!\n\x05Login\x12\r.LoginRequest\x1a\t.Response\x12#\n\x06Logout\x12\x0e.LogoutRequest\x1a\t.Response\x12\x31\n\rDeleteAccount\x12\x15.DeleteAccountRequest\x1a\t.Response\x12&\n\nStartMatch\x12\r.MatchRequest\x1a\t.Response\x12-\n\x0b\x43\x61ncelMatch\x12\x13.MatchCancelRequest\x1a\t.Response\x12-\n\x0b\x41\x63\x63\x65ptMatch\x12\x13.AcceptMatchRequest\x1a\t.Response\x12\'\n\x08PlayCard\x12\x10.PlayCardRequest\x1a\t.Response\x12)\n\x08PassTurn\x12\x12.GameActionRequest\x1a\t.Response\x12)\n\x08QuitGame\x12\x12.GameActionRequest\x1a\t.Response\x12\x35\n\x0cGetGameState\x12\x11.GameStateRequest\x1a\x12.GameStateResponse\x12!\n\tAppendLog\x12\t.LogEntry\x1a\t.Response\x12)\n\tHeartbeat\x12\x11.HeartbeatRequest\x1a\t.Response\x12/\n\x08SyncData\x12\x10.SyncDataRequest\x1a\x11.SyncDataResponse\x12\x33\n\x0c\x46ollowerSync\x12\x18.FollowerSyncDataRequest\x1a\t.Response\x12:\n\x0bWhoIsLeader\x12\x16.google.protobuf.Empty\x1a\x13.LeaderInfoResponse\x12*\n\x0bRequestVote\x12\x0c.VoteRequest\x1a\r.VoteResponse\x12\x30\n\x0e\x41nnounceLeader\x12\x13.CoordinatorMessage\x1a\t.Response\x12\x35\n\x0cSyncAllGames\x12\x16.google.protobuf.Empty\x1a\r.SyncResponse\x12\x35\n\x0fRegisterReplica\x12\x17.RegisterReplicaRequest\x1a\t.Response\x12\x39\n\x11UpdateReplicaList\x12\x19.ReplicaListUpdateRequest\x1a\t.Response\x12=\n\x0cSyncDatabase\x12\x16.google.protobuf.Empty\x1a\x15.SyncDatabaseResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0f\x63\x61rd_game.proto\x1a\x1bgoogle/protobuf/empty.proto\"2\n\x0cLoginRequest\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x10\n\x08password\x18\x02 \x01(\t\"!\n\rLogoutRequest\x12\x10\n\x08username\x18\x01 \x01(\t\":\n\x14\x44\x65leteAccountRequest\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x10\n\x08password\x18\x02 \x01(\t\"5\n\x0cMatchRequest\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x13\n\x0bnum_players\x18\x02 \x01(\x05\"&\n\x12MatchCancelRequest\x12\x10\n\x08username\x18\x01 \x01(\t\"?\n\x0bMatchUpdate\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x0f\n\x07game_id\x18\x03 \x01(\t\"+\n\tHistogram\x12\x0e\n\x06\x62ounds\x18\x01 \x03(\x01\x12\x0e\n\x06\x63ounts\x18\x02 \x03(\x03\"|\n\x10MatchmakingStats\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x1f\n\x0bqueue_depth\x18\x02 \x01(\x0b\x32\n.Histogram\x12!\n\rtime_to_match\x18\x03 \x01(\x0b\x32\n.Histogram\x12\x14\n\x0cgames_formed\x18\x04 \x01(\x03\"7\n\x12\x41\x63\x63\x65ptMatchRequest\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x0f\n\x07game_id\x18\x02 \x01(\t\"C\n\x0fPlayCardRequest\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x0f\n\x07game_id\x18\x02 \x01(\t\x12\r\n\x05\x63\x61rds\x18\x03 \x03(\x05\"6\n\x11GameActionRequest\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x0f\n\x07game_id\x18\x02 \x01(\t\"T\n\x10GameStateRequest\x12\x0f\n\x07game_id\x18\x01 \x01(\t\x12\x10\n\x08username\x18\x02 \x01(\t\x12\x1d\n\x15max_staleness_seconds\x18\x03 \x01(\x01\"\x82\x01\n\nPlayerInfo\x12\x10\n\x08username\x18\x01 \x01(\t\x12\x12\n\ncard_count\x18\x02 \x01(\x05\x12\x10\n\x08win_rate\x18\x03 \x01(\x01\x12\r\n\x05\x63\x61rds\x18\x04 \x03(\x05\x12\x17\n\x0fis_current_turn\x18\x05 \x01(\x08\x12\x14\n\x0cis_connected\x18\x06 \x01(\x08\"\xc1\x01\n\x11GameStateResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\x12\x14\n\x0c\x63urrent_turn\x18\x03 \x01(\t\x12\x19\n\x11last_played_cards\x18\x04 \x03(\x05\x12\x1c\n\x07players\x18\x05 \x03(\x0b\x32\x0b.PlayerInfo\x12\x19\n\x11\x63ountdown_seconds\x18\x06 \x01(\x05\x12\x11\n\tgame_over\x18\x07 \x01(\x08\x12\x0e\n\x06winner\x18\x08 \x01(\t\"Y\n\x10HeartbeatRequest\x12\x16\n\x0eleader_address\x18\x01 \x01(\t\x12\x14\n\x0c\x63ommit_index\x18\x02 \x01(\x03\x12\x17\n\x06\x63ommit\x18\x03 \x01(\x0b\x32\x07.Commit\"R\n\x11ReadIndexResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x14\n\x0c\x63ommit_index\x18\x02 \x01(\x03\x12\x17\n\x06\x63ommit\x18\x03 \x01(\x0b\x32\x07.Commit\"1\n\x17\x46ollowerSyncDataRequest\x12\x16\n\x0eleader_address\x18\x01 \x01(\t\"*\n\x0fSyncDataRequest\x12\x17\n\x0freplica_address\x18\x01 \x01(\t\"\"\n\x10SyncDataResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\"Z\n\x12LeaderInfoResponse\x12\x16\n\x0eleader_address\x18\x01 \x01(\t\x12\x11\n\tis_leader\x18\x02 \x01(\x08\x12\x19\n\x11replica_addresses\x18\x03 \x03(\t\"4\n\x0cRoutingTable\x12\x15\n\rgroup_leaders\x18\x01 \x03(\t\x12\r\n\x05group\x18\x02 \x01(\x05\"+\n\x08Response\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\"@\n\nGameResult\x12\x11\n\tresult_id\x18\x01 \x01(\t\x12\x0f\n\x07winners\x18\x02 \x03(\t\x12\x0e\n\x06losers\x18\x03 \x03(\t\"#\n\x0eWinRateRequest\x12\x11\n\tusernames\x18\x01 \x03(\t\"4\n\x0fWinRateResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x11\n\twin_rates\x18\x02 \x03(\x01\"\xd3\x01\n\x07\x43ommand\x12%\n\tplay_card\x18\x01 \x01(\x0b\x32\x10.PlayCardRequestH\x00\x12\'\n\tpass_turn\x18\x02 \x01(\x0b\x32\x12.GameActionRequestH\x00\x12\'\n\tquit_game\x18\x03 \x01(\x0b\x32\x12.GameActionRequestH\x00\x12#\n\nstart_game\x18\x04 \x01(\x0b\x32\r.GameSnapshotH\x00\x12$\n\rrecord_result\x18\x05 \x01(\x0b\x32\x0b.GameResultH\x00\x42\x04\n\x02op\"w\n\x08LogEntry\x12\r\n\x05index\x18\x01 \x01(\x05\x12\x13\n\x0b\x66irst_entry\x18\x04 \x01(\x08\x12\x19\n\x07\x63ommand\x18\x05 \x01(\x0b\x32\x08.Command\x12\x17\n\x06\x63ommit\x18\x06 \x01(\x0b\x32\x07.CommitJ\x04\x08\x02\x10\x03J\x04\x08\x03\x10\x04R\x07payload\"?\n\x06\x43ommit\x12\r\n\x05index\x18\x01 \x01(\x03\x12\x15\n\raborted_since\x18\x02 \x01(\x03\x12\x0f\n\x07\x61\x62orted\x18\x03 \x03(\x03\"1\n\x0bVoteRequest\x12\x0c\n\x04term\x18\x01 \x01(\x05\x12\x14\n\x0c\x63\x61ndidate_id\x18\x02 \x01(\t\"2\n\x0cVoteResponse\x12\x0c\n\x04term\x18\x01 \x01(\x05\x12\x14\n\x0cvote_granted\x18\x02 \x01(\x08\"0\n\x12\x43oordinatorMessage\x12\x1a\n\x12new_leader_address\x18\x01 \x01(\t\"/\n\x0cSyncResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0f\n\x07message\x18\x02 \x01(\t\"%\n\x04Hand\x12\r\n\x05\x63\x61rds\x18\x01 \x03(\x05\x12\x0e\n\x06\x63ounts\x18\x02 \x01(\x0c\"\xe3\x01\n\x0cGameSnapshot\x12\x0f\n\x07game_id\x18\x01 \x01(\t\x12\x0f\n\x07version\x18\x02 \x01(\x03\x12\x0f\n\x07players\x18\x03 \x03(\t\x12\x14\n\x05hands\x18\x04 \x03(\x0b\x32\x05.Hand\x12\x1a\n\x12\x63urrent_turn_index\x18\x05 \x01(\x05\x12\x13\n\x0blast_played\x18\x06 \x03(\x05\x12\x1a\n\x12last_played_player\x18\x07 \x01(\t\x12\x0e\n\x06winner\x18\x08 \x01(\t\x12\x14\n\x0cquit_players\x18\t \x03(\t\x12\x17\n\x0fturn_start_time\x18\n \x01(\x01\"\x84\x01\n\x0fGameSyncRequest\x12;\n\x0eknown_versions\x18\x01 \x03(\x0b\x32#.GameSyncRequest.KnownVersionsEntry\x1a\x34\n\x12KnownVersionsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\x03:\x02\x38\x01\"h\n\x10GameSyncResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x1c\n\x05games\x18\x02 \x03(\x0b\x32\r.GameSnapshot\x12\x18\n\x10removed_game_ids\x18\x03 \x03(\t\x12\x0c\n\x04more\x18\x04 \x01(\x08\"1\n\x16RegisterReplicaRequest\x12\x17\n\x0freplica_address\x18\x01 \x01(\t\":\n\x18ReplicaListUpdateRequest\x12\x1e\n\x16replica_addresses_json\x18\x01 \x01(\t\"=\n\x14SyncDatabaseResponse\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x15\n\rdatabase_dump\x18\x02 \x01(\x0c\"=\n\rDatabaseChunk\x12\x0e\n\x06status\x18\x01 \x01(\t\x12\x0c\n\x04\x64\x61ta\x18\x02 \x01(\x0c\x12\x0e\n\x06sha256\x18\x03 \x01(\t\"h\n\rSnapshotChunk\x12\x1b\n\x13last_included_index\x18\x01 \x01(\x05\x12\x1c\n\x05games\x18\x02 \x03(\x0b\x32\r.GameSnapshot\x12\x0c\n\x04\x64\x61ta\x18\x03 \x01(\x0c\x12\x0e\n\x06sha256\x18\x04 \x01(\t2\xc1\x0c\n\x0f\x43\x61rdGameService\x12!\n\x05Login\x12\r.LoginRequest\x1a\t.Response\x12#\n\x06Logout\x12\x0e.LogoutRequest\x1a\t.Response\x12\x31\n\rDeleteAccount\x12\x15.DeleteAccountRequest\x1a\t.Response\x12&\n\nStartMatch\x12\r.MatchRequest\x1a\t.Response\x12-\n\x0b\x43\x61ncelMatch\x12\x13.MatchCancelRequest\x1a\t.Response\x12-\n\x0cWaitForMatch\x12\r.MatchRequest\x1a\x0c.MatchUpdate0\x01\x12-\n\x0b\x41\x63\x63\x65ptMatch\x12\x13.AcceptMatchRequest\x1a\t.Response\x12@\n\x13GetMatchmakingStats\x12\x16.google.protobuf.Empty\x1a\x11.MatchmakingStats\x12\'\n\x08PlayCard\x12\x10.PlayCardRequest\x1a\t.Response\x12)\n\x08PassTurn\x12\x12.GameActionRequest\x1a\t.Response\x12)\n\x08QuitGame\x12\x12.GameActionRequest\x1a\t.Response\x12\x35\n\x0cGetGameState\x12\x11.GameStateRequest\x1a\x12.GameStateResponse\x12=\n\x12SubscribeGameState\x12\x11.GameStateRequest\x1a\x12.GameStateResponse0\x01\x12!\n\tAppendLog\x12\t.LogEntry\x1a\t.Response\x12)\n\tHeartbeat\x12\x11.HeartbeatRequest\x1a\t.Response\x12/\n\x08SyncData\x12\x10.SyncDataRequest\x1a\x11.SyncDataResponse\x12\x33\n\x0c\x46ollowerSync\x12\x18.FollowerSyncDataRequest\x1a\t.Response\x12:\n\x0bWhoIsLeader\x12\x16.google.protobuf.Empty\x1a\x13.LeaderInfoResponse\x12*\n\x0bRequestVote\x12\x0c.VoteRequest\x1a\r.VoteResponse\x12\x30\n\x0e\x41nnounceLeader\x12\x13.CoordinatorMessage\x1a\t.Response\x12\x35\n\x0cSyncAllGames\x12\x16.google.protobuf.Empty\x1a\r.SyncResponse\x12\x30\n\tSyncGames\x12\x10.GameSyncRequest\x1a\x11.GameSyncResponse\x12\x35\n\x0fRegisterReplica\x12\x17.RegisterReplicaRequest\x1a\t.Response\x12\x39\n\x11UpdateReplicaList\x12\x19.ReplicaListUpdateRequest\x1a\t.Response\x12=\n\x0cSyncDatabase\x12\x16.google.protobuf.Empty\x1a\x15.SyncDatabaseResponse\x12:\n\x0eStreamDatabase\x12\x16.google.protobuf.Empty\x1a\x0e.DatabaseChunk0\x01\x12.\n\x0fInstallSnapshot\x12\x0e.SnapshotChunk\x1a\t.Response(\x01\x12\x38\n\x0fGetRoutingTable\x12\x16.google.protobuf.Empty\x1a\r.RoutingTable\x12&\n\nCreateGame\x12\r.GameSnapshot\x1a\t.Response\x12&\n\x0cRecordResult\x12\x0b.GameResult\x1a\t.Response\x12\x30\n\x0bGetWinRates\x12\x0f.WinRateRequest\x1a\x10.WinRateResponse\x12\x37\n\tReadIndex\x12\x16.google.protobuf.Empty\x1a\x12.ReadIndexResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'card_game_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
+  _globals['_GAMESYNCREQUEST_KNOWNVERSIONSENTRY']._loaded_options = None
+  _globals['_GAMESYNCREQUEST_KNOWNVERSIONSENTRY']._serialized_options = b'8\001'
   _globals['_LOGINREQUEST']._serialized_start=48
   _globals['_LOGINREQUEST']._serialized_end=98
   _globals['_LOGOUTREQUEST']._serialized_start=100
@@ -42,46 +44,80 @@ if not _descriptor._USE_C_DESCRIPTORS:
   _globals['_MATCHREQUEST']._serialized_end=248
   _globals['_MATCHCANCELREQUEST']._serialized_start=250
   _globals['_MATCHCANCELREQUEST']._serialized_end=288
-  _globals['_ACCEPTMATCHREQUEST']._serialized_start=290
-  _globals['_ACCEPTMATCHREQUEST']._serialized_end=345
-  _globals['_PLAYCARDREQUEST']._serialized_start=347
-  _globals['_PLAYCARDREQUEST']._serialized_end=414
-  _globals['_GAMEACTIONREQUEST']._serialized_start=416
-  _globals['_GAMEACTIONREQUEST']._serialized_end=470
-  _globals['_GAMESTATEREQUEST']._serialized_start=472
-  _globals['_GAMESTATEREQUEST']._serialized_end=525
-  _globals['_PLAYERINFO']._serialized_start=528
-  _globals['_PLAYERINFO']._serialized_end=658
-  _globals['_GAMESTATERESPONSE']._serialized_start=661
-  _globals['_GAMESTATERESPONSE']._serialized_end=854
-  _globals['_HEARTBEATREQUEST']._serialized_start=856
-  _globals['_HEARTBEATREQUEST']._serialized_end=874
-  _globals['_FOLLOWERSYNCDATAREQUEST']._serialized_start=876
-  _globals['_FOLLOWERSYNCDATAREQUEST']._serialized_end=925
-  _globals['_SYNCDATAREQUEST']._serialized_start=927
-  _globals['_SYNCDATAREQUEST']._serialized_end=969
-  _globals['_SYNCDATARESPONSE']._serialized_start=971
-  _globals['_SYNCDATARESPONSE']._serialized_end=1005
-  _globals['_LEADERINFORESPONSE']._serialized_start=1007
-  _globals['_LEADERINFORESPONSE']._serialized_end=1070
-  _globals['_RESPONSE']._serialized_start=1072
-  _globals['_RESPONSE']._serialized_end=1115
-  _globals['_LOGENTRY']._serialized_start=1117
-  _globals['_LOGENTRY']._serialized_end=1176
-  _globals['_VOTEREQUEST']._serialized_start=1178
-  _globals['_VOTEREQUEST']._serialized_end=1227
-  _globals['_VOTERESPONSE']._serialized_start=1229
-  _globals['_VOTERESPONSE']._serialized_end=1279
-  _globals['_COORDINATORMESSAGE']._serialized_start=1281
-  _globals['_COORDINATORMESSAGE']._serialized_end=1329
-  _globals['_SYNCRESPONSE']._serialized_start=1331
-  _globals['_SYNCRESPONSE']._serialized_end=1378
-  _globals['_REGISTERREPLICAREQUEST']._serialized_start=1380
-  _globals['_REGISTERREPLICAREQUEST']._serialized_end=1429
-  _globals['_REPLICALISTUPDATEREQUEST']._serialized_start=1431
-  _globals['_REPLICALISTUPDATEREQUEST']._serialized_end=1489
-  _globals['_SYNCDATABASERESPONSE']._serialized_start=1491
-  _globals['_SYNCDATABASERESPONSE']._serialized_end=1552
-  _globals['_CARDGAMESERVICE']._serialized_start=1555
-  _globals['_CARDGAMESERVICE']._serialized_end=2577
+  _globals['_MATCHUPDATE']._serialized_start=290
+  _globals['_MATCHUPDATE']._serialized_end=353
+  _globals['_HISTOGRAM']._serialized_start=355
+  _globals['_HISTOGRAM']._serialized_end=398
+  _globals['_MATCHMAKINGSTATS']._serialized_start=400
+  _globals['_MATCHMAKINGSTATS']._serialized_end=524
+  _globals['_ACCEPTMATCHREQUEST']._serialized_start=526
+  _globals['_ACCEPTMATCHREQUEST']._serialized_end=581
+  _globals['_PLAYCARDREQUEST']._serialized_start=583
+  _globals['_PLAYCARDREQUEST']._serialized_end=650
+  _globals['_GAMEACTIONREQUEST']._serialized_start=652
+  _globals['_GAMEACTIONREQUEST']._serialized_end=706
+  _globals['_GAMESTATEREQUEST']._serialized_start=708
+  _globals['_GAMESTATEREQUEST']._serialized_end=792
+  _globals['_PLAYERINFO']._serialized_start=795
+  _globals['_PLAYERINFO']._serialized_end=925
+  _globals['_GAMESTATERESPONSE']._serialized_start=928
+  _globals['_GAMESTATERESPONSE']._serialized_end=1121
+  _globals['_HEARTBEATREQUEST']._serialized_start=1123
+  _globals['_HEARTBEATREQUEST']._serialized_end=1212
+  _globals['_READINDEXRESPONSE']._serialized_start=1214
+  _globals['_READINDEXRESPONSE']._serialized_end=1296
+  _globals['_FOLLOWERSYNCDATAREQUEST']._serialized_start=1298
+  _globals['_FOLLOWERSYNCDATAREQUEST']._serialized_end=1347
+  _globals['_SYNCDATAREQUEST']._serialized_start=1349
+  _globals['_SYNCDATAREQUEST']._serialized_end=1391
+  _globals['_SYNCDATARESPONSE']._serialized_start=1393
+  _globals['_SYNCDATARESPONSE']._serialized_end=1427
+  _globals['_LEADERINFORESPONSE']._serialized_start=1429
+  _globals['_LEADERINFORESPONSE']._serialized_end=1519
+  _globals['_ROUTINGTABLE']._serialized_start=1521
+  _globals['_ROUTINGTABLE']._serialized_end=1573
+  _globals['_RESPONSE']._serialized_start=1575
+  _globals['_RESPONSE']._serialized_end=1618
+  _globals['_GAMERESULT']._serialized_start=1620
+  _globals['_GAMERESULT']._serialized_end=1684
+  _globals['_WINRATEREQUEST']._serialized_start=1686
+  _globals['_WINRATEREQUEST']._serialized_end=1721
+  _globals['_WINRATERESPONSE']._serialized_start=1723
+  _globals['_WINRATERESPONSE']._serialized_end=1775
+  _globals['_COMMAND']._serialized_start=1778
+  _globals['_COMMAND']._serialized_end=1989
+  _globals['_LOGENTRY']._serialized_start=1991
+  _globals['_LOGENTRY']._serialized_end=2110
+  _globals['_COMMIT']._serialized_start=2112
+  _globals['_COMMIT']._serialized_end=2175
+  _globals['_VOTEREQUEST']._serialized_start=2177
+  _globals['_VOTEREQUEST']._serialized_end=2226
+  _globals['_VOTERESPONSE']._serialized_start=2228
+  _globals['_VOTERESPONSE']._serialized_end=2278
+  _globals['_COORDINATORMESSAGE']._serialized_start=2280
+  _globals['_COORDINATORMESSAGE']._serialized_end=2328
+  _globals['_SYNCRESPONSE']._serialized_start=2330
+  _globals['_SYNCRESPONSE']._serialized_end=2377
+  _globals['_HAND']._serialized_start=2379
+  _globals['_HAND']._serialized_end=2416
+  _globals['_GAMESNAPSHOT']._serialized_start=2419
+  _globals['_GAMESNAPSHOT']._serialized_end=2646
+  _globals['_GAMESYNCREQUEST']._serialized_start=2649
+  _globals['_GAMESYNCREQUEST']._serialized_end=2781
+  _globals['_GAMESYNCREQUEST_KNOWNVERSIONSENTRY']._serialized_start=2729
+  _globals['_GAMESYNCREQUEST_KNOWNVERSIONSENTRY']._serialized_end=2781
+  _globals['_GAMESYNCRESPONSE']._serialized_start=2783
+  _globals['_GAMESYNCRESPONSE']._serialized_end=2887
+  _globals['_REGISTERREPLICAREQUEST']._serialized_start=2889
+  _globals['_REGISTERREPLICAREQUEST']._serialized_end=2938
+  _globals['_REPLICALISTUPDATEREQUEST']._serialized_start=2940
+  _globals['_REPLICALISTUPDATEREQUEST']._serialized_end=2998
+  _globals['_SYNCDATABASERESPONSE']._serialized_start=3000
+  _globals['_SYNCDATABASERESPONSE']._serialized_end=3061
+  _globals['_DATABASECHUNK']._serialized_start=3063
+  _globals['_DATABASECHUNK']._serialized_end=3124
+  _globals['_SNAPSHOTCHUNK']._serialized_start=3126
+  _globals['_SNAPSHOTCHUNK']._serialized_end=3230
+  _globals['_CARDGAMESERVICE']._serialized_start=3233
+  _globals['_CARDGAMESERVICE']._serialized_end=4834
 # @@protoc_insertion_point(module_scope)
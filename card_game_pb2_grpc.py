@@ -60,11 +60,21 @@ class CardGameServiceStub(object):
                 request_serializer=card__game__pb2.MatchCancelRequest.SerializeToString,
                 response_deserializer=card__game__pb2.Response.FromString,
                 _registered_method=True)
+        self.WaitForMatch = channel.unary_stream(
+                '/CardGameService/WaitForMatch',
+                request_serializer=card__game__pb2.MatchRequest.SerializeToString,
+                response_deserializer=card__game__pb2.MatchUpdate.FromString,
+                _registered_method=True)
         self.AcceptMatch = channel.unary_unary(
                 '/CardGameService/AcceptMatch',
                 request_serializer=card__game__pb2.AcceptMatchRequest.SerializeToString,
                 response_deserializer=card__game__pb2.Response.FromString,
                 _registered_method=True)
+        self.GetMatchmakingStats = channel.unary_unary(
+                '/CardGameService/GetMatchmakingStats',
+                request_serializer=google_dot_protobuf_dot_empty__pb2.Empty.SerializeToString,
+                response_deserializer=card__game__pb2.MatchmakingStats.FromString,
+                _registered_method=True)
         self.PlayCard = channel.unary_unary(
                 '/CardGameService/PlayCard',
                 request_serializer=card__game__pb2.PlayCardRequest.SerializeToString,
@@ -85,6 +95,11 @@ class CardGameServiceStub(object):
                 request_serializer=card__game__pb2.GameStateRequest.SerializeToString,
                 response_deserializer=card__game__pb2.GameStateResponse.FromString,
                 _registered_method=True)
+        self.SubscribeGameState = channel.unary_stream(
+                '/CardGameService/SubscribeGameState',
+                request_serializer=card__game__pb2.GameStateRequest.SerializeToString,
+                response_deserializer=card__game__pb2.GameStateResponse.FromString,
+                _registered_method=True)
         self.AppendLog = channel.unary_unary(
                 '/CardGameService/AppendLog',
                 request_serializer=card__game__pb2.LogEntry.SerializeToString,
@@ -125,6 +140,11 @@ class CardGameServiceStub(object):
                 request_serializer=google_dot_protobuf_dot_empty__pb2.Empty.SerializeToString,
                 response_deserializer=card__game__pb2.SyncResponse.FromString,
                 _registered_method=True)
+        self.SyncGames = channel.unary_unary(
+                '/CardGameService/SyncGames',
+                request_serializer=card__game__pb2.GameSyncRequest.SerializeToString,
+                response_deserializer=card__game__pb2.GameSyncResponse.FromString,
+                _registered_method=True)
         self.RegisterReplica = channel.unary_unary(
                 '/CardGameService/RegisterReplica',
                 request_serializer=card__game__pb2.RegisterReplicaRequest.SerializeToString,
@@ -140,6 +160,41 @@ class CardGameServiceStub(object):
                 request_serializer=google_dot_protobuf_dot_empty__pb2.Empty.SerializeToString,
                 response_deserializer=card__game__pb2.SyncDatabaseResponse.FromString,
                 _registered_method=True)
+        self.StreamDatabase = channel.unary_stream(
+                '/CardGameService/StreamDatabase',
+                request_serializer=google_dot_protobuf_dot_empty__pb2.Empty.SerializeToString,
+                response_deserializer=card__game__pb2.DatabaseChunk.FromString,
+                _registered_method=True)
+        self.InstallSnapshot = channel.stream_unary(
+                '/CardGameService/InstallSnapshot',
+                request_serializer=card__game__pb2.SnapshotChunk.SerializeToString,
+                response_deserializer=card__game__pb2.Response.FromString,
+                _registered_method=True)
+        self.GetRoutingTable = channel.unary_unary(
+                '/CardGameService/GetRoutingTable',
+                request_serializer=google_dot_protobuf_dot_empty__pb2.Empty.SerializeToString,
+                response_deserializer=card__game__pb2.RoutingTable.FromString,
+                _registered_method=True)
+        self.CreateGame = channel.unary_unary(
+                '/CardGameService/CreateGame',
+                request_serializer=card__game__pb2.GameSnapshot.SerializeToString,
+                response_deserializer=card__game__pb2.Response.FromString,
+                _registered_method=True)
+        self.RecordResult = channel.unary_unary(
+                '/CardGameService/RecordResult',
+                request_serializer=card__game__pb2.GameResult.SerializeToString,
+                response_deserializer=card__game__pb2.Response.FromString,
+                _registered_method=True)
+        self.GetWinRates = channel.unary_unary(
+                '/CardGameService/GetWinRates',
+                request_serializer=card__game__pb2.WinRateRequest.SerializeToString,
+                response_deserializer=card__game__pb2.WinRateResponse.FromString,
+                _registered_method=True)
+        self.ReadIndex = channel.unary_unary(
+                '/CardGameService/ReadIndex',
+                request_serializer=google_dot_protobuf_dot_empty__pb2.Empty.SerializeToString,
+                response_deserializer=card__game__pb2.ReadIndexResponse.FromString,
+                _registered_method=True)
 
 
 class CardGameServiceServicer(object):
@@ -176,12 +231,26 @@ class CardGameServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def WaitForMatch(self, request, context):
+        """Queue for a game and hold the stream open until it is ready; closing the stream leaves the queue
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def AcceptMatch(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GetMatchmakingStats(self, request, context):
+        """Operators: queue depth and time to match seen by the batch matchmaker
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def PlayCard(self, request, context):
         """Game Play
         """
@@ -207,6 +276,13 @@ class CardGameServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def SubscribeGameState(self, request, context):
+        """Pushes a GameStateResponse whenever the game changes, plus a countdown tick
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def AppendLog(self, request, context):
         """Sync & Replication
         """
@@ -256,6 +332,13 @@ class CardGameServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def SyncGames(self, request, context):
+        """Returns only the games whose version differs from the follower's copy
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
     def RegisterReplica(self, request, context):
         """Missing associated documentation comment in .proto file."""
         context.set_code(grpc.StatusCode.UNIMPLEMENTED)
@@ -274,6 +357,53 @@ class CardGameServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def StreamDatabase(self, request, context):
+        """Database snapshot in fixed-size chunks; the last one carries the checksum
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def InstallSnapshot(self, request_iterator, context):
+        """Leader -> lagging replica: game snapshot first, then the database in chunks
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetRoutingTable(self, request, context):
+        """Raft groups: the leader of every group, and a new game handed to the group that owns it
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def CreateGame(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def RecordResult(self, request, context):
+        """To the home group of a game's players: count the result, and read win rates back
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetWinRates(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ReadIndex(self, request, context):
+        """Leader -> follower serving a read: how far the leader has committed
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_CardGameServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -302,11 +432,21 @@ def add_CardGameServiceServicer_to_server(servicer, server):
                     request_deserializer=card__game__pb2.MatchCancelRequest.FromString,
                     response_serializer=card__game__pb2.Response.SerializeToString,
             ),
+            'WaitForMatch': grpc.unary_stream_rpc_method_handler(
+                    servicer.WaitForMatch,
+                    request_deserializer=card__game__pb2.MatchRequest.FromString,
+                    response_serializer=card__game__pb2.MatchUpdate.SerializeToString,
+            ),
             'AcceptMatch': grpc.unary_unary_rpc_method_handler(
                     servicer.AcceptMatch,
                     request_deserializer=card__game__pb2.AcceptMatchRequest.FromString,
                     response_serializer=card__game__pb2.Response.SerializeToString,
             ),
+            'GetMatchmakingStats': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetMatchmakingStats,
+                    request_deserializer=google_dot_protobuf_dot_empty__pb2.Empty.FromString,
+                    response_serializer=card__game__pb2.MatchmakingStats.SerializeToString,
+            ),
             'PlayCard': grpc.unary_unary_rpc_method_handler(
                     servicer.PlayCard,
                     request_deserializer=card__game__pb2.PlayCardRequest.FromString,
@@ -327,6 +467,11 @@ def add_CardGameServiceServicer_to_server(servicer, server):
                     request_deserializer=card__game__pb2.GameStateRequest.FromString,
                     response_serializer=card__game__pb2.GameStateResponse.SerializeToString,
             ),
+            'SubscribeGameState': grpc.unary_stream_rpc_method_handler(
+                    servicer.SubscribeGameState,
+                    request_deserializer=card__game__pb2.GameStateRequest.FromString,
+                    response_serializer=card__game__pb2.GameStateResponse.SerializeToString,
+            ),
             'AppendLog': grpc.unary_unary_rpc_method_handler(
                     servicer.AppendLog,
                     request_deserializer=card__game__pb2.LogEntry.FromString,
@@ -367,6 +512,11 @@ def add_CardGameServiceServicer_to_server(servicer, server):
                     request_deserializer=google_dot_protobuf_dot_empty__pb2.Empty.FromString,
                     response_serializer=card__game__pb2.SyncResponse.SerializeToString,
             ),
+            'SyncGames': grpc.unary_unary_rpc_method_handler(
+                    servicer.SyncGames,
+                    request_deserializer=card__game__pb2.GameSyncRequest.FromString,
+                    response_serializer=card__game__pb2.GameSyncResponse.SerializeToString,
+            ),
             'RegisterReplica': grpc.unary_unary_rpc_method_handler(
                     servicer.RegisterReplica,
                     request_deserializer=card__game__pb2.RegisterReplicaRequest.FromString,
@@ -382,6 +532,41 @@ def add_CardGameServiceServicer_to_server(servicer, server):
                     request_deserializer=google_dot_protobuf_dot_empty__pb2.Empty.FromString,
                     response_serializer=card__game__pb2.SyncDatabaseResponse.SerializeToString,
             ),
+            'StreamDatabase': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamDatabase,
+                    request_deserializer=google_dot_protobuf_dot_empty__pb2.Empty.FromString,
+                    response_serializer=card__game__pb2.DatabaseChunk.SerializeToString,
+            ),
+            'InstallSnapshot': grpc.stream_unary_rpc_method_handler(
+                    servicer.InstallSnapshot,
+                    request_deserializer=card__game__pb2.SnapshotChunk.FromString,
+                    response_serializer=card__game__pb2.Response.SerializeToString,
+            ),
+            'GetRoutingTable': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetRoutingTable,
+                    request_deserializer=google_dot_protobuf_dot_empty__pb2.Empty.FromString,
+                    response_serializer=card__game__pb2.RoutingTable.SerializeToString,
+            ),
+            'CreateGame': grpc.unary_unary_rpc_method_handler(
+                    servicer.CreateGame,
+                    request_deserializer=card__game__pb2.GameSnapshot.FromString,
+                    response_serializer=card__game__pb2.Response.SerializeToString,
+            ),
+            'RecordResult': grpc.unary_unary_rpc_method_handler(
+                    servicer.RecordResult,
+                    request_deserializer=card__game__pb2.GameResult.FromString,
+                    response_serializer=card__game__pb2.Response.SerializeToString,
+            ),
+            'GetWinRates': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetWinRates,
+                    request_deserializer=card__game__pb2.WinRateRequest.FromString,
+                    response_serializer=card__game__pb2.WinRateResponse.SerializeToString,
+            ),
+            'ReadIndex': grpc.unary_unary_rpc_method_handler(
+                    servicer.ReadIndex,
+                    request_deserializer=google_dot_protobuf_dot_empty__pb2.Empty.FromString,
+                    response_serializer=card__game__pb2.ReadIndexResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'CardGameService', rpc_method_handlers)
@@ -528,6 +713,33 @@ class CardGameService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def WaitForMatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/CardGameService/WaitForMatch',
+            card__game__pb2.MatchRequest.SerializeToString,
+            card__game__pb2.MatchUpdate.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def AcceptMatch(request,
             target,
@@ -555,6 +767,33 @@ class CardGameService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def GetMatchmakingStats(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/CardGameService/GetMatchmakingStats',
+            google_dot_protobuf_dot_empty__pb2.Empty.SerializeToString,
+            card__game__pb2.MatchmakingStats.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def PlayCard(request,
             target,
@@ -663,6 +902,33 @@ class CardGameService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def SubscribeGameState(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/CardGameService/SubscribeGameState',
+            card__game__pb2.GameStateRequest.SerializeToString,
+            card__game__pb2.GameStateResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def AppendLog(request,
             target,
@@ -879,6 +1145,33 @@ class CardGameService(object):
             metadata,
             _registered_method=True)
 
+    @staticmethod
+    def SyncGames(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/CardGameService/SyncGames',
+            card__game__pb2.GameSyncRequest.SerializeToString,
+            card__game__pb2.GameSyncResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
     @staticmethod
     def RegisterReplica(request,
             target,
@@ -959,3 +1252,192 @@ class CardGameService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def StreamDatabase(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(
+            request,
+            target,
+            '/CardGameService/StreamDatabase',
+            google_dot_protobuf_dot_empty__pb2.Empty.SerializeToString,
+            card__game__pb2.DatabaseChunk.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def InstallSnapshot(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(
+            request_iterator,
+            target,
+            '/CardGameService/InstallSnapshot',
+            card__game__pb2.SnapshotChunk.SerializeToString,
+            card__game__pb2.Response.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetRoutingTable(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/CardGameService/GetRoutingTable',
+            google_dot_protobuf_dot_empty__pb2.Empty.SerializeToString,
+            card__game__pb2.RoutingTable.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def CreateGame(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/CardGameService/CreateGame',
+            card__game__pb2.GameSnapshot.SerializeToString,
+            card__game__pb2.Response.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def RecordResult(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/CardGameService/RecordResult',
+            card__game__pb2.GameResult.SerializeToString,
+            card__game__pb2.Response.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def GetWinRates(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/CardGameService/GetWinRates',
+            card__game__pb2.WinRateRequest.SerializeToString,
+            card__game__pb2.WinRateResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
+
+    @staticmethod
+    def ReadIndex(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/CardGameService/ReadIndex',
+            google_dot_protobuf_dot_empty__pb2.Empty.SerializeToString,
+            card__game__pb2.ReadIndexResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
@@ -0,0 +1,63 @@
+import threading
+
+import grpc
+
+import card_game_pb2_grpc as stub
+
+# Keepalive pings on idle peer connections, so a dead peer is noticed between calls.
+CHANNEL_OPTIONS = [
+    ("grpc.keepalive_time_ms", 10000),
+    ("grpc.keepalive_timeout_ms", 5000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+]
+
+# Server side of the above: accept those pings instead of answering with GOAWAY.
+SERVER_OPTIONS = [
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.min_ping_interval_without_data_ms", 5000),
+    ("grpc.http2.max_pings_without_data", 0),
+]
+
+
+class ChannelPool:
+    """
+    One long-lived channel, and stub, per peer address, shared by everything
+    in the server that talks to that peer. Reusing it skips a TCP and HTTP/2
+    handshake per call. Channels are closed when their peer leaves the cluster.
+    """
+
+    def __init__(self, options=CHANNEL_OPTIONS):
+        self.options = options
+        self.lock = threading.Lock()
+        self.channels = {}  # address -> (channel, stub)
+
+    def stub(self, address):
+        with self.lock:
+            entry = self.channels.get(address)
+            if entry is None:
+                channel = grpc.insecure_channel(address, options=self.options)
+                entry = (channel, stub.CardGameServiceStub(channel))
+                self.channels[address] = entry
+            return entry[1]
+
+    def __contains__(self, address):
+        return address in self.channels
+
+    def close(self, address):
+        with self.lock:
+            entry = self.channels.pop(address, None)
+        if entry:
+            entry[0].close()
+
+    def retain(self, addresses):
+        """Close the channels of every address not in `addresses`."""
+        keep = set(addresses)
+        with self.lock:
+            dropped = [addr for addr in self.channels if addr not in keep]
+            entries = [self.channels.pop(addr) for addr in dropped]
+        for channel, _ in entries:
+            channel.close()
+
+    def close_all(self):
+        self.retain([])
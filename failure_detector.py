@@ -0,0 +1,39 @@
+import collections
+import math
+import time
+
+
+class PhiAccrualDetector:
+    """
+    Phi accrual failure detector (Hayashibara et al.) for one peer. Rather
+    than a yes/no verdict after a missed heartbeat, phi() says how unlikely
+    the current silence is given the heartbeat intervals seen so far. A phi
+    of 8 means the peer would still be alive with probability 10^-8.
+    """
+
+    def __init__(self, expected_interval, acceptable_pause=0.0, min_std=0.5, window=100, clock=time.monotonic):
+        self.acceptable_pause = acceptable_pause  # silence tolerated on top of the usual interval
+        self.min_std = min_std
+        self.clock = clock
+        # seeded with the expected interval so a new peer is judged before it has a history
+        self.intervals = collections.deque([expected_interval, expected_interval], maxlen=window)
+        self.last_heartbeat = clock()
+
+    def heartbeat(self):
+        now = self.clock()
+        self.intervals.append(now - self.last_heartbeat)
+        self.last_heartbeat = now
+
+    def phi(self):
+        elapsed = self.clock() - self.last_heartbeat
+        mean = sum(self.intervals) / len(self.intervals)
+        variance = sum((x - mean) ** 2 for x in self.intervals) / len(self.intervals)
+        std = max(math.sqrt(variance), self.min_std)
+
+        # logistic approximation of the normal CDF, as used by Akka and Cassandra
+        y = (elapsed - mean - self.acceptable_pause) / std
+        y = max(-8.0, min(8.0, y))  # phi tops out around 21; keeps exp() in range
+        e = math.exp(-y * (1.5976 + 0.070566 * y * y))
+        if y > 0:
+            return -math.log10(e / (1.0 + e))
+        return -math.log10(1.0 - 1.0 / (1.0 + e))
@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 import grpc
+import random
 import threading
 import time
 from argparse import ArgumentParser
@@ -8,6 +9,14 @@ from google.protobuf.empty_pb2 import Empty
 
 import card_game_pb2 as pb
 import card_game_pb2_grpc as stub
+from routing import leader_for, matchmaker_for
+
+# How far behind the leader, in seconds, a follower's game state may be when the GUI reads it.
+# Covers a heartbeat round plus its deadline (server.HEARTBEAT_INTERVAL + HEARTBEAT_TIMEOUT),
+# so a follower answers from its lease instead of asking the leader with ReadIndex.
+MAX_READ_STALENESS = 5.0
+# How long the GUI polls before asking again for a stream the server refused for lack of slots.
+STREAM_RETRY_SECONDS = 30.0
 
 class CardGameGUI:
     def __init__(self, root, args):
@@ -30,6 +39,12 @@ class CardGameGUI:
 
         self.channel = grpc.insecure_channel(f"{args.host}:{args.port}")
         self.stub = stub.CardGameServiceStub(self.channel)
+        self.game_stub = self.stub  # leader of the Raft group that owns the current game
+        self.match_stub = self.stub  # leader of the group that runs matchmaking
+        self.match_address = None
+        self.game_address = None
+        self.read_stub = self.stub  # the game's leader or one of its followers, for game-state reads
+        self.read_address = None
 
         self.username = None
         self.game_id = None
@@ -37,6 +52,9 @@ class CardGameGUI:
         self.card_frames = []
         self.card_values = []
         self.opponent_info = []
+        self.use_state_stream = True  # cleared when the server lacks SubscribeGameState
+        self.state_stream_retry_at = 0.0  # poll until then: the server had no stream to spare
+        self.use_match_stream = True  # cleared when the server lacks WaitForMatch
 
         self.default_font = ("Helvetica", 12)
         self.header_font = ("Helvetica", 14, "bold")
@@ -117,16 +135,67 @@ class CardGameGUI:
                     print(f"[GUI] Current leader at {res.leader_address}")
                     self.channel = grpc.insecure_channel(res.leader_address)
                     self.stub = stub.CardGameServiceStub(self.channel)
+                    self.route_game()
                     return
                 if res.leader_address:
                     print(f"[GUI] Current leader at {res.leader_address}")
                     self.channel = grpc.insecure_channel(res.leader_address)
                     self.stub = stub.CardGameServiceStub(self.channel)
+                    self.route_game()
                     return
             except grpc.RpcError:
                 continue
         print("[GUI] Failed to find a leader.")
 
+    def route_game(self):
+        """Send the current game's RPCs to the leader of the group that owns it, if the cluster has groups."""
+        try:
+            table = self.stub.GetRoutingTable(Empty()) if self.game_id else None
+        except grpc.RpcError:
+            table = None  # a server without groups
+        leader = leader_for(table, self.game_id) if table and len(table.group_leaders) > 1 else ""
+        if not leader:
+            self.game_stub = self.stub
+            self.game_address = None
+        elif leader != self.game_address:
+            print(f"[GUI] Game {self.game_id} is led by {leader}")
+            self.game_stub = stub.CardGameServiceStub(grpc.insecure_channel(leader))
+            self.game_address = leader
+        self.route_reads()
+
+    def route_match(self):
+        """Queue with the leader of the matchmaking group, so players connected to different groups meet."""
+        try:
+            table = self.stub.GetRoutingTable(Empty())
+        except grpc.RpcError:
+            table = None  # a server without groups
+        leader = matchmaker_for(table) if table and len(table.group_leaders) > 1 else ""
+        if not leader:
+            self.match_stub = self.stub
+            self.match_address = None
+        elif leader != self.match_address:
+            print(f"[GUI] Matchmaking is run by {leader}")
+            self.match_stub = stub.CardGameServiceStub(grpc.insecure_channel(leader))
+            self.match_address = leader
+
+    def route_reads(self):
+        """Spread game-state reads over the game's leader and its followers; writes stay with the leader."""
+        try:
+            replicas = list(self.game_stub.WhoIsLeader(Empty()).replica_addresses) if self.game_id else []
+        except grpc.RpcError:
+            replicas = []
+        if self.read_address not in replicas:
+            self.read_address = random.choice(replicas + [None])  # None reads from the leader itself
+            if self.read_address:
+                print(f"[GUI] Reading game state from {self.read_address}")
+                self.read_stub = stub.CardGameServiceStub(grpc.insecure_channel(self.read_address))
+        if not self.read_address:
+            self.read_stub = self.game_stub
+
+    def read_from_leader(self):
+        self.read_address = None
+        self.read_stub = self.game_stub
+
     def start_leader_monitor(self):
         def monitor():
             while True:
@@ -219,25 +288,57 @@ class CardGameGUI:
     def start_match(self):
         try:
             n = int(self.num_players_entry.get())
-            self.status_label.config(text="Waiting for players...")
-            self.root.update()
-
-            while True:
-                resp = self.stub.StartMatch(pb.MatchRequest(username=self.username, num_players=n))
-                self.status_label.config(text=resp.message)
-                self.root.update()
-
-                if resp.status == "success":
-                    game_id = resp.message.split("ID: ")[-1]
-                    self.game_id = game_id.strip()
-                    self.game_screen()
-                    break
-                elif resp.status == "error":
-                    break
-
-                time.sleep(2)
         except ValueError:
             messagebox.showerror("Error", "Enter a valid number")
+            return
+        self.status_label.config(text="Waiting for players...")
+        # wait off the Tk thread so the window stays responsive
+        threading.Thread(target=self.wait_for_match, args=(n,), daemon=True).start()
+
+    def wait_for_match(self, n):
+        """Follow the WaitForMatch stream until the server pushes our game, then enter it."""
+        self.route_match()
+        if not self.use_match_stream:
+            self.poll_for_match(n)
+            return
+        try:
+            for update in self.match_stub.WaitForMatch(pb.MatchRequest(username=self.username, num_players=n)):
+                self.show_match_status(update.message)
+                if update.status == "success":
+                    self.root.after(0, self.enter_game, update.game_id)
+                    return
+                if update.status == "error":
+                    return
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.UNIMPLEMENTED:
+                print("[GUI] Server does not support WaitForMatch. Falling back to polling.")
+                self.use_match_stream = False
+                self.poll_for_match(n)
+            elif e.code() == grpc.StatusCode.RESOURCE_EXHAUSTED:
+                print("[GUI] Server has no streams to spare. Polling for a match.")
+                self.poll_for_match(n)
+            else:
+                self.show_match_status("Lost the connection while waiting for a match.")
+
+    def poll_for_match(self, n):
+        """Re-call StartMatch every 2 seconds, for servers without WaitForMatch or with no stream to spare."""
+        while True:
+            resp = self.match_stub.StartMatch(pb.MatchRequest(username=self.username, num_players=n))
+            self.show_match_status(resp.message)
+            if resp.status == "success":
+                self.root.after(0, self.enter_game, resp.message.split("ID: ")[-1].strip())
+                return
+            if resp.status == "error":
+                return
+            time.sleep(2)
+
+    def show_match_status(self, message):
+        self.root.after(0, lambda: self.status_label.config(text=message))
+
+    def enter_game(self, game_id):
+        self.game_id = game_id
+        self.route_game()
+        self.game_screen()
 
     # def accept_match(self):
     #     game_id = simpledialog.askstring("Game ID", "Enter Game ID:")
@@ -252,7 +353,10 @@ class CardGameGUI:
 
     def poll_game_state(self):
         while self.game_id:
-            self.refresh_game_state()
+            if self.use_state_stream and time.time() >= self.state_stream_retry_at:
+                self.stream_game_state()
+            else:
+                self.refresh_game_state()
 
             if not self.game_id:
                 time.sleep(3)
@@ -260,6 +364,36 @@ class CardGameGUI:
                 break
             time.sleep(0.5)
 
+    def stream_game_state(self):
+        """Render game states pushed by the server until the stream ends."""
+        try:
+            states = self.read_stub.SubscribeGameState(pb.GameStateRequest(
+                game_id=self.game_id,
+                username=self.username,
+                max_staleness_seconds=MAX_READ_STALENESS
+            ))
+            for resp in states:
+                if resp.status == "error" and self.read_address:
+                    # the follower fell behind or lacks the game; the leader always has it
+                    self.read_from_leader()
+                    break
+                self.render_game_state(resp)
+                if not self.game_id:
+                    states.cancel()
+                    break
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.UNIMPLEMENTED:
+                print("[GUI] Server does not support SubscribeGameState. Falling back to polling.")
+                self.use_state_stream = False
+            elif e.code() == grpc.StatusCode.RESOURCE_EXHAUSTED:
+                print("[GUI] Server has no streams to spare. Polling for now.")
+                self.state_stream_retry_at = time.time() + STREAM_RETRY_SECONDS
+            else:
+                print(f"Error streaming game state: {e}")
+                self.read_from_leader()
+        except Exception as e:
+            print(f"Error streaming game state: {e}")
+
     def create_card_widgets(self):
         self.card_canvas = tk.Canvas(self.card_display_area, bg=self.colors["bg"], highlightthickness=0)
         self.card_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -509,64 +643,72 @@ class CardGameGUI:
 
     def refresh_game_state(self):
         try:
-            resp = self.stub.GetGameState(pb.GameStateRequest(game_id=self.game_id, username=self.username))
-            
-            self.turn_label.config(text=f"Current Turn: {resp.current_turn}")
-            last_played_str = ", ".join(map(str, resp.last_played_cards))
-            self.played_label.config(text=f"Last Played: {last_played_str}")
-            self.time_label.config(text=f"Time Left: {resp.countdown_seconds}s")
-
-            user_hand = []
-            for p in resp.players:
-                if p.username == self.username:
-                    user_hand = p.cards
-                    break
-            
-            current_hand = sorted(user_hand)
-            if self.card_values != current_hand:
-                self.update_card_display(current_hand)
-            
-            opponents = [p for p in resp.players if p.username != self.username]
-            
-            need_update = False
-            if len(self.opponent_info) != len(opponents):
-                need_update = True
-            else:
-                for old_p, new_p in zip(self.opponent_info, opponents):
-                    if (old_p.username != new_p.username or
-                        old_p.card_count != new_p.card_count or 
-                        abs(old_p.win_rate - new_p.win_rate) > 0.01):
-                        need_update = True
-                        break
-            
-            if need_update:
-                self.update_opponents_display(opponents)
-
-            if resp.game_over:
-                messagebox.showinfo("Game Over", f"Winner: {resp.winner}")
-                self.game_id = None
-                
+            resp = self.read_stub.GetGameState(pb.GameStateRequest(
+                game_id=self.game_id,
+                username=self.username,
+                max_staleness_seconds=MAX_READ_STALENESS
+            ))
+            self.render_game_state(resp)
+        except grpc.RpcError as e:
+            print(f"Error refreshing game state: {e}")
+            self.read_from_leader()
         except Exception as e:
             print(f"Error refreshing game state: {e}")
 
+    def render_game_state(self, resp):
+        self.turn_label.config(text=f"Current Turn: {resp.current_turn}")
+        last_played_str = ", ".join(map(str, resp.last_played_cards))
+        self.played_label.config(text=f"Last Played: {last_played_str}")
+        self.time_label.config(text=f"Time Left: {resp.countdown_seconds}s")
+
+        user_hand = []
+        for p in resp.players:
+            if p.username == self.username:
+                user_hand = p.cards
+                break
+        
+        current_hand = sorted(user_hand)
+        if self.card_values != current_hand:
+            self.update_card_display(current_hand)
+        
+        opponents = [p for p in resp.players if p.username != self.username]
+        
+        need_update = False
+        if len(self.opponent_info) != len(opponents):
+            need_update = True
+        else:
+            for old_p, new_p in zip(self.opponent_info, opponents):
+                if (old_p.username != new_p.username or
+                    old_p.card_count != new_p.card_count or 
+                    abs(old_p.win_rate - new_p.win_rate) > 0.01):
+                    need_update = True
+                    break
+        
+        if need_update:
+            self.update_opponents_display(opponents)
+
+        if resp.game_over:
+            messagebox.showinfo("Game Over", f"Winner: {resp.winner}")
+            self.game_id = None
+
     @with_leader_retry
     def play_card(self):
         try:
             card_str = self.card_entry.get()
             cards = list(map(int, card_str.strip().split(",")))
-            resp = self.stub.PlayCard(pb.PlayCardRequest(username=self.username, game_id=self.game_id, cards=cards))
+            resp = self.game_stub.PlayCard(pb.PlayCardRequest(username=self.username, game_id=self.game_id, cards=cards))
             messagebox.showinfo("Result", resp.message)
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
     @with_leader_retry
     def pass_turn(self):
-        resp = self.stub.PassTurn(pb.GameActionRequest(username=self.username, game_id=self.game_id))
+        resp = self.game_stub.PassTurn(pb.GameActionRequest(username=self.username, game_id=self.game_id))
         messagebox.showinfo("Pass", resp.message)
 
     @with_leader_retry
     def quit_game(self):
-        resp = self.stub.QuitGame(pb.GameActionRequest(username=self.username, game_id=self.game_id))
+        resp = self.game_stub.QuitGame(pb.GameActionRequest(username=self.username, game_id=self.game_id))
         self.game_id = None
         messagebox.showinfo("Quit", resp.message)
         self.home_screen()
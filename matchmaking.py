@@ -0,0 +1,86 @@
+import time
+from collections import OrderedDict
+
+# Table sizes players can queue for.
+MATCH_SIZES = (2, 3, 4)
+
+
+class MatchQueue:
+    """
+    Players waiting for a game, first come first served, one queue per table
+    size. Each queue is an OrderedDict keyed by username and an index maps every
+    waiting user to their queue, so joining, leaving, checking whether someone
+    waits and taking the next table are all O(1) (O(size) for a table).
+    Not thread-safe; CardGameService guards it with match_lock.
+    """
+
+    def __init__(self, sizes=MATCH_SIZES, clock=time.monotonic):
+        self.clock = clock
+        self.queues = {size: OrderedDict() for size in sizes}  # username -> time they joined
+        self.index = {}  # username -> size of the queue they wait in
+
+    def __contains__(self, username):
+        return username in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def accepts(self, size):
+        return size in self.queues
+
+    def waiting(self, size):
+        """Usernames in the queue for `size`, oldest first."""
+        return list(self.queues[size])
+
+    def entries(self, size):
+        """(username, time joined) for the queue for `size`, oldest first."""
+        return list(self.queues[size].items())
+
+    def waiting_for(self, username):
+        """The table size a user waits for, or None."""
+        return self.index.get(username)
+
+    def enqueue(self, username, size):
+        """
+        Add a user to the back of the queue for `size`. A user already waiting
+        for that size keeps their place; one waiting for another size moves.
+        """
+        current = self.index.get(username)
+        if current == size:
+            return
+        if current is not None:
+            del self.queues[current][username]
+        self.queues[size][username] = self.clock()
+        self.index[username] = size
+
+    def cancel(self, username):
+        """Take a user out of whichever queue they wait in; False if they were not waiting."""
+        size = self.index.pop(username, None)
+        if size is None:
+            return False
+        del self.queues[size][username]
+        return True
+
+    def take(self, size):
+        """The `size` longest-waiting users for a table of `size`, removed from the queue; None if too few wait."""
+        queue = self.queues[size]
+        if len(queue) < size:
+            return None
+        players = [queue.popitem(last=False)[0] for _ in range(size)]
+        for player in players:
+            del self.index[player]
+        return players
+
+    def requeue(self, players, size, joined_at=None):
+        """
+        Put players whose game could not be started back at the front of the
+        queue, in their old order. `joined_at` keeps their original join times.
+        """
+        queue = self.queues[size]
+        now = self.clock()
+        for player in reversed(players):
+            if player in self.index:
+                continue  # queued again, or elsewhere, in the meantime
+            queue[player] = joined_at.get(player, now) if joined_at else now
+            queue.move_to_end(player, last=False)
+            self.index[player] = size
@@ -0,0 +1,274 @@
+import collections
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+import card_game_pb2 as pb
+
+# Record header in the log file: payload length, log index, CRC32 of the payload.
+RECORD_HEADER = struct.Struct("<IqI")
+# Log index of a record whose payload is the commit index rather than a command.
+COMMIT_RECORD = -1
+COMMIT_PAYLOAD = struct.Struct("<q")
+
+
+def encode_record(index, command):
+    payload = command.SerializeToString()
+    return RECORD_HEADER.pack(len(payload), index, zlib.crc32(payload)) + payload
+
+
+def encode_commit(index):
+    payload = COMMIT_PAYLOAD.pack(index)
+    return RECORD_HEADER.pack(len(payload), COMMIT_RECORD, zlib.crc32(payload)) + payload
+
+
+def write_file_durably(path, data):
+    """Replace `path` with `data` so a crash leaves either the old or the new file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class LogFile:
+    """
+    Append-only file of length-prefixed, checksummed commands. Appends go into
+    the file buffer right away and one background thread fsyncs whatever has
+    piled up since its last fsync, so concurrent appenders share a single fsync
+    (group commit). append() hands out a ticket; sync(ticket) returns once that
+    record is on disk.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.cond = threading.Condition()
+        self.sync_lock = threading.Lock()  # held across an fsync so rewrite() cannot swap the file under it
+        self.written = 0  # records handed to the file
+        self.durable = 0  # records known to be on disk
+        self.fsyncs = 0
+        self.running = True
+        self.file = open(path, "ab")
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def replay(self):
+        """
+        Read every intact record through mmap. A record torn by a crash ends
+        the log; it is cut off so later appends follow the last good record.
+        Returns the (index, command) records and the last commit index
+        recorded, or -1.
+        """
+        records = []
+        committed = -1
+        end = 0
+        size = os.path.getsize(self.path)
+        if size:
+            with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                while end + RECORD_HEADER.size <= size:
+                    length, index, crc = RECORD_HEADER.unpack_from(data, end)
+                    start = end + RECORD_HEADER.size
+                    payload = data[start:start + length]
+                    if len(payload) < length or zlib.crc32(payload) != crc:
+                        break
+                    if index == COMMIT_RECORD:
+                        committed = max(committed, COMMIT_PAYLOAD.unpack(payload)[0])
+                    else:
+                        records.append((index, pb.Command.FromString(payload)))
+                    end = start + length
+        if end < size:
+            with self.sync_lock, self.cond:
+                self.file.flush()
+                os.truncate(self.path, end)
+        return records, committed
+
+    def append(self, index, command):
+        return self._write(encode_record(index, command))
+
+    def append_commit(self, index):
+        """Record that every entry through `index` is decided."""
+        return self._write(encode_commit(index))
+
+    def _write(self, record):
+        with self.cond:
+            self.file.write(record)
+            self.written += 1
+            self.cond.notify_all()
+            return self.written
+
+    def sync(self, ticket=None):
+        with self.cond:
+            if ticket is None:
+                ticket = self.written
+            self.cond.wait_for(lambda: self.durable >= ticket or not self.running)
+
+    def rewrite(self, entries, committed):
+        """Replace the file with just `entries`, e.g. once the rest went into a snapshot."""
+        data = b"".join(encode_record(index, command) for index, command in entries) + encode_commit(committed)
+        with self.sync_lock, self.cond:
+            self.file.close()
+            write_file_durably(self.path, data)
+            self.file = open(self.path, "ab")
+            # every record written so far is now on disk, here or in the snapshot
+            self.durable = self.written
+            self.cond.notify_all()
+
+    def close(self):
+        with self.sync_lock, self.cond:
+            self.running = False
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            self.cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.written > self.durable or not self.running)
+                if not self.running:
+                    return
+            with self.sync_lock:
+                with self.cond:
+                    if not self.running:
+                        return
+                    target = self.written
+                    self.file.flush()
+                    fd = self.file.fileno()
+                # appends carry on into the buffer while we wait for the disk
+                os.fsync(fd)
+                with self.cond:
+                    self.durable = max(self.durable, target)
+                    self.fsyncs += 1
+                    self.cond.notify_all()
+
+
+class RaftLog:
+    """
+    The replicated command log, held as the latest snapshot plus the entries
+    after it. Compacting folds a committed prefix into a new snapshot and drops
+    those entries, so memory stays bounded however long the node runs.
+
+    Given a `path`, the entries are also kept in a LogFile there and the
+    snapshot next to it, and both are loaded back when the node restarts.
+
+    Entries are appended before they are decided. The log also records how
+    far they have been decided (`committed`), and an entry that failed to
+    reach a quorum is aborted: a later record for its index replaces the
+    command with an empty one, so a restart never applies it.
+    """
+
+    def __init__(self, path=None):
+        self.entries = collections.deque()  # (index, command), ascending index
+        self.snapshot_index = -1  # last index the snapshot covers
+        self.snapshot_games = []  # GameSnapshot of every game at snapshot_index
+        self.committed = -1  # every entry up to here is decided
+        self.aborted = set()  # indices above aborted_since that were aborted; replaced, never mutated
+        self.aborted_since = -1
+        self.file = None
+        if path:
+            self.snapshot_path = os.path.splitext(path)[0] + ".snapshot"
+            self._load_snapshot()
+            self.file = LogFile(path)
+            records, committed = self.file.replay()
+            latest = {}  # an abort record replaces the entry it follows
+            for index, command in records:
+                if index > self.snapshot_index:
+                    latest[index] = command
+            self.entries.extend(sorted(latest.items(), key=lambda entry: entry[0]))
+            self.aborted = {index for index, command in self.entries if command.WhichOneof("op") is None}
+            self.committed = max(self.committed, committed)
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return
+        with open(self.snapshot_path, "rb") as f:
+            snapshot = pb.SnapshotChunk.FromString(f.read())
+        self.snapshot_index = snapshot.last_included_index
+        self.snapshot_games = list(snapshot.games)
+        self.committed = self.aborted_since = self.snapshot_index
+
+    def _save_snapshot(self):
+        if self.file:
+            snapshot = pb.SnapshotChunk(last_included_index=self.snapshot_index, games=self.snapshot_games)
+            write_file_durably(self.snapshot_path, snapshot.SerializeToString())
+            self.file.rewrite(self.entries, self.committed)
+
+    def append(self, index, command):
+        """Add an entry; returns a ticket to pass to sync()."""
+        self.entries.append((index, command))
+        return self.file.append(index, command) if self.file else 0
+
+    def abort(self, index):
+        """Mark an entry that failed to reach a quorum; returns a ticket to pass to sync()."""
+        for position in range(len(self.entries) - 1, -1, -1):
+            entry_index = self.entries[position][0]
+            if entry_index == index:
+                self.entries[position] = (index, pb.Command())
+            if entry_index <= index:
+                break
+        self.aborted = self.aborted | {index}
+        return self.file.append(index, pb.Command()) if self.file else 0
+
+    def mark_committed(self, index):
+        """Record that every entry through `index` is decided. Rides along with the next fsync."""
+        if index > self.committed:
+            self.committed = index
+            if self.file:
+                self.file.append_commit(index)
+
+    def truncate(self, index):
+        """Drop the entries after `index`, e.g. ones a new leader is about to overwrite."""
+        while self.entries and self.entries[-1][0] > index:
+            self.entries.pop()
+        self.aborted = {i for i in self.aborted if i <= index}
+        if self.file:
+            self.file.rewrite(self.entries, self.committed)
+
+    def sync(self, ticket=None):
+        """Wait until the entry behind `ticket`, or every entry appended so far, is on disk."""
+        if self.file:
+            self.file.sync(ticket)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    @property
+    def last_index(self):
+        return self.entries[-1][0] if self.entries else self.snapshot_index
+
+    def compact(self, index, games):
+        """Replace everything up to and including `index` with a snapshot of `games`."""
+        if index < self.snapshot_index:
+            return
+        while self.entries and self.entries[0][0] <= index:
+            self.entries.popleft()
+        # aborts since the previous snapshot are kept for replicas still catching up to it
+        self.aborted_since = self.snapshot_index
+        self.aborted = {i for i in self.aborted if i > self.aborted_since}
+        self.snapshot_index = index
+        self.snapshot_games = list(games)
+        self.committed = max(self.committed, index)
+        self._save_snapshot()
+
+    def reset(self, index, games):
+        """Start over from a snapshot received from the leader, dropping every entry."""
+        self.entries.clear()
+        self.snapshot_index = self.committed = self.aborted_since = index
+        self.aborted = set()
+        self.snapshot_games = list(games)
+        self._save_snapshot()
+
+    def entries_after(self, index):
+        """Commands after `index`, or None if some of them were compacted away."""
+        if index < self.snapshot_index:
+            return None
+        return [(i, command) for i, command in self.entries if i > index]
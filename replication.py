@@ -0,0 +1,208 @@
+import collections
+import threading
+import time
+
+import card_game_pb2 as pb
+
+# Max AppendLog calls in flight to one replica before later entries wait their turn.
+REPLICATION_WINDOW = 8
+# Deadline for a single AppendLog call.
+APPEND_TIMEOUT = 2.0
+# Pause before re-sending an entry a replica failed to ack.
+RETRY_DELAY = 0.5
+# Entries queued for one replica before it is caught up with a snapshot instead.
+MAX_BACKLOG = 1000
+# AppendLog ack message from a replica too far behind to follow the leader's commit info.
+SNAPSHOT_REQUESTED = "Snapshot requested"
+
+
+class QuorumWaiter:
+    """Collects replica acks for one log entry until a majority is reached."""
+
+    def __init__(self, needed, total):
+        self.needed = needed  # replica acks required (the leader's own vote excluded)
+        self.remaining = total  # replicas that have not answered the first attempt yet
+        self.acks = 0
+        self.cond = threading.Condition()
+        self.callbacks = []
+        self.decided = False
+
+    def ack(self):
+        with self.cond:
+            self.acks += 1
+            self.cond.notify_all()
+            callbacks = self._take_callbacks()
+        self._run_callbacks(callbacks)
+
+    def first_attempt_failed(self):
+        with self.cond:
+            self.remaining -= 1
+            self.cond.notify_all()
+            callbacks = self._take_callbacks()
+        self._run_callbacks(callbacks)
+
+    def add_done_callback(self, fn):
+        """Call `fn(replicated)` once the outcome is known, for callers that cannot block in wait()."""
+        with self.cond:
+            self.callbacks.append(fn)
+            callbacks = self._take_callbacks()
+        self._run_callbacks(callbacks)
+
+    def _take_callbacks(self):
+        if not self.decided:
+            if not self._decided():
+                return []
+            self.decided = True
+        callbacks, self.callbacks = self.callbacks, []
+        return callbacks
+
+    def _run_callbacks(self, callbacks):
+        for fn in callbacks:
+            fn(self.acks >= self.needed)
+
+    def _decided(self):
+        # Either a majority acked, or even the replicas still pending cannot make one.
+        return self.acks >= self.needed or self.acks + self.remaining < self.needed
+
+    def wait(self, timeout):
+        """Return True once a majority acked, False if that is no longer reachable in time."""
+        with self.cond:
+            self.cond.wait_for(self._decided, timeout)
+            return self.acks >= self.needed
+
+
+class Replicator:
+    """
+    Ships log entries to one replica in index order, keeping up to `window`
+    AppendLog calls in flight so consecutive commands pipeline. Entries the
+    replica fails to ack are retried in the background until it catches up
+    or the replicator is stopped.
+
+    If `install_snapshot` is given and the replica falls more than MAX_BACKLOG
+    entries behind, the queued entries are dropped and the replica is sent a
+    snapshot instead. `install_snapshot(stub, through)` must cover at least
+    the last dropped index `through`, so the replica is not left with a gap;
+    it returns the log index the snapshot covers, or None if the transfer
+    failed. A replica that acks an entry with SNAPSHOT_REQUESTED is sent one
+    as well.
+
+    If `commit_info` is given, each entry is stamped with its current result
+    when it is sent, so the replica learns how far it may apply.
+    """
+
+    def __init__(self, address, replica_stub, window=REPLICATION_WINDOW, install_snapshot=None, commit_info=None):
+        self.address = address
+        self.stub = replica_stub
+        self.window = threading.BoundedSemaphore(window)
+        self.queue = collections.deque()  # (entry, waiter, is_first_attempt)
+        self.cond = threading.Condition()
+        self.sent_any = False
+        self.retry_at = 0
+        self.running = True
+        self.install_snapshot = install_snapshot
+        self.commit_info = commit_info
+        self.needs_snapshot = False
+        self.snapshot_index = -1  # entries up to here reached the replica in a snapshot
+        self.dropped_through = -1  # highest index dropped from the backlog; the next snapshot must cover it
+        self.restart = False  # next entry sent opens a new stream after a snapshot
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def send(self, entry, waiter):
+        """Queue a log entry for this replica; `waiter` is told about the first attempt."""
+        message = pb.LogEntry()
+        message.CopyFrom(entry)
+        with self.cond:
+            # lets the replica tell the start of our stream from a gap in it
+            message.first_entry = not self.sent_any
+            self.sent_any = True
+            if self.install_snapshot and len(self.queue) >= MAX_BACKLOG:
+                self._drop_backlog()
+            self.queue.append((message, waiter, True))
+            self.cond.notify()
+
+    def _drop_backlog(self):
+        for message, waiter, first in self.queue:
+            self.dropped_through = max(self.dropped_through, message.index)
+            if first:
+                waiter.first_attempt_failed()
+        self.queue.clear()
+        self.needs_snapshot = True
+        print(f"[Leader] Replica at {self.address} fell {MAX_BACKLOG} entries behind; sending a snapshot.")
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.queue.clear()
+            self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.running and not self.queue and not self.needs_snapshot:
+                    self.cond.wait()
+                if not self.running:
+                    return
+                delay = self.retry_at - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+            if self.needs_snapshot:
+                self._send_snapshot()
+                continue
+
+            self.window.acquire()
+            with self.cond:
+                if not self.running or not self.queue:
+                    self.window.release()
+                    continue
+                message, waiter, first = self.queue.popleft()
+                if message.index <= self.snapshot_index:
+                    # already covered by the snapshot the replica installed
+                    if first:
+                        waiter.first_attempt_failed()
+                    self.window.release()
+                    continue
+                if self.restart:
+                    message.first_entry = True
+                    self.restart = False
+            if self.commit_info:
+                message.commit.CopyFrom(self.commit_info())
+
+            future = self.stub.AppendLog.future(message, timeout=APPEND_TIMEOUT)
+            future.add_done_callback(
+                lambda f, m=message, w=waiter, first=first: self._on_done(f, m, w, first)
+            )
+
+    def _send_snapshot(self):
+        with self.cond:
+            # cleared first so a backlog dropped during the transfer asks for another
+            self.needs_snapshot = False
+            through = self.dropped_through
+        index = self.install_snapshot(self.stub, through)
+        with self.cond:
+            if index is None or index < through:
+                self.needs_snapshot = True
+                self.retry_at = time.time() + RETRY_DELAY
+                return
+            self.snapshot_index = max(self.snapshot_index, index)
+            self.restart = True
+
+    def _on_done(self, future, message, waiter, first):
+        self.window.release()
+        if future.exception() is None and future.result().status == "success":
+            waiter.ack()
+            if future.result().message == SNAPSHOT_REQUESTED and self.install_snapshot:
+                with self.cond:
+                    self.needs_snapshot = True
+                    self.cond.notify()
+            return
+
+        if first:
+            waiter.first_attempt_failed()
+        with self.cond:
+            if not self.running:
+                return
+            # Slow or flaky replica: put the entry back in front and back off.
+            self.retry_at = time.time() + RETRY_DELAY
+            self.queue.appendleft((message, waiter, False))
+            self.cond.notify()
@@ -0,0 +1,34 @@
+import zlib
+
+# The group whose leader keeps the match queue, so players connected to any group meet in one queue.
+MATCHMAKING_GROUP = 0
+
+
+def group_for(game_id, groups):
+    """
+    The Raft group that owns `game_id`. The key is salted so that it does not
+    line up with other crc32 keys, such as home_group's.
+    """
+    return zlib.crc32(b"group:" + game_id.encode()) % groups
+
+
+def home_group(username, groups):
+    """
+    The Raft group that keeps `username`'s account and win/loss counts. Games
+    of any group report their results there, so every player has one record.
+    """
+    return zlib.crc32(b"user:" + username.encode()) % groups
+
+
+def leader_for(table, game_id):
+    """The leader address for `game_id` in a RoutingTable, or "" if it is unknown."""
+    if not table.group_leaders:
+        return ""
+    return table.group_leaders[group_for(game_id, len(table.group_leaders))]
+
+
+def matchmaker_for(table):
+    """The address of the leader that runs matchmaking in a RoutingTable, or "" if it is unknown."""
+    if not table.group_leaders:
+        return ""
+    return table.group_leaders[MATCHMAKING_GROUP]
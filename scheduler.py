@@ -0,0 +1,70 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent import futures
+
+
+class DeadlineScheduler:
+    """
+    One thread that fires callbacks at their deadlines, for any number of keys.
+    Each key (e.g. a game_id) has at most one pending deadline: scheduling it
+    again replaces the old one. Callbacks run on a small worker pool so a slow
+    callback does not hold up the others.
+    """
+
+    def __init__(self, workers=4):
+        self.heap = []  # (deadline, seq, key, callback)
+        self.pending = {}  # key -> seq of its live heap entry
+        self.counter = itertools.count()
+        self.cond = threading.Condition()
+        self.pool = futures.ThreadPoolExecutor(max_workers=workers)
+        self.running = True
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def schedule(self, key, deadline, callback):
+        """Call `callback()` at time `deadline`, replacing any deadline already set for `key`."""
+        with self.cond:
+            seq = next(self.counter)
+            self.pending[key] = seq
+            heapq.heappush(self.heap, (deadline, seq, key, callback))
+            # wake the timer thread in case this is now the earliest deadline
+            self.cond.notify()
+
+    def cancel(self, key):
+        with self.cond:
+            self.pending.pop(key, None)
+
+    def __len__(self):
+        return len(self.pending)
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        self.pool.shutdown(wait=False)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                if not self.running:
+                    return
+                if not self.heap:
+                    self.cond.wait()
+                    continue
+
+                deadline, seq, key, callback = self.heap[0]
+                if self.pending.get(key) != seq:
+                    # replaced or cancelled
+                    heapq.heappop(self.heap)
+                    continue
+
+                delay = deadline - time.time()
+                if delay > 0:
+                    self.cond.wait(delay)
+                    continue
+
+                heapq.heappop(self.heap)
+                del self.pending[key]
+
+            self.pool.submit(callback)
@@ -9,8 +9,56 @@ import card_game_pb2 as pb
 import card_game_pb2_grpc as stub
 from storage import Storage
 from session import GameSession
+from replication import SNAPSHOT_REQUESTED, Replicator, QuorumWaiter
+from raft_log import RaftLog
+from failure_detector import PhiAccrualDetector
+from channel_pool import ChannelPool, SERVER_OPTIONS
+from scheduler import DeadlineScheduler
+from routing import MATCHMAKING_GROUP, group_for, home_group
+from matchmaking import MatchQueue
 from google.protobuf.empty_pb2 import Empty
 import json
+import itertools
+
+# Worker threads for the gRPC server; every SubscribeGameState stream holds one.
+MAX_WORKERS = 100
+# Streams the thread-pool server holds open at once; the other workers stay free for heartbeats, replication and votes.
+MAX_STREAMS = MAX_WORKERS * 3 // 4
+# How often a subscription re-sends an unchanged game state so the countdown moves.
+STATE_TICK_SECONDS = 1.0
+# How long the leader waits for a majority of replicas to ack a log entry.
+REPLICATION_TIMEOUT = 3.0
+# Back-off before retrying an auto-pass that could not be replicated.
+AUTO_PASS_RETRY_SECONDS = 1.0
+# Committed entries kept in the log before they are folded into a snapshot.
+LOG_COMPACTION_THRESHOLD = 1000
+# Deadline for streaming a snapshot to a lagging replica.
+INSTALL_SNAPSHOT_TIMEOUT = 60.0
+# Games per InstallSnapshot chunk and per SyncGames response, far below gRPC's 4 MB message limit.
+GAMES_PER_MESSAGE = 1000
+# How long a finished game stays in active_games, so its players can still read the result.
+FINISHED_GAME_TTL = 60.0
+# How long AppendLog holds an out-of-order entry for the entries before it to arrive.
+ENTRY_GAP_TIMEOUT = 1.0
+# Seconds between heartbeat rounds, and the deadline for each Heartbeat call.
+HEARTBEAT_INTERVAL = 3
+HEARTBEAT_TIMEOUT = 1.0
+# Silence tolerated on top of the usual heartbeat interval before phi starts to climb.
+HEARTBEAT_ACCEPTABLE_PAUSE = 3.0
+# Phi above which the leader declares a replica dead.
+PHI_THRESHOLD = 8.0
+# Deadline for another group's leader to replicate a game handed to it by CreateGame.
+CREATE_GAME_TIMEOUT = 2 * REPLICATION_TIMEOUT
+# How long a follower read waits to apply up to the commit index the leader reported.
+READ_INDEX_TIMEOUT = 1.0
+# Error a follower ends a game-state stream with when it cannot stay within the caller's staleness bound.
+STALE_REPLICA_MESSAGE = "Replica is too far behind the leader"
+# How often a WaitForMatch stream re-checks its queue even when nothing woke it, e.g. after a failed start.
+MATCH_RECHECK_SECONDS = 1.0
+# With groups: how often undelivered game results are retried and cached win rates refreshed.
+RESULT_RETRY_SECONDS = 1.0
+# How long a win rate read from a player's home group is served from cache.
+WIN_RATE_TTL = 5.0
 
 def get_local_ip():
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -25,25 +73,64 @@ def get_local_ip():
 
 
 class CardGameService(stub.CardGameServiceServicer):
-    def __init__(self, port, is_leader=False, leader_address=None, replica_addresses=None):
+    def __init__(self, port, is_leader=False, leader_address=None, replica_addresses=None, monitor=True,
+                 group=0, group_members=None, match_tick=0):
         self.port = port
         self.ip = get_local_ip()
         self.is_leader = is_leader
         self.leader_address = leader_address
+        # the address the leader advertises for itself and puts in its heartbeats; our
+        # leader_address may name the same node differently, e.g. by hostname
+        self.leader_id = None
         self.replica_addresses = replica_addresses or []
         self.replicas = []
+        self.channels = ChannelPool()  # peer address -> reused channel and stub
+        # Raft groups: each owns the games group_for() maps to it and has its own leader
+        self.group = group
+        self.group_members = group_members or []  # per group, addresses to ask for its leader
+        self.routes = {}  # group -> leader address, for every group but ours
+        self.remote_win_rates = {}  # username -> (win rate, fetched at) for players homed in other groups
+        self.win_rates_version = 0  # bumped whenever a cached remote win rate changes
+        self.results_ready = threading.Event()  # set when a result was queued for another group
+        self.results_thread = None  # delivers results to other groups, when there are any
+        self.delivering = True
         self.storage = Storage(f"cardgame-{port}.db")
 
-        self.match_queue = {2: [], 3: [], 4: []}
-        self.match_results = {}
+        self.match_queue = MatchQueue()
+        self.match_results = {}  # username -> game_id, or None while their game is being set up
+        self.match_abandoned = set()  # players whose stream closed while their game was being set up
+        self.match_lock = threading.Lock()  # guards match_queue, match_results and match_abandoned
+        self.match_listeners = []  # callbacks run after every table is started or fails; replaced, never mutated
+        self.matchmaker = None  # leader: BatchMatchmaker forming tables on a tick, if enabled
         self.online_users = {}
+        self.stream_slots = threading.BoundedSemaphore(MAX_STREAMS)  # one per open stream on the thread-pool server
         self.active_games = {}  # game_id -> GameSession
+        self.replicators = {}  # replica address -> Replicator
+        self.detectors = {}  # replica address -> PhiAccrualDetector
+        self.turn_timer = DeadlineScheduler()  # leader: auto-pass deadlines for every game
+
+        # log entry
+        self.log = RaftLog(f"cardgame-{port}.log")
+        self.commit_index = -1
+        self.next_log_index = 0
+        self.log_lock = threading.Lock()
+        # leader: commit_index is the apply cursor; entries decided out of order wait in `decided`
+        self.apply_lock = threading.Lock()
+        self.decided = {}  # leader: index -> (command, reached quorum, callback) for entries above the cursor
+        self.leader_applied = threading.Condition(self.apply_lock)  # leader: commit_index moved
+        self.applied = threading.Condition(self.log_lock)  # follower: last_logged or commit_index moved
+        self.pending_entries = {}  # follower: index -> command received ahead of a gap
+        self.last_logged = -1  # follower: entries up to here are in the log, decided or not
+        self.uncommitted = {}  # follower: index -> logged command the leader has not decided yet
+        self.leader_commit = -1  # follower: the leader has decided every entry up to here
+        self.aborted_ahead = set()  # follower: aborted entries we have not received yet
+        self.read_lease = (-1, 0.0)  # follower: a commit index of the leader's, and when it was reported
+        self.replay_log()
 
         if self.is_leader:
-            self.replicas = [stub.CardGameServiceStub(grpc.insecure_channel(addr)) for addr in self.replica_addresses]
+            self.connect_replicas()
         else:
-            self.leader_channel = grpc.insecure_channel(self.leader_address)
-            self.leader_stub = stub.CardGameServiceStub(self.leader_channel)
+            self.leader_stub = self.channels.stub(self.leader_address)
 
         if not self.is_leader:
             try:
@@ -51,23 +138,11 @@ class CardGameService(stub.CardGameServiceServicer):
                     replica_address=f"{self.ip}:{self.port}"
                 ))
                 print(f"[Replica] Registered self to leader at {self.leader_address}")
-                
-                response = self.leader_stub.SyncDatabase(Empty())
-                if response.status == "success":
-                    with open(self.storage.db_name, "wb") as f:
-                        f.write(response.database_dump)
-                    print(f"[Replica] Synced database from leader.")
-                else:
-                    print("[Replica] Failed to sync database.")
+                self.learn_leader_id()
+                self.sync_database_from_leader()
             except grpc.RpcError as e:
                 print(f"[Replica] Failed to register to leader: {e}")
 
-
-        # log entry
-        self.log = []
-        self.commit_index = -1
-        self.next_log_index = 0
-
         # Raft state
         self.current_term = 0
         self.voted_for = None
@@ -75,91 +150,629 @@ class CardGameService(stub.CardGameServiceServicer):
         self.last_heartbeat = time.time()
         self.election_timeout = random.uniform(3, 5)
 
-        threading.Thread(target=self.monitor_heartbeat, daemon=True).start()
+        if match_tick:
+            # numpy is only needed when games are formed in batches
+            from batch_matchmaker import BatchMatchmaker
+            self.matchmaker = BatchMatchmaker(self, match_tick)
+
+        if self.group_count > 1:
+            self.results_thread = threading.Thread(target=self.deliver_results, daemon=True)
+            self.results_thread.start()
+
+        if monitor:
+            # the asyncio server runs its own monitor loop instead
+            threading.Thread(target=self.monitor_heartbeat, daemon=True).start()
 
     def monitor_heartbeat(self):
         while True:
             if self.is_leader:
-                to_remove = []
-                for i, replica in enumerate(self.replicas):
-                    try:
-                        replica.Heartbeat(pb.HeartbeatRequest())
-                    except grpc.RpcError:
-                        print(f"[Leader] Replica at {self.replica_addresses[i]} is down.")
-                        to_remove.append(i)
-                # Remove dead replicas
-                for idx in sorted(to_remove, reverse=True):
-                    del self.replica_addresses[idx]
-                    del self.replicas[idx]
-
-                if to_remove:
-                    self.broadcast_replica_list()
+                self.send_heartbeats()
 
             else:
                 try:
-                    self.leader_stub.Heartbeat(pb.HeartbeatRequest())
+                    self.leader_stub.Heartbeat(pb.HeartbeatRequest(), timeout=HEARTBEAT_TIMEOUT)
                 except grpc.RpcError:
                     print("[Replica] Leader is down. Needs election handling here.")
                     self.initiate_election()
 
+                if not self.is_leader and self.leader_id is None:
+                    self.learn_leader_id()
                 self.pull_games_from_leader()
-            time.sleep(3)
+            if self.group_members:
+                self.refresh_routes()
+            time.sleep(HEARTBEAT_INTERVAL)
+
+    def send_heartbeats(self):
+        """
+        Leader: heartbeat every replica at once, each call with its own deadline,
+        so one hung replica cannot delay the others. A replica is removed only
+        once its failure detector crosses PHI_THRESHOLD, not on a single miss.
+        """
+        calls = self.start_heartbeats()
+        alive = []
+        for addr, call in calls:
+            try:
+                call.result()
+                alive.append(addr)
+            except grpc.RpcError:
+                continue
+        self.record_heartbeats([addr for addr, _ in calls], alive)
+
+    def start_heartbeats(self):
+        return [
+            (addr, replica.Heartbeat.future(
+                pb.HeartbeatRequest(leader_address=f"{self.ip}:{self.port}", commit_index=self.commit_index,
+                                    commit=self.commit_info()),
+                timeout=HEARTBEAT_TIMEOUT
+            ))
+            for addr, replica in zip(list(self.replica_addresses), list(self.replicas))
+        ]
+
+    def record_heartbeats(self, addresses, alive):
+        """Feed a heartbeat round into the failure detectors and drop replicas judged dead."""
+        for addr in alive:
+            detector = self.detectors.get(addr)
+            if detector:
+                detector.heartbeat()
+
+        dead = [addr for addr in addresses if addr in self.detectors and self.detectors[addr].phi() > PHI_THRESHOLD]
+        for addr in dead:
+            print(f"[Leader] Replica at {addr} is down.")
+            self.remove_replica(addr)
+        if dead:
+            self.broadcast_replica_list()
+
+    def remove_replica(self, addr):
+        if addr not in self.replica_addresses:
+            return
+        idx = self.replica_addresses.index(addr)
+        del self.replica_addresses[idx]
+        del self.replicas[idx]
+        self.detectors.pop(addr, None)
+        replicator = self.replicators.pop(addr, None)
+        if replicator:
+            replicator.stop()
+        self.prune_channels()
+
+    def prune_channels(self):
+        """Close pooled channels to peers that are neither a replica, the leader nor another group's contact."""
+        others = [addr for members in self.group_members for addr in members] + list(self.routes.values())
+        self.channels.retain(self.replica_addresses + [self.leader_address] + others)
+
+    @property
+    def group_count(self):
+        return max(1, len(self.group_members))
+
+    def refresh_routes(self):
+        """Ask each other group who leads it, trying its members in turn; a group nobody answers for keeps its old route."""
+        for group, members in enumerate(self.group_members):
+            if group == self.group:
+                continue
+            for addr in members:
+                try:
+                    res = self.channels.stub(addr).WhoIsLeader(Empty(), timeout=HEARTBEAT_TIMEOUT)
+                except grpc.RpcError:
+                    continue
+                if res.leader_address:
+                    self.routes[group] = res.leader_address
+                    break
+
+    def routing_table(self):
+        own = f"{self.ip}:{self.port}" if self.is_leader else self.leader_address
+        leaders = [self.routes.get(group, "") for group in range(self.group_count)]
+        leaders[self.group] = own or ""
+        return pb.RoutingTable(group_leaders=leaders, group=self.group)
+
+    def create_game(self, session):
+        """
+        Leader: start a new game in the group that owns its game_id. That is
+        this group unless the cluster is split into groups; otherwise the game
+        is handed to the owning group's leader with CreateGame.
+        """
+        snapshot = session.to_snapshot()
+        group = group_for(session.game_id, self.group_count)
+        if group == self.group:
+            success, _ = self.replicate_and_apply(pb.Command(start_game=snapshot))
+            if success:
+                self.schedule_turn_timeout(session.game_id)
+            return success
+
+        res = self.call_group(group, "CreateGame", snapshot)
+        return res is not None and res.status == "success"
+
+    def group_leader(self, group):
+        """The leader of another group, looked up if we do not know it; None if nobody answers."""
+        if group not in self.routes:
+            self.refresh_routes()
+        leader = self.routes.get(group)
+        if not leader:
+            print(f"[Routing] No leader known for group {group}.")
+        return leader
+
+    def call_group(self, group, rpc_name, request, timeout=CREATE_GAME_TIMEOUT):
+        """
+        Call `rpc_name` on the leader of another group, looking the leader up
+        if we do not know it. Returns the response, or None if no leader
+        answered. The route is forgotten when the call fails or the node is no
+        longer the leader, so the next call looks the leader up again.
+        """
+        leader = self.group_leader(group)
+        if not leader:
+            return None
+        try:
+            res = getattr(self.channels.stub(leader), rpc_name)(request, timeout=timeout)
+        except grpc.RpcError as e:
+            print(f"[Routing] {rpc_name} to group {group} failed: {e}")
+            self.routes.pop(group, None)
+            return None
+        if getattr(res, "status", "success") == "error" and res.message == "Not the leader":
+            # that node lost its leadership since we looked it up
+            self.routes.pop(group, None)
+        return res
+
+    def record_result(self, result_id, winners, losers):
+        """
+        Count a game's result toward each player's record in their home group.
+        Players homed here are counted now, in the caller's transaction; the
+        rest are queued in the outbox for the leader to deliver with
+        RecordResult. Returns whether anything was queued.
+        """
+        split = {}  # home group -> (winners, losers)
+        for username in winners:
+            split.setdefault(home_group(username, self.group_count), ([], []))[0].append(username)
+        for username in losers:
+            split.setdefault(home_group(username, self.group_count), ([], []))[1].append(username)
+
+        queued = False
+        for group, (wins, losses) in split.items():
+            if group == self.group:
+                self.storage.record_result(result_id, wins, losses)
+            else:
+                result = pb.GameResult(result_id=result_id, winners=wins, losers=losses)
+                self.storage.queue_result(result_id, group, result.SerializeToString())
+                queued = True
+        return queued
+
+    def deliver_results(self):
+        """
+        Results thread, when there is more than one group: deliver queued
+        results and keep the win rates of players in our games fresh.
+        """
+        while True:
+            self.results_ready.wait(RESULT_RETRY_SECONDS)
+            self.results_ready.clear()
+            if not self.delivering:
+                return
+            try:
+                if self.is_leader:
+                    self.forward_results()
+                self.refresh_win_rates({p for session in list(self.active_games.values()) for p in session.players})
+                # forget players we have stopped asking about
+                now = time.monotonic()
+                for username, (_, fetched_at) in list(self.remote_win_rates.items()):
+                    if now - fetched_at > 2 * WIN_RATE_TTL:
+                        self.remote_win_rates.pop(username, None)
+            except Exception as e:
+                print(f"[Results] Delivery failed: {e}")
+
+    def stop_results(self):
+        """Stop the results thread, waiting for a round in progress to finish."""
+        self.delivering = False
+        self.results_ready.set()
+        if self.results_thread:
+            self.results_thread.join()
+
+    def forward_results(self):
+        """
+        Leader: send every queued result to the leader of its players' home
+        group, and drop it from the outbox once that group has committed it.
+        A result that fails stays queued for the next round. Followers queue
+        the same results as we do, so a new leader sends them again; the home
+        group counts each result_id only once.
+        """
+        unreachable = set()
+        for result_id, group, data in self.storage.queued_results():
+            if group in unreachable:
+                continue
+            result = pb.GameResult.FromString(data)
+            res = self.call_group(group, "RecordResult", result)
+            if res is None or res.status != "success":
+                unreachable.add(group)
+                continue
+            self.storage.drop_queued_result(result_id, group)
+            for username in list(result.winners) + list(result.losers):
+                # read the new record on the next refresh
+                self.remote_win_rates.pop(username, None)
+
+    def refresh_win_rates(self, usernames):
+        """
+        Fetch the win rates of players homed in other groups that are not
+        cached, or were cached more than WIN_RATE_TTL ago, with one
+        GetWinRates call per group. Bumps win_rates_version if any changed.
+        """
+        now = time.monotonic()
+        due = {}  # home group -> usernames
+        for username in usernames:
+            group = home_group(username, self.group_count)
+            cached = self.remote_win_rates.get(username)
+            if group != self.group and (cached is None or now - cached[1] > WIN_RATE_TTL):
+                due.setdefault(group, []).append(username)
+
+        for group, names in due.items():
+            res = self.call_group(group, "GetWinRates", pb.WinRateRequest(usernames=names), timeout=HEARTBEAT_TIMEOUT)
+            if res is None or res.status != "success":
+                continue
+            changed = False
+            for username, rate in zip(names, res.win_rates):
+                cached = self.remote_win_rates.get(username)
+                changed = changed or cached is None or cached[0] != rate
+                self.remote_win_rates[username] = (rate, now)
+            if changed:
+                self.win_rates_version += 1
+
+    def win_rate(self, username):
+        """
+        A player's win rate, from the record in their home group. Never waits
+        on another group: a rate that has not been fetched yet reads 0.0 until
+        refresh_win_rates fetches it.
+        """
+        if home_group(username, self.group_count) == self.group:
+            return self.storage.get_win_rate(username)
+        cached = self.remote_win_rates.get(username)
+        return cached[0] if cached else 0.0
+
+    def create_games(self, sessions):
+        """
+        Leader: start many new games at once, as create_game does for one.
+        The games this group owns are proposed together and share a single
+        log fsync. Returns a success flag per session.
+        """
+        local, remote, started = [], [], {}
+        for session in sessions:
+            if group_for(session.game_id, self.group_count) != self.group:
+                remote.append(session)
+                continue
+            command = pb.Command(start_game=session.to_snapshot())
+            proposal = self.propose(command)
+            if proposal is None:
+                started[session.game_id] = False
+                continue
+            local.append((session.game_id, command, proposal))
+
+        if local:
+            # tickets complete in order, so syncing the last covers every entry before it
+            self.log.sync(local[-1][2][1])
+        for game_id, command, (index, _, waiter) in local:
+            success, _ = self.commit(index, command, waiter.wait(REPLICATION_TIMEOUT))
+            if success:
+                self.schedule_turn_timeout(game_id)
+            started[game_id] = success
+        # only once our own entries are decided, so later commands do not wait behind other groups
+        for session in remote:
+            started[session.game_id] = self.create_game(session)
+        return [started[session.game_id] for session in sessions]
+
+    def connect_replicas(self):
+        """Leader: open a stub and a Replicator for every known replica."""
+        for replicator in self.replicators.values():
+            replicator.stop()
+        self.replicas = []
+        self.replicators = {}
+        self.detectors = {}
+        for addr in self.replica_addresses:
+            self.add_replica_stub(addr)
+
+    def add_replica_stub(self, addr):
+        replica_stub = self.channels.stub(addr)
+        self.replicas.append(replica_stub)
+        self.replicators[addr] = Replicator(addr, replica_stub, install_snapshot=self.send_snapshot,
+                                            commit_info=self.commit_info)
+        self.detectors[addr] = PhiAccrualDetector(HEARTBEAT_INTERVAL, acceptable_pause=HEARTBEAT_ACCEPTABLE_PAUSE)
 
     def replicate_and_apply(self, command):
         """
         Leader: append command to log, replicate to followers, commit if majority ACKs.
+        Entries go out to all replicas concurrently; we return as soon as a majority
+        has acked and leave slower replicas to catch up in the background.
         """
-        if not self.is_leader:
+        proposal = self.propose(command)
+        if proposal is None:
             return False, "Not the leader"
+        index, ticket, waiter = proposal
 
-        entry = (self.next_log_index, command)
-        self.log.append(entry)
-        self.next_log_index += 1
-        # count self
-        acks = 1
-
-        for replica in self.replicas:
-            try:
-                replica.AppendLog(pb.LogEntry(index=entry[0], command=command["type"], payload=str(command)))
-                acks += 1
-            except grpc.RpcError:
-                pass  # log failure
+        # our own vote counts once the entry is on disk; replicas write theirs meanwhile
+        self.log.sync(ticket)
+        return self.commit(index, command, waiter.wait(REPLICATION_TIMEOUT))
 
-        # quorum
-        if acks >= (len(self.replicas) + 1) // 2 + 1:
-            self.commit_index = entry[0]
-            return self.apply_command(command)
-        else:
-            return False, "Failed to replicate"
+    def propose(self, command):
+        """
+        Leader: append a command to the log and hand it to every replicator.
+        Returns (index, ticket for log.sync, QuorumWaiter), or None on a follower.
+        """
+        if not self.is_leader:
+            return None
+
+        with self.log_lock:
+            entry = (self.next_log_index, command)
+            ticket = self.log.append(*entry)
+            self.next_log_index += 1
+
+            replicators = list(self.replicators.values())
+            # quorum, counting self
+            majority = (len(replicators) + 1) // 2 + 1
+            waiter = QuorumWaiter(needed=majority - 1, total=len(replicators))
+            message = pb.LogEntry(index=entry[0], command=command)
+            # enqueue under the lock so every replica sees entries in index order
+            for replicator in replicators:
+                replicator.send(message, waiter)
+        return entry[0], ticket, waiter
+
+    def commit(self, index, command, replicated):
+        """
+        Leader: apply a proposed command once a majority has it. Commands are
+        applied strictly in log order, as followers apply them, so this waits
+        until every earlier entry has been decided too.
+        """
+        applied = threading.Event()
+        outcome = []
+
+        def done(result):
+            outcome.append(result)
+            applied.set()
+
+        self.decide(index, command, replicated, done)
+        applied.wait()
+        if not replicated:
+            # the abort must be on disk before we report the failure
+            self.log.sync()
+        self.compact_log()
+        return outcome[0]
+
+    def decide(self, index, command, replicated, callback):
+        """
+        Leader: record whether a proposed entry reached a quorum, then apply
+        the run of decided entries right after commit_index, in index order.
+        An entry that did not replicate is aborted in the log instead, so
+        neither a restart nor a replica ever applies it. `callback(result)`
+        runs once the entry is applied or aborted. Never waits on earlier
+        entries itself.
+        """
+        with self.apply_lock:
+            if not self.is_leader or index <= self.commit_index:
+                # we stepped down since proposing it
+                callback((False, "Not the leader"))
+                return
+            self.decided[index] = (command, replicated, callback)
+            while self.commit_index + 1 in self.decided:
+                command, replicated, callback = self.decided.pop(self.commit_index + 1)
+                if replicated:
+                    try:
+                        result = self.apply_command(command)
+                    except Exception as e:
+                        print(f"[Leader] Failed to apply log entry {self.commit_index + 1}: {e}")
+                        result = (False, "Failed to apply")
+                else:
+                    self.log.abort(self.commit_index + 1)
+                    result = (False, "Failed to replicate")
+                self.commit_index += 1
+                callback(result)
+            self.log.mark_committed(self.commit_index)
+            self.leader_applied.notify_all()
+
+    def commit_info(self):
+        """Leader: how far replicas may apply, sent with every entry and heartbeat."""
+        index = self.commit_index
+        # read in this order: an entry is aborted before the cursor passes it,
+        # and compaction raises aborted_since before it prunes the set
+        aborted = self.log.aborted
+        since = self.log.aborted_since
+        return pb.Commit(index=index, aborted_since=since, aborted=sorted(i for i in aborted if i <= index and i > since))
+
+    def abort_undecided(self):
+        """
+        Leader: abort every entry in our log that was never decided, e.g. one
+        proposed just before a crash or received as a follower, and continue
+        numbering after all of them. Replicas learn of the aborts with the
+        next commit info.
+        """
+        for index, command in self.log.entries_after(self.commit_index):
+            if command.WhichOneof("op") is not None:
+                self.log.abort(index)
+        top = max(self.commit_index, self.last_logged, self.next_log_index - 1, self.log.last_index)
+        self.uncommitted = {}
+        self.pending_entries = {}
+        self.aborted_ahead = set()
+        self.commit_index = self.last_logged = top
+        self.next_log_index = top + 1
+        self.log.mark_committed(top)
+        self.log.sync()
+
+    def drop_decided(self):
+        """Fail every entry still waiting for an earlier one, e.g. when stepping down."""
+        with self.apply_lock:
+            pending, self.decided = self.decided, {}
+        for _, _, callback in pending.values():
+            callback((False, "Not the leader"))
         
-    def apply_command(self, command):
-        game_id = command["game_id"]
+    def apply_command(self, command, persist=True):
+        """
+        Apply a committed command to its game. With persist=False only the
+        in-memory session changes, for replaying the log over a database that
+        already holds the result.
+        """
+        op = command.WhichOneof("op")
+        if op is None:
+            return False, "Unknown command"
+        if op == "start_game":
+            return self.start_game(command.start_game, persist)
+        if op == "record_result":
+            result = command.record_result
+            if persist:
+                self.storage.record_result(result.result_id, result.winners, result.losers)
+            return True, "Result recorded"
+
+        action = getattr(command, op)
+        game_id = action.game_id
         session = self.active_games.get(game_id)
         if not session:
             return False, "Game not found"
 
-        if command["type"] == "play_card":
-            success, msg = session.play_cards(command["username"], command["cards"])
-        elif command["type"] == "pass_turn":
-            success, msg = session.pass_turn(command["username"])
-        elif command["type"] == "quit_game":
-            success, msg = session.quit_game(command["username"])
-        else:
-            return False, "Unknown command"
-
-        if session.winner:
-            self.storage.declare_winner(game_id, session.winner)
+        # held through the database write so the game's result is recorded exactly once
+        with session.lock:
+            had_winner = session.winner is not None
+
+            success, msg = session.apply(op, action)
+
+            if not persist:
+                return success, msg
+
+            # a quit that ends the game is written in one commit
+            queued = False
+            with self.storage.transaction():
+                if op == "quit_game" and success:
+                    self.storage.leave_game(game_id, action.username)
+                    queued |= self.record_result(f"{game_id}:quit:{action.username}", [], [action.username])
+                # record the result once, when the command that ends the game is applied
+                if session.winner and not had_winner:
+                    self.storage.finish_game(game_id, session.winner)
+                    losers = [player for player in session.players if player != session.winner]
+                    queued |= self.record_result(f"{game_id}:winner", [session.winner], losers)
+                    if self.is_leader:
+                        self.schedule_turn_timeout(game_id)
+            if queued:
+                self.results_ready.set()
 
         return success, msg 
     
+    def start_game(self, snapshot, persist=True):
+        session = GameSession.from_snapshot(snapshot)
+        self.active_games[snapshot.game_id] = session
+        # a replica may already have the game from its last database sync
+        if persist and not self.storage.get_game_state(snapshot.game_id)["game"]:
+            self._persist_game(snapshot.game_id, session)
+        return True, "Game started"
+
+    def replay_log(self):
+        """
+        Rebuild the games from the snapshot and log entries left on disk by a
+        previous run. Only decided entries are applied; a follower keeps the
+        rest until the leader decides them.
+        """
+        for snapshot in self.log.snapshot_games:
+            self.load_game(snapshot)
+        committed = self.log.committed
+        for index, command in self.log:
+            if index > committed:
+                self.uncommitted[index] = command
+            elif command.WhichOneof("op") is not None:
+                self.apply_command(command, persist=False)
+
+        self.commit_index = committed
+        self.last_logged = max(committed, self.log.last_index)
+        self.next_log_index = self.last_logged + 1
+        if self.commit_index >= 0:
+            print(f"[Log] Replayed {len(self.active_games)} games through log index {self.commit_index}.")
+        if self.is_leader:
+            self.abort_undecided()
+            for game_id in list(self.active_games):
+                self.schedule_turn_timeout(game_id)
+
+    def compact_log(self, force=False):
+        """
+        Fold the committed part of the log into a snapshot of every game once it
+        holds LOG_COMPACTION_THRESHOLD entries. The database needs no copy of its
+        own: it is already durable, so a checkpoint is all the snapshot takes.
+        Returns the snapshot's index and games.
+        """
+        # apply_lock keeps the leader from applying the next entry while we copy the games
+        with self.log_lock, self.apply_lock:
+            if force or self.commit_index - self.log.snapshot_index >= LOG_COMPACTION_THRESHOLD:
+                # finished games are left out; their results are already in the database
+                games = [session.to_snapshot() for session in list(self.active_games.values()) if not session.winner]
+                self.log.compact(self.commit_index, games)
+                self.storage.checkpoint()
+            return self.log.snapshot_index, self.log.snapshot_games
+
+    def send_snapshot(self, replica_stub, through=-1):
+        """
+        Leader: bring a replica that fell behind the log up to date with a fresh
+        snapshot covering at least log index `through`, the last entry its
+        replicator dropped. Returns the index it covers, or None if the
+        transfer failed or `through` was not decided in time.
+        """
+        with self.leader_applied:
+            if not self.leader_applied.wait_for(lambda: self.commit_index >= through, REPLICATION_TIMEOUT):
+                return None
+        index, games = self.compact_log(force=True)
+
+        def chunks():
+            # the games go in batches so no chunk nears the message size limit
+            yield pb.SnapshotChunk(last_included_index=index, games=games[:GAMES_PER_MESSAGE])
+            for start in range(GAMES_PER_MESSAGE, len(games), GAMES_PER_MESSAGE):
+                yield pb.SnapshotChunk(games=games[start:start + GAMES_PER_MESSAGE])
+            for data, sha256 in self.storage.snapshot_chunks():
+                yield pb.SnapshotChunk(data=data, sha256=sha256)
+
+        try:
+            res = replica_stub.InstallSnapshot(chunks(), timeout=INSTALL_SNAPSHOT_TIMEOUT)
+        except grpc.RpcError as e:
+            print(f"[Leader] Failed to install snapshot: {e}")
+            return None
+        return index if res.status == "success" else None
+
+    def schedule_turn_timeout(self, game_id, not_before=0):
+        """
+        Leader: arm the auto-pass deadline for the current turn of a game or,
+        once the game is won, the time it leaves active_games.
+        """
+        session = self.active_games.get(game_id)
+        if not session:
+            return
+        if session.winner:
+            self.turn_timer.schedule(game_id, time.time() + FINISHED_GAME_TTL, lambda: self.drop_game(game_id))
+            return
+        deadline = max(session.turn_deadline(), not_before)
+        self.turn_timer.schedule(game_id, deadline, lambda: self.on_turn_timeout(game_id))
+
+    def drop_game(self, game_id):
+        """
+        Leader: forget a finished game. Its result is in the database and it is
+        left out of snapshots; followers drop it at their next SyncGames.
+        """
+        if not self.is_leader:
+            return
+        session = self.active_games.get(game_id)
+        if not session or not session.winner:
+            return
+        del self.active_games[game_id]
+
+    def on_turn_timeout(self, game_id):
+        if not self.is_leader:
+            return
+        session = self.active_games.get(game_id)
+        if not session or session.winner:
+            return
+
+        if time.time() < session.turn_deadline():
+            # the turn moved on since this deadline was set
+            self.schedule_turn_timeout(game_id)
+            return
+
+        current_player = session.get_current_player()
+        print(f"[AutoPass] {current_player} took too long. Auto-passing.")
+        command = pb.Command(pass_turn=pb.GameActionRequest(username=current_player, game_id=game_id))
+        success, _ = self.replicate_and_apply(command)
+        self.schedule_turn_timeout(game_id, not_before=0 if success else time.time() + AUTO_PASS_RETRY_SECONDS)
+
     def _persist_game(self, game_id, session: GameSession):
-        self.storage.create_game(game_id)
-        for player in session.players:
-            self.storage.add_player_to_game(
-                game_id,
-                player,
-                session.hands[player]
-            )
+        with self.storage.transaction():
+            self.storage.create_game(game_id)
+            for player, hand in zip(session.players, session.hands):
+                self.storage.add_player_to_game(
+                    game_id,
+                    player,
+                    hand
+                )
 
 
 
@@ -174,21 +787,29 @@ class CardGameService(stub.CardGameServiceServicer):
             return pb.Response(status="error", message="Leader unavailable")
         
     def initiate_election(self):
-        self.state = "candidate"
-        self.current_term += 1
-        self.voted_for = f"{self.ip}:{self.port}"
+        request, majority = self.start_election()
         votes = 1
-        majority = (len(self.replica_addresses) + 1) // 2 + 1
 
         for addr in self.replica_addresses:
             try:
-                replica_stub = stub.CardGameServiceStub(grpc.insecure_channel(addr))
-                res = replica_stub.RequestVote(pb.VoteRequest(term=self.current_term, candidate_id=f"{self.ip}:{self.port}"))
+                replica_stub = self.channels.stub(addr)
+                res = replica_stub.RequestVote(request)
                 if res.vote_granted:
                     votes += 1
             except grpc.RpcError:
                 continue
 
+        self.finish_election(votes, majority)
+
+    def start_election(self):
+        """Become a candidate for the next term; returns the vote request and the votes needed."""
+        self.state = "candidate"
+        self.current_term += 1
+        self.voted_for = f"{self.ip}:{self.port}"
+        majority = (len(self.replica_addresses) + 1) // 2 + 1
+        return pb.VoteRequest(term=self.current_term, candidate_id=self.voted_for), majority
+
+    def finish_election(self, votes, majority):
         if votes >= majority:
             print(f"[Election] Won with {votes} votes. Becoming leader.")
             self.become_leader()
@@ -197,40 +818,138 @@ class CardGameService(stub.CardGameServiceServicer):
             self.state = "follower"
 
     def become_leader(self):
+        # continue numbering after the entries we already applied as a follower
+        with self.log_lock, self.apply_lock:
+            self.abort_undecided()
         self.is_leader = True
         self.state = "leader"
         self.voted_for = None
         self.last_heartbeat = time.time()
+        for game_id in list(self.active_games):
+            self.schedule_turn_timeout(game_id)
 
+        self.leader_address = self.leader_id = f"{self.ip}:{self.port}"
+        self.leader_stub = None
         for addr in self.replica_addresses:
             try:
-                replica_stub = stub.CardGameServiceStub(grpc.insecure_channel(addr))
-                replica_stub.AnnounceLeader(pb.CoordinatorMessage(new_leader_address=f"{self.ip}:{self.port}"))
-                self.leader_address = f"{self.ip}:{self.port}"
-                self.leader_stub = None
+                replica_stub = self.channels.stub(addr)
+                replica_stub.AnnounceLeader(pb.CoordinatorMessage(new_leader_address=self.leader_address))
             except grpc.RpcError:
                 continue
-        
+
+        self.connect_replicas()
+        self.prune_channels()
         self.broadcast_replica_list()
 
     def pull_games_from_leader(self):
         if self.is_leader:
             return
 
+        more = True
+        while more:
+            try:
+                res = self.leader_stub.SyncGames(pb.GameSyncRequest(known_versions=self.game_versions()))
+            except grpc.RpcError as e:
+                print(f"[Replica] Failed to pull games from leader: {e}")
+                return
+            self.apply_game_sync(res)
+            more = res.status == "success" and res.more
+
+    def load_game(self, snapshot):
+        """Take the leader's copy of a game, creating it if we do not have it yet."""
+        session = self.active_games.get(snapshot.game_id)
+        if session:
+            session.apply_snapshot(snapshot)
+        else:
+            self.active_games[snapshot.game_id] = GameSession.from_snapshot(snapshot)
+
+    def game_versions(self):
+        return {gid: session.version for gid, session in list(self.active_games.items())}
+
+    def apply_game_sync(self, res):
+        if res.status != "success":
+            return
+
+        for snapshot in res.games:
+            self.load_game(snapshot)
+        for gid in res.removed_game_ids:
+            self.active_games.pop(gid, None)
+
+        if res.games or res.removed_game_ids:
+            print(f"[Replica] Synced {len(res.games)} changed and {len(res.removed_game_ids)} removed games from leader.")
+
+
+    def sync_database_from_leader(self):
         try:
-            res = self.leader_stub.SyncAllGames(Empty())
-            if res.status == "success":
-                games_data = json.loads(res.message)
-                self.active_games.clear()
-                for gid, session_dict in games_data.items():
-                    self.active_games[gid] = GameSession.deserialize(session_dict)
-                print("[Replica] Synced games from leader.")
+            chunks = self.leader_stub.StreamDatabase(Empty())
+            result = self.storage.restore_snapshot(
+                (chunk.data, chunk.sha256) for chunk in chunks if chunk.status == "success"
+            )
         except grpc.RpcError as e:
-            print(f"[Replica] Failed to pull games from leader: {e}")
+            if e.code() != grpc.StatusCode.UNIMPLEMENTED:
+                raise
+            # leader predates StreamDatabase
+            response = self.leader_stub.SyncDatabase(Empty())
+            result = {"status": response.status}
+            if response.status == "success":
+                self.storage.restore(response.database_dump)
+
+        if result["status"] == "success":
+            print(f"[Replica] Synced database from leader.")
+        else:
+            print(f"[Replica] Failed to sync database. {result.get('message', '')}")
 
+    def learn_leader_id(self):
+        """Follower: ask our leader how it names itself, so its heartbeats can be told apart from a stale leader's."""
+        try:
+            res = self.leader_stub.WhoIsLeader(Empty(), timeout=HEARTBEAT_TIMEOUT)
+        except grpc.RpcError:
+            return
+        if res.is_leader:
+            self.leader_id = res.leader_address
 
     def Heartbeat(self, request, context):
+        # only our own leader's commit index says how far behind we are
+        if request.leader_address and request.leader_address == self.leader_id and not self.is_leader:
+            if request.HasField("commit"):
+                with self.applied:
+                    self.follow_commit(request.commit)
+            # received a network delay after the leader sent it; close enough for a staleness bound
+            self.renew_read_lease(request.commit_index, time.time())
         return pb.Response(status="alive", message="Heartbeat OK")
+
+    def renew_read_lease(self, commit_index, reported_at):
+        if reported_at > self.read_lease[1]:
+            self.read_lease = (commit_index, reported_at)
+
+    def can_serve_read(self, max_staleness):
+        """
+        Follower: whether our games are at most `max_staleness` seconds behind
+        the leader. That holds once we have applied everything the leader had
+        committed at some point in the last `max_staleness` seconds. The latest
+        heartbeat usually tells us such a point; otherwise we ask the leader for
+        its commit index (ReadIndex) and wait to apply up to it.
+        """
+        index, reported_at = self.read_lease
+        if time.time() - reported_at <= max_staleness and self.commit_index >= index:
+            return True
+
+        asked_at = time.time()
+        try:
+            res = self.leader_stub.ReadIndex(Empty(), timeout=HEARTBEAT_TIMEOUT)
+        except grpc.RpcError:
+            return False
+        if res.status != "success":
+            return False
+        self.renew_read_lease(res.commit_index, asked_at)
+        with self.applied:
+            self.follow_commit(res.commit)
+            return self.applied.wait_for(lambda: self.commit_index >= res.commit_index, READ_INDEX_TIMEOUT)
+
+    def ReadIndex(self, request, context):
+        if not self.is_leader:
+            return pb.ReadIndexResponse(status="error")
+        return pb.ReadIndexResponse(status="success", commit_index=self.commit_index, commit=self.commit_info())
     
     def RegisterReplica(self, request, context):
         if not self.is_leader:
@@ -241,7 +960,7 @@ class CardGameService(stub.CardGameServiceServicer):
 
         if new_replica_address not in self.replica_addresses:
             self.replica_addresses.append(new_replica_address)
-            self.replicas.append(stub.CardGameServiceStub(grpc.insecure_channel(new_replica_address)))
+            self.add_replica_stub(new_replica_address)
             self.broadcast_replica_list(exclude_address=new_replica_address)
 
 
@@ -256,6 +975,8 @@ class CardGameService(stub.CardGameServiceServicer):
 
         print(f"[Replica] Updating replica list: {new_list}")
         self.replica_addresses = new_list
+        if not self.is_leader:
+            self.prune_channels()
         return pb.Response(status="success", message="Replica list updated.")
 
     def broadcast_replica_list(self, exclude_address=None):
@@ -267,7 +988,7 @@ class CardGameService(stub.CardGameServiceServicer):
                 continue  # Skip the newly joined replica
 
             try:
-                replica_stub = stub.CardGameServiceStub(grpc.insecure_channel(addr))
+                replica_stub = self.channels.stub(addr)
                 replica_stub.UpdateReplicaList(pb.ReplicaListUpdateRequest(replica_addresses_json=replica_list_json))
             except grpc.RpcError as e:
                 print(f"[Leader] Failed to update replica {addr}: {e}")
@@ -277,61 +998,371 @@ class CardGameService(stub.CardGameServiceServicer):
     def WhoIsLeader(self, request, context):
         return pb.LeaderInfoResponse(
             leader_address=f"{self.ip}:{self.port}" if self.is_leader else self.leader_address,
-            is_leader=self.is_leader
+            is_leader=self.is_leader,
+            replica_addresses=self.replica_addresses
         )
 
     def Login(self, request, context):
-        response = self.storage.login_register_user(request.username, request.password)
-        if response["status"] == "success":
+        group = home_group(request.username, self.group_count)
+        if group != self.group:
+            # the account lives in the user's home group
+            res = self.call_group(group, "Login", request) or pb.Response(status="error", message="Leader unavailable")
+        else:
+            response = self.storage.login_register_user(request.username, request.password)
+            res = pb.Response(status=response["status"], message=response.get("message", ""))
+        if res.status == "success":
             self.online_users[request.username] = True
-        return pb.Response(status=response["status"], message=response.get("message", ""))
+        return res
 
     def Logout(self, request, context):
         self.online_users.pop(request.username, None)
         return pb.Response(status="success", message="User logged out.")
     
     def AppendLog(self, request, context):
-        command = eval(request.payload) 
-        self.log.append((request.index, command))
+        """
+        Log an entry in index order and ack it once it is on disk. It is
+        applied only once the leader's commit info says it was decided, and
+        never if it was aborted. An entry that overtook earlier ones waits up
+        to ENTRY_GAP_TIMEOUT for them.
+        """
+        with self.applied:
+            if request.index <= self.commit_index:
+                # a retry of an entry we already applied
+                return pb.Response(status="success", message="Already applied")
+
+            if request.first_entry:
+                # first entry this leader sent us; our games were synced up to here
+                self.restart_log(request.index - 1)
+            if request.index > self.last_logged:
+                self.pending_entries[request.index] = request.command
+
+            # entries may arrive out of order when pipelined; log them in index order
+            while self.last_logged + 1 in self.pending_entries:
+                self.last_logged += 1
+                command = self.pending_entries.pop(self.last_logged)
+                if self.last_logged in self.aborted_ahead:
+                    self.aborted_ahead.discard(self.last_logged)
+                    command = pb.Command()
+                self.log.append(self.last_logged, command)
+                self.uncommitted[self.last_logged] = command
+                self.applied.notify_all()
+
+            in_step = not request.HasField("commit") or self.follow_commit(request.commit)
+            if not self.applied.wait_for(lambda: self.last_logged >= request.index, ENTRY_GAP_TIMEOUT):
+                return pb.Response(status="error", message="Waiting for earlier entries")
+
+        # ours is among the records written so far
+        self.log.sync()
+        self.compact_log()
+        return pb.Response(status="success", message="Appended" if in_step else SNAPSHOT_REQUESTED)
+
+    def restart_log(self, index):
+        """
+        Follower: a leader starts a new stream of entries after `index`, with
+        our games synced up to there. What we logged up to it but never
+        applied came from an older stream and is aborted; what we logged
+        after it is about to be sent again and is dropped.
+        """
+        if self.log.last_index > index:
+            self.log.truncate(index)
+        for i, command in self.log.entries_after(self.commit_index):
+            if command.WhichOneof("op") is not None:
+                self.log.abort(i)
+        self.uncommitted = {}
+        self.pending_entries = {i: c for i, c in self.pending_entries.items() if i > index}
+        self.aborted_ahead = {i for i in self.aborted_ahead if i > index}
+        self.commit_index = self.last_logged = self.leader_commit = index
+        self.log.mark_committed(index)
+
+    def follow_commit(self, commit):
+        """
+        Follower, holding log_lock: apply the entries the leader has decided,
+        in index order, skipping the ones it aborted. Returns False when the
+        leader no longer remembers which of our undecided entries it aborted;
+        only a snapshot can bring us up to date then.
+        """
+        if commit.index <= self.commit_index:
+            return True
+        if commit.aborted_since > self.commit_index:
+            return False
 
-        if request.index > self.commit_index:
-            self.commit_index = request.index
-            self.apply_command(command)
-        return pb.Response(status="success", message="Appended")
+        for index in commit.aborted:
+            if index <= self.commit_index or index in self.log.aborted:
+                continue
+            if index <= self.last_logged:
+                self.log.abort(index)
+                self.uncommitted[index] = pb.Command()
+            else:
+                self.aborted_ahead.add(index)
+
+        self.leader_commit = max(self.leader_commit, commit.index)
+        start = self.commit_index
+        while self.commit_index < min(self.leader_commit, self.last_logged):
+            self.commit_index += 1
+            command = self.uncommitted.pop(self.commit_index)
+            if command.WhichOneof("op") is not None:
+                self.apply_command(command)
+        if self.commit_index > start:
+            self.log.mark_committed(self.commit_index)
+            self.applied.notify_all()
+        return True
+
+    def InstallSnapshot(self, request_iterator, context):
+        if self.is_leader:
+            return pb.Response(status="error", message="Leader does not install snapshots")
+
+        chunks = iter(request_iterator)
+        header = next(chunks, None)
+        if header is None:
+            return pb.Response(status="error", message="Empty snapshot")
+        snapshots = list(header.games)
+        chunk = next(chunks, None)
+        while chunk is not None and chunk.games:
+            snapshots.extend(chunk.games)
+            chunk = next(chunks, None)
+        if chunk is not None:
+            chunks = itertools.chain([chunk], chunks)
+
+        with self.applied:
+            result = self.storage.restore_snapshot((chunk.data, chunk.sha256) for chunk in chunks)
+            if result["status"] != "success":
+                return pb.Response(status="error", message=result["message"])
+
+            games = {}
+            for snapshot in snapshots:
+                session = self.active_games.get(snapshot.game_id)
+                if session:
+                    session.apply_snapshot(snapshot)
+                else:
+                    session = GameSession.from_snapshot(snapshot)
+                games[snapshot.game_id] = session
+            self.active_games = games
+
+            self.commit_index = header.last_included_index
+            # entries logged after the snapshot stay in the log, still waiting for the leader's decision
+            kept = sorted(((i, c) for i, c in self.uncommitted.items() if i > self.commit_index), key=lambda e: e[0])
+            self.log.reset(self.commit_index, snapshots)
+            for i, command in kept:
+                self.log.append(i, command)
+            self.uncommitted = dict(kept)
+            self.last_logged = max(self.last_logged, self.commit_index)
+            self.leader_commit = max(self.leader_commit, self.commit_index)
+            self.pending_entries = {i: c for i, c in self.pending_entries.items() if i > self.commit_index}
+            self.aborted_ahead = {i for i in self.aborted_ahead if i > self.commit_index}
+            self.applied.notify_all()
+
+        print(f"[Replica] Installed snapshot through log index {header.last_included_index}.")
+        return pb.Response(status="success", message="Snapshot installed")
 
     def DeleteAccount(self, request, context):
-        response = self.storage.delete_account(request.username, request.password)
+        group = home_group(request.username, self.group_count)
+        if group != self.group:
+            res = self.call_group(group, "DeleteAccount", request) or pb.Response(status="error", message="Leader unavailable")
+        else:
+            response = self.storage.delete_account(request.username, request.password)
+            res = pb.Response(status=response["status"], message=response["message"])
         self.online_users.pop(request.username, None)
-        return pb.Response(status=response["status"], message=response["message"])
+        return res
 
     def StartMatch(self, request, context):
         if not self.is_leader:
             return pb.Response(status="error", message="Only leader can start matches")
-
-        num = request.num_players
-        if num not in self.match_queue:
+        if self.group != MATCHMAKING_GROUP:
+            # one queue for the whole cluster, so players of different groups meet
+            return self.call_group(MATCHMAKING_GROUP, "StartMatch", request) or pb.Response(status="error", message="Leader unavailable")
+        if not self.match_queue.accepts(request.num_players):
             return pb.Response(status="error", message="Invalid player count")
 
-        if request.username in self.match_results:
-            game_id = self.match_results.pop(request.username)
-            return pb.Response(status="success", message=f"Game ready! ID: {game_id}")
+        status, message, _ = self.join_match(request.username, request.num_players)
+        return pb.Response(status=status, message=message)
+
+    def WaitForMatch(self, request, context):
+        """
+        Queue the player and hold the stream open until their game is ready,
+        then send its id. Closing the stream early takes the player out of the
+        queue, so nothing is left behind for them in match_results. Like
+        SubscribeGameState it holds a worker, so it shares the MAX_STREAMS
+        cap; a refused client polls StartMatch instead.
+        """
+        if not self.stream_slots.acquire(blocking=False):
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Too many open streams")
+        try:
+            yield from self._wait_for_match(request, context)
+        finally:
+            self.stream_slots.release()
+
+    def _wait_for_match(self, request, context):
+        if not self.is_leader:
+            yield pb.MatchUpdate(status="error", message="Only leader can start matches")
+            return
+        if self.group != MATCHMAKING_GROUP:
+            yield from self.relay_wait_for_match(request, context)
+            return
+        if not self.match_queue.accepts(request.num_players):
+            yield pb.MatchUpdate(status="error", message="Invalid player count")
+            return
+
+        changed = threading.Event()
+        wake = changed.set
+        self.add_match_listener(wake)
+        context.add_callback(wake)
+        last_message = None
+        try:
+            while context.is_active():
+                changed.clear()
+                status, message, game_id = self.join_match(request.username, request.num_players)
+                if status == "success":
+                    yield pb.MatchUpdate(status=status, message=message, game_id=game_id)
+                    return
+                if status == "error":
+                    # the table was requeued; the stream keeps waiting for the next try
+                    status, message = "waiting", "Failed to start game. Retrying..."
+                if message != last_message:
+                    yield pb.MatchUpdate(status=status, message=message)
+                    last_message = message
+                changed.wait(MATCH_RECHECK_SECONDS)
+        finally:
+            self.remove_match_listener(wake)
+            self.leave_match(request.username)
+
+    def relay_wait_for_match(self, request, context):
+        """Pass on the updates of a WaitForMatch held with the matchmaking group's leader."""
+        leader = self.group_leader(MATCHMAKING_GROUP)
+        if not leader:
+            yield pb.MatchUpdate(status="error", message="Leader unavailable")
+            return
+        updates = self.channels.stub(leader).WaitForMatch(request)
+        # the player leaving ends the upstream stream too, which takes them out of the queue
+        context.add_callback(updates.cancel)
+        try:
+            yield from updates
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.RESOURCE_EXHAUSTED:
+                context.abort(e.code(), e.details())
+            self.routes.pop(MATCHMAKING_GROUP, None)
+            yield pb.MatchUpdate(status="error", message="Leader unavailable")
 
-        if request.username not in self.match_queue[num]:
-            self.match_queue[num].append(request.username)
+    def add_match_listener(self, callback):
+        with self.match_lock:
+            self.match_listeners = self.match_listeners + [callback]
 
-        if len(self.match_queue[num]) == num:
-            players = self.match_queue[num]
-            self.match_queue[num] = []
-            game_id = str(uuid.uuid4())[:8]
-            session = GameSession(game_id, players)
+    def remove_match_listener(self, callback):
+        with self.match_lock:
+            self.match_listeners = [c for c in self.match_listeners if c is not callback]
 
-            self.active_games[game_id] = GameSession(game_id, players)
-            self._persist_game(game_id, session)
+    def join_match(self, username, num):
+        """
+        Queue a player for a table of `num`, or report on their game if one was
+        started for them, and start a game once the queue fills.
+        Returns (status, message, game_id), game_id set only with "success".
+        """
+        with self.match_lock:
+            if username in self.match_results:
+                game_id = self.match_results[username]
+                if game_id is None:
+                    return "waiting", "Setting up your game...", ""
+                del self.match_results[username]
+                return "success", f"Game ready! ID: {game_id}", game_id
+
+            self.match_queue.enqueue(username, num)
+            # with the batch matchmaker, tables are formed on its tick instead
+            players = None if self.matchmaker else self.match_queue.take(num)
+            if not players:
+                return "waiting", "Waiting for more players...", ""
 
             for player in players:
-                self.match_results[player] = game_id
+                self.match_results[player] = None
+
+        # replicated outside the lock so other players can queue and poll meanwhile
+        game_id = str(uuid.uuid4())[:8]
+        success = self.create_game(GameSession(game_id, players))
+
+        with self.match_lock:
+            self.settle_match(players, num, game_id if success else None)
+            listeners = self.match_listeners
+        for callback in listeners:
+            callback()
+
+        if not success:
+            return "error", "Failed to start game", ""
+        return "waiting", "Waiting for more players...", ""
 
-        return pb.Response(status="waiting", message="Waiting for more players...")
+    def settle_match(self, players, num, game_id, joined_at=None):
+        """
+        Under match_lock: record the game started for a table, or put its
+        players back in the queue if game_id is None. Players who left while
+        the game was being set up get no result and are not requeued.
+        """
+        abandoned = self.match_abandoned.intersection(players)
+        self.match_abandoned -= abandoned
+        if game_id:
+            for player in players:
+                if player in abandoned:
+                    del self.match_results[player]
+                else:
+                    self.match_results[player] = game_id
+        else:
+            for player in players:
+                self.match_results.pop(player, None)
+            self.match_queue.requeue([p for p in players if p not in abandoned], num, joined_at)
+
+    def leave_match(self, username):
+        """Forget a player who stopped waiting: out of the queue, and no game result kept for them."""
+        with self.match_lock:
+            self.match_queue.cancel(username)
+            if username in self.match_results:
+                if self.match_results[username] is None:
+                    # their game is still being set up; drop the result when it lands
+                    self.match_abandoned.add(username)
+                else:
+                    del self.match_results[username]
+
+    def CancelMatch(self, request, context):
+        if not self.is_leader:
+            return pb.Response(status="error", message="Only leader can cancel matches")
+        if self.group != MATCHMAKING_GROUP:
+            return self.call_group(MATCHMAKING_GROUP, "CancelMatch", request) or pb.Response(status="error", message="Leader unavailable")
+
+        with self.match_lock:
+            if self.match_queue.cancel(request.username):
+                return pb.Response(status="success", message="Left the match queue")
+            if request.username in self.match_results:
+                return pb.Response(status="error", message="Already matched")
+        return pb.Response(status="error", message="Not waiting for a match")
+
+    def CreateGame(self, request, context):
+        if not self.is_leader:
+            return pb.Response(status="error", message="Not the leader")
+        if group_for(request.game_id, self.group_count) != self.group:
+            return pb.Response(status="error", message="Game belongs to another group")
+
+        success, msg = self.replicate_and_apply(pb.Command(start_game=request))
+        if success:
+            self.schedule_turn_timeout(request.game_id)
+        return pb.Response(status="success" if success else "error", message=msg)
+
+    def GetRoutingTable(self, request, context):
+        return self.routing_table()
+
+    def RecordResult(self, request, context):
+        if not self.is_leader:
+            return pb.Response(status="error", message="Not the leader")
+        if any(home_group(u, self.group_count) != self.group for u in list(request.winners) + list(request.losers)):
+            return pb.Response(status="error", message="Player belongs to another group")
+
+        success, msg = self.replicate_and_apply(pb.Command(record_result=request))
+        return pb.Response(status="success" if success else "error", message=msg)
+
+    def GetWinRates(self, request, context):
+        return pb.WinRateResponse(
+            status="success",
+            win_rates=[self.storage.get_win_rate(username) for username in request.usernames]
+        )
+
+    def GetMatchmakingStats(self, request, context):
+        if not self.is_leader or not self.matchmaker:
+            return pb.MatchmakingStats(status="error")
+        return self.matchmaker.stats()
 
     def AcceptMatch(self, request, context):
         if request.game_id not in self.active_games:
@@ -344,12 +1375,7 @@ class CardGameService(stub.CardGameServiceServicer):
         if not self.is_leader:
             return self.forward_to_leader("PlayCard", request)
 
-        command = {
-            "type": "play_card",
-            "username": request.username,
-            "game_id": request.game_id,
-            "cards": list(request.cards)
-        }
+        command = pb.Command(play_card=request)
         success, msg = self.replicate_and_apply(command)
         return pb.Response(status="success" if success else "error", message=msg)
 
@@ -357,20 +1383,8 @@ class CardGameService(stub.CardGameServiceServicer):
         if not self.is_leader:
             return self.leader_stub.PassTurn(request)
 
-        session = self.active_games.get(request.game_id)
-        if not session:
-            return pb.Response(status="error", message="Game not found")
-
-        success, msg = session.pass_turn(request.username)
-
-        if success:
-            # replicate to replicas
-            for replica in self.replicas:
-                try:
-                    replica.PassTurn(request)
-                except grpc.RpcError as e:
-                    print(f"[Replication] Failed to replicate PassTurn to replica: {e}")
-
+        command = pb.Command(pass_turn=request)
+        success, msg = self.replicate_and_apply(command)
         return pb.Response(status="success" if success else "error", message=msg)
 
 
@@ -378,41 +1392,38 @@ class CardGameService(stub.CardGameServiceServicer):
         if not self.is_leader:
             return self.leader_stub.QuitGame(request)
 
-        session = self.active_games.get(request.game_id)
-        if not session:
-            return pb.Response(status="error", message="Game not found")
-
-        success, msg = session.quit_game(request.username)
-        if success:
-            self.storage.quit_game(request.game_id, request.username)
-
-            if session.winner:
-                self.storage.declare_winner(request.game_id, session.winner)
-
-            for replica in self.replicas:
-                try:
-                    replica.QuitGame(request)
-                except grpc.RpcError as e:
-                    print(f"[Replication] Failed to replicate QuitGame: {e}")
-
+        command = pb.Command(quit_game=request)
+        success, msg = self.replicate_and_apply(command)
         return pb.Response(status="success" if success else "error", message=msg)
 
 
 
-    def GetGameState(self, request, context):
-        session = self.active_games.get(request.game_id)
-        if not session:
-            return pb.GameStateResponse(status="error", message="Invalid game ID")
-
-        state = session.get_game_state()
+    def _build_game_state(self, session, username):
+        """
+        The GameStateResponse for one viewer, built once per session version
+        and reused by every poll until the session or a win rate changes.
+        Only countdown_seconds is refreshed each time.
+        """
+        key = (session.version, self.storage.stats_version, self.win_rates_version)
+        views = session.views
+        if views is None or views[0] != key:
+            views = session.views = (key, {})
+        response = views[1].get(username)
+        if response is None:
+            # the state may be newer than key; the next poll then just rebuilds it
+            response = views[1][username] = self._game_state_response(session.get_game_state(), username)
+        response.countdown_seconds = session.get_countdown()
+        return response
+
+    def _game_state_response(self, state, username):
         players = []
         for user in state["players"]:
             hand = state["hands"].get(user, [])
             players.append(pb.PlayerInfo(
                 username=user,
                 card_count=len(hand),
-                cards=hand if user == request.username else [],
-                win_rate=self.storage.get_win_rate(user),
+                cards=hand if user == username else [],
+                win_rate=self.win_rate(user),
                 is_connected=True,
                 is_current_turn=(user == state["current_turn"])
             ))
@@ -427,6 +1438,51 @@ class CardGameService(stub.CardGameServiceServicer):
             game_over=bool(state["winner"]),
             winner=state["winner"] or ""
         )
+
+    def GetGameState(self, request, context):
+        if not self.is_leader and not self.can_serve_read(request.max_staleness_seconds):
+            # too far behind to answer within the caller's bound
+            try:
+                return self.leader_stub.GetGameState(request)
+            except grpc.RpcError:
+                return pb.GameStateResponse(status="error", message="Leader unavailable")
+
+        session = self.active_games.get(request.game_id)
+        if not session:
+            return pb.GameStateResponse(status="error", message="Invalid game ID")
+
+        return self._build_game_state(session, request.username)
+
+    def SubscribeGameState(self, request, context):
+        """
+        Stream the game state to one player: a new response whenever the session
+        changes, and one every STATE_TICK_SECONDS otherwise so the countdown moves.
+        A follower ends the stream with an error once it falls more than
+        max_staleness_seconds behind, so the client can move to the leader.
+        Every stream holds a worker, so past MAX_STREAMS new ones are refused
+        with RESOURCE_EXHAUSTED and the client polls GetGameState instead.
+        """
+        if not self.stream_slots.acquire(blocking=False):
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Too many open streams")
+        try:
+            while context.is_active():
+                if not self.is_leader and not self.can_serve_read(request.max_staleness_seconds):
+                    yield pb.GameStateResponse(status="error", message=STALE_REPLICA_MESSAGE)
+                    return
+                session = self.active_games.get(request.game_id)
+                if not session:
+                    yield pb.GameStateResponse(status="error", message="Invalid game ID")
+                    return
+
+                version = session.version
+                state = self._build_game_state(session, request.username)
+                yield state
+                if state.game_over:
+                    return
+
+                session.wait_for_change(version, STATE_TICK_SECONDS)
+        finally:
+            self.stream_slots.release()
     
     def SyncAllGames(self, request, context):
         if not self.is_leader:
@@ -439,16 +1495,41 @@ class CardGameService(stub.CardGameServiceServicer):
             message=json.dumps(games_data)
         )
     
+    def SyncGames(self, request, context):
+        if not self.is_leader:
+            return pb.GameSyncResponse(status="error")
+
+        known = request.known_versions
+        changed = (session for gid, session in list(self.active_games.items()) if known.get(gid) != session.version)
+        # a page at a time; the follower asks again for the rest
+        page = list(itertools.islice(changed, GAMES_PER_MESSAGE + 1))
+        removed = [gid for gid in known if gid not in self.active_games]
+        return pb.GameSyncResponse(
+            status="success",
+            games=[session.to_snapshot() for session in page[:GAMES_PER_MESSAGE]],
+            removed_game_ids=removed,
+            more=len(page) > GAMES_PER_MESSAGE
+        )
+
     def SyncDatabase(self, request, context):
         if not self.is_leader:
             return pb.SyncDatabaseResponse(status="error", database_dump=b"")
 
+        self.storage.checkpoint()
         with open(self.storage.db_name, "rb") as f:
             db_bytes = f.read()
         return pb.SyncDatabaseResponse(status="success", database_dump=db_bytes)
 
 
     
+    def StreamDatabase(self, request, context):
+        if not self.is_leader:
+            yield pb.DatabaseChunk(status="error")
+            return
+
+        for data, sha256 in self.storage.snapshot_chunks():
+            yield pb.DatabaseChunk(status="success", data=data, sha256=sha256)
+
     def RequestVote(self, request, context):
         if request.term < self.current_term:
             return pb.VoteResponse(term=self.current_term, vote_granted=False)
@@ -464,21 +1545,29 @@ class CardGameService(stub.CardGameServiceServicer):
 
     def AnnounceLeader(self, request, context):
         print(f"[Election] New leader announced: {request.new_leader_address}")
-        self.leader_address = request.new_leader_address
-        self.leader_channel = grpc.insecure_channel(self.leader_address)
-        self.leader_stub = stub.CardGameServiceStub(self.leader_channel)
+        self.leader_address = self.leader_id = request.new_leader_address
+        self.leader_stub = self.channels.stub(self.leader_address)
         self.is_leader = False
         self.state = "follower"
+        for replicator in self.replicators.values():
+            replicator.stop()
+        self.replicators = {}
+        self.drop_decided()
+        self.prune_channels()
         return pb.Response(status="success", message="Leader updated.")
 
 
-def serve(is_leader=False, leader_address=None, replica_addresses=None, port=50051):
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+def serve(is_leader=False, leader_address=None, replica_addresses=None, port=50051, group=0, group_members=None,
+          match_tick=0):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=MAX_WORKERS), options=SERVER_OPTIONS)
     card_service = CardGameService(
         port=port,
         is_leader=is_leader,
         leader_address=leader_address,
-        replica_addresses=replica_addresses
+        replica_addresses=replica_addresses,
+        group=group,
+        group_members=group_members,
+        match_tick=match_tick
     )
     stub.add_CardGameServiceServicer_to_server(card_service, server)
     server.add_insecure_port(f"0.0.0.0:{port}")
@@ -499,11 +1588,34 @@ if __name__ == "__main__":
     parser.add_argument('--port', type=int, default=50051)
     parser.add_argument('--leader_address', type=str, default="127.0.0.1:50051")
     parser.add_argument('--replicas', nargs='*', default=[])
+    parser.add_argument('--async', dest='use_async', action='store_true', help="Serve on a grpc.aio event loop")
+    parser.add_argument('--group', type=int, default=0, help="Raft group this server belongs to")
+    parser.add_argument('--groups', nargs='*', default=[],
+                        help="One comma-separated list of member addresses per group, in group order")
+    parser.add_argument('--match_tick', type=float, default=0,
+                        help="Form games in batches every this many seconds, by win rate (needs numpy)")
     args = parser.parse_args()
-
-    serve(
-        is_leader=args.leader,
-        leader_address=args.leader_address,
-        replica_addresses=args.replicas,
-        port=args.port
-    )
\ No newline at end of file
+    group_members = [members.split(",") for members in args.groups]
+
+    if args.use_async:
+        import asyncio
+        from aio_server import serve_async
+        asyncio.run(serve_async(
+            is_leader=args.leader,
+            leader_address=args.leader_address,
+            replica_addresses=args.replicas,
+            port=args.port,
+            group=args.group,
+            group_members=group_members,
+            match_tick=args.match_tick
+        ))
+    else:
+        serve(
+            is_leader=args.leader,
+            leader_address=args.leader_address,
+            replica_addresses=args.replicas,
+            port=args.port,
+            group=args.group,
+            group_members=group_members,
+            match_tick=args.match_tick
+        )
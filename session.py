@@ -1,12 +1,22 @@
+import functools
 import random
 import time
 import threading
+from array import array
 from collections import Counter
+from itertools import combinations_with_replacement, repeat
 
-def get_pattern_type(cards):
+import card_game_pb2 as pb
+
+# Seconds a player has to act before their turn is auto-passed.
+TURN_SECONDS = 20
+# Cards are ranked 1 to RANKS, with four of each rank in the deck.
+RANKS = 10
+
+def _classify(cards):
     counter = Counter(cards)
     counts = sorted(counter.values(), reverse=True)
-    
+
     if len(cards) == 1:
         return "single", cards[0]
     elif len(cards) == 2 and counts == [2]:
@@ -20,23 +30,105 @@ def get_pattern_type(cards):
     else:
         return "invalid", None
 
+# (pattern, rank) of every play of 1 to 4 cards, keyed by its cards in sorted order.
+PATTERNS = {
+    play: _classify(play)
+    for size in range(1, 5)
+    for play in combinations_with_replacement(range(1, RANKS + 1), size)
+}
+INVALID_PATTERN = ("invalid", None)
+
+def get_pattern_type(cards):
+    return PATTERNS.get(tuple(sorted(cards)), INVALID_PATTERN)
+
+class Hand:
+    """
+    A player's cards as one count per rank. Checking and removing a play is
+    O(RANKS) and respects how many of a rank the player holds; iterating
+    yields the cards in rank order. Serialized as RANKS bytes.
+    """
+    __slots__ = ("counts", "size")
+
+    def __init__(self, cards=()):
+        self.counts = array("B", bytes(RANKS))
+        for card in cards:
+            self.counts[card - 1] += 1
+        self.size = sum(self.counts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        hand = cls()
+        hand.counts = array("B", data)
+        hand.size = sum(hand.counts)
+        return hand
+
+    def to_bytes(self):
+        return self.counts.tobytes()
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for rank, count in enumerate(self.counts, 1):
+            yield from repeat(rank, count)
+
+    def __eq__(self, other):
+        return isinstance(other, Hand) and self.counts == other.counts
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Hand({list(self)})"
+
+    def has(self, cards):
+        """True if the hand holds every card in `cards`, duplicates included."""
+        return all(1 <= rank <= RANKS and self.counts[rank - 1] >= n for rank, n in Counter(cards).items())
+
+    def remove(self, cards):
+        """Take `cards` out of the hand; check has() first."""
+        for card in cards:
+            self.counts[card - 1] -= 1
+        self.size -= len(cards)
+
+def synchronized(method):
+    """Run a GameSession method under that session's lock."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class GameSession:
+    """
+    One game. There can be tens of thousands live on a leader, so the state is
+    kept lean: no per-instance __dict__, hands in player order, the winner and
+    the last player to play as player indices, quit players as a bitmask, and
+    a Condition for wait_for_change() only once somebody waits. The usual
+    username-based attributes are properties over that.
+    """
+    __slots__ = (
+        "game_id", "players", "hands", "current_turn_index", "_last_played", "last_pattern", "last_index",
+        "winner_index", "quit_mask", "turn_start_time", "version", "lock", "changed", "listeners", "views",
+    )
+
     def __init__(self, game_id, players):
         self.game_id = game_id
         self.players = players  # List of usernames
-        self.hands = {p: [] for p in players}
+        self.hands = [Hand() for _ in players]  # in player order
         self.current_turn_index = 0
         self.last_played = []
-        self.last_played_player = None
-        self.winner = None
-        self.quit_players = set()
+        self.last_index = -1  # player who made last_played
+        self.winner_index = -1
+        self.quit_mask = 0  # bit i set once players[i] quit
         self.turn_start_time = time.time()
+        self.version = 0  # bumped on every state change
+        # one lock per game: moves in the same game serialize, different games run in parallel
+        self.lock = threading.RLock()
+        self.changed = None  # Condition on lock, made by the first wait_for_change()
+        self.listeners = ()  # callbacks run after every change; replaced, never mutated
+        self.views = None  # server: cached GameStateResponses, see CardGameService._build_game_state
 
-        
         self.init_cards()
-
-        self.game_loop_thread = threading.Thread(target=self._game_loop, daemon=True)
-        self.game_loop_thread.start()
     
     def init_cards(self):
         cards = list(range(1, 11)) * 4 
@@ -46,11 +138,87 @@ class GameSession:
         extras = len(cards) % n
         
         idx = 0
-        for i, player in enumerate(self.players):
+        for i in range(n):
             take = base + (1 if i < extras else 0)
-            self.hands[player] = cards[idx:idx+take]
+            self.hands[i] = Hand(cards[idx:idx+take])
             idx += take
 
+    def hand(self, player):
+        return self.hands[self.players.index(player)]
+
+    @property
+    def last_played(self):
+        return self._last_played
+
+    @last_played.setter
+    def last_played(self, cards):
+        self._last_played = cards
+        self.last_pattern = get_pattern_type(cards)  # what the next play has to beat
+
+    @property
+    def last_played_player(self):
+        return self.players[self.last_index] if self.last_index >= 0 else None
+
+    @last_played_player.setter
+    def last_played_player(self, player):
+        self.last_index = self.players.index(player) if player else -1
+
+    @property
+    def winner(self):
+        return self.players[self.winner_index] if self.winner_index >= 0 else None
+
+    @winner.setter
+    def winner(self, player):
+        self.winner_index = self.players.index(player) if player else -1
+
+    @property
+    def quit_players(self):
+        return {p for i, p in enumerate(self.players) if self.quit_mask >> i & 1}
+
+    @quit_players.setter
+    def quit_players(self, players):
+        self.quit_mask = 0
+        for player in players:
+            self.quit_mask |= 1 << self.players.index(player)
+
+    def has_quit(self, index):
+        return bool(self.quit_mask >> index & 1)
+
+    def _touch(self):
+        """Record a state change and wake up anyone waiting on this session."""
+        with self.lock:
+            self.version += 1
+            if self.changed is not None:
+                self.changed.notify_all()
+        for callback in self.listeners:
+            callback()
+
+    def add_listener(self, callback):
+        """Call `callback()` after every state change, e.g. to wake an asyncio stream."""
+        with self.lock:
+            self.listeners = self.listeners + (callback,)
+
+    def remove_listener(self, callback):
+        with self.lock:
+            self.listeners = tuple(c for c in self.listeners if c is not callback)
+
+    def wait_for_change(self, version, timeout):
+        """Block until the session moves past `version` or `timeout` elapses."""
+        with self.lock:
+            if self.changed is None:
+                self.changed = threading.Condition(self.lock)
+            if self.version == version:
+                self.changed.wait(timeout)
+            return self.version
+
+    def _next_active(self, index):
+        """Index of the first player after `index` who has not quit."""
+        index = (index + 1) % len(self.players)
+        while self.has_quit(index):
+            index = (index + 1) % len(self.players)
+        return index
+
+    @synchronized
     def pass_turn(self, player):
         if player != self.get_current_player():
             return False, "Not your turn."
@@ -60,71 +228,63 @@ class GameSession:
         # Advance to the next active player
         while True:
             self.current_turn_index = (self.current_turn_index + 1) % len(self.players)
-            next_player = self.players[self.current_turn_index]
-            if next_player not in self.quit_players:
+            if not self.has_quit(self.current_turn_index):
                 break
             if self.current_turn_index == original_turn:
                 # Only one player left
-                self.winner = player
+                self.winner_index = original_turn
+                self._touch()
                 return True, f"{player} wins by default!"
 
         self.turn_start_time = time.time()
 
         # If everyone else passed and it's back to the last player who played,
         # reset the round
-        if self.players[self.current_turn_index] == self.last_played_player:
+        if self.current_turn_index == self.last_index:
             self.last_played = []
-            self.last_played_player = None
+            self.last_index = -1
+            self._touch()
             return True, f"Everyone else passed. {self.get_current_player()} starts a new round."
 
+        self._touch()
         return True, f"{player} passed the turn."
 
-    def _game_loop(self):
-        while not self.winner:
-            time.sleep(1)
-
-            now = time.time()
-            elapsed = now - self.turn_start_time
-            self.countdown = max(0, int(20 - elapsed))
-
-            if elapsed >= 20:
-                current_player = self.get_current_player()
-                print(f"[AutoPass] {current_player} took too long. Auto-passing.")
-                self.pass_turn(current_player)
-                self.turn_start_time = time.time()
+    def turn_deadline(self):
+        """Time at which the current player's turn is auto-passed."""
+        return self.turn_start_time + TURN_SECONDS
 
+    def get_countdown(self):
+        return max(0, int(self.turn_deadline() - time.time()))
 
     def get_current_player(self):
         return self.players[self.current_turn_index]
     
+    @synchronized
     def get_game_state(self):
-        max_turn_duration = 20
-        time_elapsed = time.time() - self.turn_start_time
-        countdown = max(0, int(max_turn_duration - time_elapsed))
-
         return {
             "game_id": self.game_id,
             "current_turn": self.get_current_player(),
             "last_played": self.last_played,
             "winner": self.winner,
-            "hands": self.hands.copy(),
+            "hands": {p: list(hand) for p, hand in zip(self.players, self.hands)},
             "players": self.players[:],
             "quit_players": list(self.quit_players),
-            "countdown_seconds": countdown
+            "countdown_seconds": self.get_countdown()
         }
     
+    @synchronized
     def get_server_state(self, requesting_player=None):
         player_info = []
-        for player in self.players:
-            is_current = player == self.get_current_player()
+        for i, (player, hand) in enumerate(zip(self.players, self.hands)):
+            is_current = i == self.current_turn_index
             should_show_cards = (player == requesting_player) or (is_current and requesting_player is None)
             
             player_info.append({
                 "username": player,
-                "card_count": len(self.hands[player]),
-                "cards": self.hands[player] if should_show_cards else [],
+                "card_count": len(hand),
+                "cards": list(hand) if should_show_cards else [],
                 "is_current_turn": is_current,
-                "is_connected": player not in self.quit_players
+                "is_connected": not self.has_quit(i)
             })
             
         return {
@@ -133,7 +293,7 @@ class GameSession:
             "last_played": self.last_played,
             "winner": self.winner,
             "players": player_info,
-            "countdown_seconds": self.countdown,
+            "countdown_seconds": self.get_countdown(),
             "game_over": self.winner is not None
         }
     
@@ -142,7 +302,7 @@ class GameSession:
             return get_pattern_type(cards)[0] != "invalid"  # allow any valid pattern to start round
 
         current_type, current_rank = get_pattern_type(cards)
-        previous_type, previous_rank = get_pattern_type(self.last_played)
+        previous_type, previous_rank = self.last_pattern
 
         if current_type == "invalid":
             return False
@@ -157,64 +317,73 @@ class GameSession:
         # Must match pattern and be higher rank
         return current_type == previous_type and current_rank > previous_rank
     
+    @synchronized
     def play_cards(self, player, cards):
         if player != self.get_current_player():
             return False, "Not your turn."
-        if not all(c in self.hands[player] for c in cards):
+        index = self.current_turn_index
+        hand = self.hands[index]
+        if not hand.has(cards):
             return False, "You don't have those cards."
         if not self.is_valid_play(cards, player):
             return False, "Invalid play: must beat previous play with same number and higher rank"
         
-        for c in cards:
-            self.hands[player].remove(c)
-        
+        hand.remove(cards)
+
         self.last_played = cards
-        self.last_played_player = player
+        self.last_index = index
         
         # Check for win condition
-        if len(self.hands[player]) == 0:
-            self.winner = player
+        if len(hand) == 0:
+            self.winner_index = index
+            self._touch()
             return True, "Player won the game!"
         
         # Move to next player
-        self.current_turn_index = (self.current_turn_index + 1) % len(self.players)
-        while self.players[self.current_turn_index] in self.quit_players:
-            self.current_turn_index = (self.current_turn_index + 1) % len(self.players)
+        self.current_turn_index = self._next_active(index)
 
         self.turn_start_time = time.time()
+        self._touch()
         return True, "Cards played successfully"
         
+    @synchronized
     def player_quit(self, player):
         if player not in self.players:
             return False, "Player not in game"
             
-        self.quit_players.add(player)
+        index = self.players.index(player)
+        self.quit_mask |= 1 << index
         
         # If current player quit, move to next
-        if player == self.get_current_player():
-            self.current_turn_index = (self.current_turn_index + 1) % len(self.players)
-            while self.players[self.current_turn_index] in self.quit_players:
-                self.current_turn_index = (self.current_turn_index + 1) % len(self.players)
+        if index == self.current_turn_index:
+            self.current_turn_index = self._next_active(index)
         
         # Check if only one player remains
-        active_players = [p for p in self.players if p not in self.quit_players]
-        if len(active_players) == 1:
-            self.winner = active_players[0]
-            
+        active = [i for i in range(len(self.players)) if not self.has_quit(i)]
+        if len(active) == 1:
+            self.winner_index = active[0]
+
+        self._touch()
         return True, f"{player} quit the game"
     
     def quit_game(self, player):
         return self.player_quit(player)
-        
-    def update_countdown(self, seconds_remaining):
-        self.countdown = seconds_remaining
 
+    def apply(self, op, action):
+        """Apply a replicated play_card, pass_turn or quit_game action."""
+        if op == "play_card":
+            return self.play_cards(action.username, list(action.cards))
+        if op == "pass_turn":
+            return self.pass_turn(action.username)
+        return self.quit_game(action.username)
+        
+    @synchronized
     def serialize(self):
         """Convert GameSession into a simple dictionary for syncing."""
         return {
             "game_id": self.game_id,
             "players": self.players,
-            "hands": self.hands,
+            "hands": {p: list(hand) for p, hand in zip(self.players, self.hands)},
             "current_turn_index": self.current_turn_index,
             "last_played": self.last_played,
             "last_played_player": self.last_played_player,
@@ -227,7 +396,7 @@ class GameSession:
     def deserialize(data):
         """Create a GameSession from a dictionary."""
         session = GameSession(data["game_id"], data["players"])
-        session.hands = data["hands"]
+        session.hands = [Hand(data["hands"][p]) for p in session.players]
         session.current_turn_index = data["current_turn_index"]
         session.last_played = data["last_played"]
         session.last_played_player = data["last_played_player"]
@@ -235,3 +404,45 @@ class GameSession:
         session.quit_players = set(data["quit_players"])
         session.turn_start_time = data["turn_start_time"]
         return session
+
+    @synchronized
+    def to_snapshot(self):
+        """Encode the session as a GameSnapshot message for delta syncing."""
+        return pb.GameSnapshot(
+            game_id=self.game_id,
+            version=self.version,
+            players=self.players,
+            hands=[pb.Hand(counts=hand.to_bytes()) for hand in self.hands],
+            current_turn_index=self.current_turn_index,
+            last_played=self.last_played,
+            last_played_player=self.last_played_player or "",
+            winner=self.winner or "",
+            quit_players=self.quit_players,
+            turn_start_time=self.turn_start_time
+        )
+
+    @synchronized
+    def apply_snapshot(self, snapshot):
+        """Overwrite this session with the leader's copy from a GameSnapshot."""
+        self.players = list(snapshot.players)
+        # snapshots logged before hands were sent as counts carry the cards instead
+        self.hands = [Hand.from_bytes(h.counts) if h.counts else Hand(h.cards) for h in snapshot.hands]
+        self.current_turn_index = snapshot.current_turn_index
+        self.last_played = list(snapshot.last_played)
+        self.last_played_player = snapshot.last_played_player or None
+        self.winner = snapshot.winner or None
+        self.quit_players = set(snapshot.quit_players)
+        self.turn_start_time = snapshot.turn_start_time
+        self.version = snapshot.version
+        self.views = None  # the leader's copy may differ even at the same version
+        if self.changed is not None:
+            self.changed.notify_all()
+        for callback in self.listeners:
+            callback()
+
+    @staticmethod
+    def from_snapshot(snapshot):
+        """Create a GameSession from a GameSnapshot."""
+        session = GameSession(snapshot.game_id, list(snapshot.players))
+        session.apply_snapshot(snapshot)
+        return session
@@ -0,0 +1,145 @@
+import random
+import time
+
+import numpy as np
+
+from session import RANKS, GameSession
+
+# Cards of one rank each pattern needs; triple_plus_one adds one card of another rank.
+PATTERN_NEEDS = {"single": 1, "pair": 2, "triple": 3, "triple_plus_one": 3, "bomb": 4}
+# Bots a Simulator can seat.
+BOTS = ("heuristic", "random")
+
+_RANK_NUMBERS = np.arange(1, RANKS + 1)
+
+
+class Simulator:
+    """
+    Plays many GameSessions at once with bots, for load and for measuring
+    the rules engine. Each step stacks the hands of every game's current
+    player into one (games, RANKS) count matrix and picks all the moves with
+    numpy; the moves then go through GameSession.play_cards and pass_turn
+    as usual. Finished games are replaced by new ones, so the number of
+    live games stays constant.
+
+    A bot that leads plays every card it holds of one rank. "heuristic" bots
+    lead and follow with the lowest rank they can, keeping bombs for when
+    nothing else beats the table; "random" bots pick any rank that works.
+    """
+
+    def __init__(self, games, players=4, bot="heuristic", seed=None):
+        if bot not in BOTS:
+            raise ValueError(f"Unknown bot: {bot}")
+        self.players = [f"bot{i}" for i in range(players)]
+        self.bot = bot
+        self.rng = np.random.default_rng(seed)
+        if seed is not None:
+            random.seed(seed)  # GameSession deals with the random module
+        self.created = 0
+        self.sessions = [self._new_game() for _ in range(games)]
+        self.turns = 0
+        self.finished = 0
+        self.rejected = 0  # moves the engine refused; the bots and the rules disagree
+
+    def _new_game(self):
+        self.created += 1
+        return GameSession(f"sim{self.created}", list(self.players))
+
+    def choose_moves(self, counts, leading, need, prev_rank, prev_bomb, kicker):
+        """
+        For each game, the rank to play (0 to pass) and how many cards of it.
+        counts is the (games, RANKS) hands of the players to move; the other
+        arguments describe what they must beat, one entry per game.
+        """
+        held = counts > 0
+        higher = _RANK_NUMBERS[None, :] > prev_rank[:, None]
+
+        beats = (counts >= need[:, None]) & higher & ~prev_bomb[:, None]
+        # a triple needs a different rank for its extra card
+        beats &= ~kicker[:, None] | (held.sum(axis=1)[:, None] - held > 0)
+        bombs = (counts == 4) & (higher | ~prev_bomb[:, None])
+
+        if self.bot == "heuristic":
+            options = np.where((~beats.any(axis=1))[:, None], bombs, beats)
+            leads = held
+            scores = np.broadcast_to(-_RANK_NUMBERS, counts.shape)  # lowest rank first
+        else:
+            options = beats | bombs
+            leads = held
+            scores = self.rng.random(counts.shape)
+
+        options = np.where(leading[:, None], leads, options)
+        picked = np.where(options, scores, -np.inf).argmax(axis=1)
+        can_play = options.any(axis=1)
+        ranks = np.where(can_play, picked + 1, 0)
+
+        rows = np.arange(len(counts))
+        is_bomb = bombs[rows, picked] & ~beats[rows, picked]
+        sizes = np.where(leading, counts[rows, picked], np.where(is_bomb, 4, need))
+        return ranks, np.where(can_play, sizes, 0), kicker & ~is_bomb & ~leading
+
+    def plan(self, sessions):
+        """
+        The move of the current player of each session, without making it:
+        a list of cards to play, or None to pass.
+        """
+        counts = np.frombuffer(
+            b"".join(s.hands[s.current_turn_index].to_bytes() for s in sessions), dtype=np.uint8
+        ).reshape(len(sessions), RANKS).astype(np.int16)
+        leading = np.array([not s.last_played or s.current_turn_index == s.last_index for s in sessions])
+        patterns = [s.last_pattern for s in sessions]
+        need = np.array([PATTERN_NEEDS.get(kind, 1) for kind, _ in patterns])
+        prev_rank = np.array([rank or 0 for _, rank in patterns])
+        prev_bomb = np.array([kind == "bomb" for kind, _ in patterns])
+        kicker = np.array([kind == "triple_plus_one" for kind, _ in patterns])
+
+        ranks, sizes, with_kicker = self.choose_moves(counts, leading, need, prev_rank, prev_bomb, kicker)
+
+        moves = []
+        for i, rank in enumerate(ranks.tolist()):
+            if not rank:
+                moves.append(None)
+                continue
+            cards = [rank] * int(sizes[i])
+            if with_kicker[i]:
+                cards.append(next(r for r in range(1, RANKS + 1) if r != rank and counts[i, r - 1]))
+            moves.append(cards)
+        return moves
+
+    def step(self):
+        """Take one turn in every live game."""
+        sessions = self.sessions
+        for i, (session, cards) in enumerate(zip(sessions, self.plan(sessions))):
+            player = session.get_current_player()
+            if cards:
+                success, _ = session.play_cards(player, cards)
+            else:
+                success, _ = session.pass_turn(player)
+            if not success:
+                self.rejected += 1
+                session.pass_turn(player)
+            if session.winner:
+                self.finished += 1
+                sessions[i] = self._new_game()
+        self.turns += len(sessions)
+
+    def run(self, seconds=None, steps=None):
+        """
+        Step until `seconds` pass or `steps` steps are done, whichever comes
+        first. Returns turns/sec and games/sec along with the raw counts.
+        """
+        turns, finished = self.turns, self.finished
+        start = time.perf_counter()
+        done = 0
+        while (steps is None or done < steps) and (seconds is None or time.perf_counter() - start < seconds):
+            self.step()
+            done += 1
+        elapsed = time.perf_counter() - start
+        return {
+            "turns": self.turns - turns,
+            "games": self.finished - finished,
+            "seconds": elapsed,
+            "turns_per_sec": (self.turns - turns) / elapsed if elapsed else 0.0,
+            "games_per_sec": (self.finished - finished) / elapsed if elapsed else 0.0,
+            "rejected": self.rejected
+        }
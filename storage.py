@@ -1,21 +1,169 @@
+import os
+import hashlib
 import sqlite3
+import tempfile
 import bcrypt
 import threading
+from contextlib import contextmanager
+
+# Size of the pieces a database snapshot is streamed in.
+SNAPSHOT_CHUNK_SIZE = 1024 * 1024
 
 class Storage:
-    def __init__(self, db_name):
+    def __init__(self, db_name, wal=True):
         self.db_name = db_name
+        self.wal = wal  # False keeps SQLite's default rollback journal
         self.local = threading.local()
+        self.connections = []  # every thread's connection, so close() can reach them
+        # username -> (num_win, num_lost), loaded on first lookup and refreshed
+        # on every write so game state polls do not touch SQLite
+        self.win_stats = {}
+        self.stats_version = 0  # bumped whenever a cached win/loss count may have changed
+        self.stats_lock = threading.Lock()
         self.initialize_database()
 
     def get_connection(self):
         if not hasattr(self.local, "conn"):
             self.local.conn = sqlite3.connect(self.db_name, check_same_thread=False)
             self.local.conn.row_factory = sqlite3.Row
+            self.connections.append(self.local.conn)
+            self.local.depth = 0  # nesting level of transaction() blocks
+            self.local.after_commit = []
+            if self.wal:
+                # WAL only needs an fsync at checkpoints, so NORMAL is still crash-safe
+                self.local.conn.execute("PRAGMA synchronous=NORMAL")
+                self.local.conn.execute("PRAGMA cache_size=-8000")  # 8 MB page cache
+                self.local.conn.execute("PRAGMA temp_store=MEMORY")
         return self.local.conn
 
+    @contextmanager
+    def transaction(self):
+        """
+        Group writes into a single commit. Inside the block, execute_query(commit=True)
+        leaves the commit to the end of the outermost transaction(); an exception
+        rolls everything back.
+        """
+        conn = self.get_connection()
+        self.local.depth += 1
+        try:
+            yield
+        except BaseException:
+            self.local.depth -= 1
+            if self.local.depth == 0:
+                conn.rollback()
+                self.local.after_commit = []
+            raise
+        self.local.depth -= 1
+        if self.local.depth == 0:
+            conn.commit()
+            callbacks, self.local.after_commit = self.local.after_commit, []
+            for callback in callbacks:
+                callback()
+
+    def _after_commit(self, callback):
+        """Run `callback` once the current transaction commits, or now if there is none."""
+        self.get_connection()
+        if self.local.depth:
+            self.local.after_commit.append(callback)
+        else:
+            callback()
+
+    def checkpoint(self):
+        """Fold the WAL back into the main database file so it can be copied as-is."""
+        if self.wal:
+            self.execute_query("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+    def close(self):
+        """Close the connections of all threads; they reconnect on next use."""
+        connections, self.connections = self.connections, []
+        for conn in connections:
+            conn.close()
+        self.local = threading.local()
+
+    def snapshot_chunks(self, chunk_size=SNAPSHOT_CHUNK_SIZE):
+        """
+        Yield a consistent copy of the database as (data, "") chunks followed by a
+        final (b"", sha256) pair. The copy is taken with SQLite's online backup API
+        into a temporary file, so writers are not blocked while it streams.
+        """
+        fd, snapshot_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.db_name)), suffix=".snapshot")
+        os.close(fd)
+        try:
+            source = sqlite3.connect(self.db_name)
+            target = sqlite3.connect(snapshot_path)
+            source.backup(target, pages=256)
+            target.execute("PRAGMA journal_mode=DELETE")  # self-contained file, no -wal
+            target.close()
+            source.close()
+
+            digest = hashlib.sha256()
+            with open(snapshot_path, "rb") as f:
+                while True:
+                    data = f.read(chunk_size)
+                    if not data:
+                        break
+                    digest.update(data)
+                    yield data, ""
+            yield b"", digest.hexdigest()
+        finally:
+            os.remove(snapshot_path)
+
+    def restore_snapshot(self, chunks):
+        """
+        Rebuild the database from (data, sha256) chunks as produced by snapshot_chunks().
+        Chunks are written to a temporary file next to the database, and only a
+        complete snapshot with a matching checksum is swapped in.
+        """
+        fd, part_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.db_name)), suffix=".part")
+        digest = hashlib.sha256()
+        expected = None
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for data, sha256 in chunks:
+                    f.write(data)
+                    digest.update(data)
+                    if sha256:
+                        expected = sha256
+                        break
+                f.flush()
+                os.fsync(f.fileno())
+
+            if expected is None:
+                return {"status": "error", "message": "Snapshot stream ended early"}
+            if expected != digest.hexdigest():
+                return {"status": "error", "message": "Snapshot checksum mismatch"}
+
+            self.close()
+            for suffix in ("-wal", "-shm"):
+                if os.path.exists(self.db_name + suffix):
+                    os.remove(self.db_name + suffix)
+            os.replace(part_path, self.db_name)
+            self.initialize_database()  # back to WAL; the snapshot uses a rollback journal
+            with self.stats_lock:
+                self.win_stats = {}
+                self.stats_version += 1
+            return {"status": "success"}
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+    def restore(self, database_dump):
+        """Replace the database file with a raw dump taken from another node."""
+        self.close()
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(self.db_name + suffix):
+                os.remove(self.db_name + suffix)
+        with open(self.db_name, "wb") as f:
+            f.write(database_dump)
+        self.initialize_database()
+        with self.stats_lock:
+            self.win_stats = {}
+            self.stats_version += 1
+
     def initialize_database(self):
         conn = sqlite3.connect(self.db_name)
+        if self.wal:
+            conn.execute("PRAGMA journal_mode=WAL")  # persists in the database file
         cursor = conn.cursor()
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS users (
@@ -44,6 +192,21 @@ class Storage:
                 FOREIGN KEY (username) REFERENCES users(username)
             )
         """)
+        # results already counted, so one forwarded again is not counted twice
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS recorded_results (
+                result_id TEXT PRIMARY KEY
+            )
+        """)
+        # results for players homed in another group, until that group has them
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS result_outbox (
+                result_id TEXT,
+                home_group INTEGER,
+                result BLOB,
+                PRIMARY KEY (result_id, home_group)
+            )
+        """)
         conn.commit()
         conn.close()
 
@@ -51,7 +214,7 @@ class Storage:
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute(query, params)
-        if commit:
+        if commit and not self.local.depth:
             conn.commit()
         return cursor
 
@@ -101,20 +264,77 @@ class Storage:
             commit=True
         )
 
+    def _refresh_stats(self, usernames):
+        """Re-read cached win/loss counts once the write that changed them commits."""
+        self._after_commit(lambda: self._reload_stats(usernames))
+
+    def _reload_stats(self, usernames):
+        with self.stats_lock:
+            for username in usernames:
+                if username in self.win_stats:
+                    row = self.execute_query("SELECT num_win, num_lost FROM users WHERE username=?", (username,)).fetchone()
+                    self.win_stats[username] = (row["num_win"], row["num_lost"]) if row else (0, 0)
+            self.stats_version += 1
+
     def declare_winner(self, game_id, winner):
+        with self.transaction():
+            self.finish_game(game_id, winner)
+            players = self.execute_query("SELECT username FROM game_players WHERE game_id=?", (game_id,)).fetchall()
+            losers = [row["username"] for row in players if row["username"] != winner]
+            self.record_result(f"{game_id}:winner", [winner], losers)
+
+    def finish_game(self, game_id, winner):
+        """Mark the game finished; the players' win/loss counts are left to record_result."""
         self.execute_query(
             "UPDATE games SET status='finished', winner=? WHERE game_id=?",
             (winner, game_id),
             commit=True
         )
+
+    def record_result(self, result_id, winners, losers):
+        """
+        Add a win for every winner and a loss for every loser, once per
+        result_id: a result that is sent again is ignored. Returns whether it
+        was counted.
+        """
+        with self.transaction():
+            cursor = self.execute_query(
+                "INSERT OR IGNORE INTO recorded_results (result_id) VALUES (?)",
+                (result_id,),
+                commit=True
+            )
+            if not cursor.rowcount:
+                return False
+            self.execute_query(
+                f"UPDATE users SET num_win = num_win + 1 WHERE username IN ({','.join('?' * len(winners))})",
+                tuple(winners),
+                commit=True
+            )
+            self.execute_query(
+                f"UPDATE users SET num_lost = num_lost + 1 WHERE username IN ({','.join('?' * len(losers))})",
+                tuple(losers),
+                commit=True
+            )
+            self._refresh_stats(list(winners) + list(losers))
+        return True
+
+    def queue_result(self, result_id, group, result):
+        """Keep a serialized result for another group until drop_queued_result says it got there."""
         self.execute_query(
-            "UPDATE users SET num_win = num_win + 1 WHERE username=?",
-            (winner,),
+            "INSERT OR IGNORE INTO result_outbox (result_id, home_group, result) VALUES (?, ?, ?)",
+            (result_id, group, result),
             commit=True
         )
+
+    def queued_results(self):
+        """Every (result_id, group, result) still waiting to be delivered, oldest first."""
+        cursor = self.execute_query("SELECT result_id, home_group, result FROM result_outbox ORDER BY rowid")
+        return [(row["result_id"], row["home_group"], row["result"]) for row in cursor.fetchall()]
+
+    def drop_queued_result(self, result_id, group):
         self.execute_query(
-            "UPDATE users SET num_lost = num_lost + 1 WHERE username IN (SELECT username FROM game_players WHERE game_id=? AND username != ?)",
-            (game_id, winner),
+            "DELETE FROM result_outbox WHERE result_id=? AND home_group=?",
+            (result_id, group),
             commit=True
         )
 
@@ -129,28 +349,33 @@ class Storage:
         }
     
     def get_win_rate(self, username):
-        cursor = self.execute_query("SELECT num_win, num_lost FROM users WHERE username=?", (username,))
-        row = cursor.fetchone()
-        if row:
-            wins, losses = row["num_win"], row["num_lost"]
-            total = wins + losses
-            return wins / total if total > 0 else 0.0
-        return 0.0
+        stats = self.win_stats.get(username)
+        if stats is None:
+            with self.stats_lock:
+                cursor = self.execute_query("SELECT num_win, num_lost FROM users WHERE username=?", (username,))
+                row = cursor.fetchone()
+                stats = (row["num_win"], row["num_lost"]) if row else (0, 0)
+                self.win_stats[username] = stats
+
+        wins, losses = stats
+        total = wins + losses
+        return wins / total if total > 0 else 0.0
 
     def quit_game(self, game_id, username):
         """Handles a player quitting the game."""
+        with self.transaction():
+            self.leave_game(game_id, username)
+            self.record_result(f"{game_id}:quit:{username}", [], [username])
+
+        return {"status": "success", "message": f"{username} quit the game and received a loss."}
+
+    def leave_game(self, game_id, username):
+        """Mark a player who quit as disconnected; their loss is left to record_result."""
         self.execute_query(
             "UPDATE game_players SET is_connected=0 WHERE game_id=? AND username=?",
             (game_id, username),
             commit=True
         )
-        self.execute_query(
-            "UPDATE users SET num_lost = num_lost + 1 WHERE username=?",
-            (username,),
-            commit=True
-        )
-
-        return {"status": "success", "message": f"{username} quit the game and received a loss."}
 
     def delete_account(self, username, password):
         cursor = self.execute_query("SELECT password_hash FROM users WHERE username=?", (username,))
@@ -158,6 +383,9 @@ class Storage:
         if row:
             if bcrypt.checkpw(password.encode(), row["password_hash"]):
                 self.execute_query("DELETE FROM users WHERE username=?", (username,), commit=True)
+                with self.stats_lock:
+                    self.win_stats.pop(username, None)
+                    self.stats_version += 1
                 return {"status": "success", "message": "Account deleted"}
             else:
                 return {"status": "error", "message": "Incorrect password"}
@@ -0,0 +1,250 @@
+import asyncio
+import itertools
+import threading
+import time
+import os
+import sys
+from concurrent import futures
+
+import grpc
+import pytest
+from google.protobuf.empty_pb2 import Empty
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import card_game_pb2 as pb
+import card_game_pb2_grpc as stub
+import aio_server
+from aio_server import AsyncCardGameService
+from channel_pool import SERVER_OPTIONS
+from replication import QuorumWaiter
+from server import CardGameService, GameSession
+from session import Hand
+
+TEST_PORT = 60061
+TEST_DB = f"cardgame-{TEST_PORT}.db"
+
+
+def remove_node_files():
+    for path in (TEST_DB, f"{TEST_DB}-wal", f"{TEST_DB}-shm", f"cardgame-{TEST_PORT}.log", f"cardgame-{TEST_PORT}.snapshot"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@pytest.fixture
+def service():
+    remove_node_files()
+    service = CardGameService(port=TEST_PORT, is_leader=True, monitor=False)
+    yield service
+    service.storage.close()
+    service.log.close()
+    service.turn_timer.stop()
+    remove_node_files()
+
+
+def run_with_server(service, scenario):
+    """Serve `service` on grpc.aio and run the coroutine `scenario(client)` against it."""
+    async def main():
+        server = grpc.aio.server(options=SERVER_OPTIONS)
+        async_service = AsyncCardGameService(service)
+        stub.add_CardGameServiceServicer_to_server(async_service, server)
+        server.add_insecure_port(f"127.0.0.1:{TEST_PORT}")
+        await server.start()
+        try:
+            async with grpc.aio.insecure_channel(f"127.0.0.1:{TEST_PORT}") as channel:
+                return await scenario(stub.CardGameServiceStub(channel))
+        finally:
+            await server.stop(0)
+            async_service.pool.shutdown(wait=False)
+
+    return asyncio.run(main())
+
+
+def test_heartbeat_not_blocked_by_slow_play_card(service, monkeypatch):
+    monkeypatch.setattr(aio_server, "REPLICATION_TIMEOUT", 1.0)
+    service.active_games["slow"] = GameSession("slow", ["alice", "bob"])
+    # a quorum that never answers, so every PlayCard waits out the timeout
+    indices = itertools.count(service.commit_index + 1)
+    monkeypatch.setattr(service, "propose", lambda command: (next(indices), 0, QuorumWaiter(needed=1, total=1)))
+
+    async def scenario(client):
+        plays = [
+            asyncio.ensure_future(client.PlayCard(pb.PlayCardRequest(username="alice", game_id="slow", cards=[1])))
+            for _ in range(50)
+        ]
+        await asyncio.sleep(0.2)
+        start = time.perf_counter()
+        beat = await client.Heartbeat(pb.HeartbeatRequest())
+        latency = time.perf_counter() - start
+        results = await asyncio.gather(*plays)
+        return beat, latency, results
+
+    beat, latency, results = run_with_server(service, scenario)
+    assert beat.status == "alive"
+    assert latency < 0.5
+    assert all(r.message == "Failed to replicate" for r in results)
+
+
+def test_cancelled_play_card_is_still_decided(service, monkeypatch):
+    monkeypatch.setattr(aio_server, "REPLICATION_TIMEOUT", 1.0)
+    session = GameSession("cancelled", ["alice", "bob"])
+    session.hands[0] = Hand([3, 5])
+    service.active_games["cancelled"] = session
+    # the first entry's quorum never answers; the second one's is met at once
+    waiters = iter([QuorumWaiter(needed=1, total=1), QuorumWaiter(needed=0, total=0)])
+    indices = itertools.count(service.commit_index + 1)
+    monkeypatch.setattr(service, "propose", lambda command: (next(indices), 0, next(waiters)))
+
+    async def scenario(client):
+        request = pb.PlayCardRequest(username="alice", game_id="cancelled", cards=[3])
+        with pytest.raises(grpc.aio.AioRpcError) as cancelled:
+            await client.PlayCard(request, timeout=0.3)
+        return cancelled.value.code(), await client.PlayCard(request, timeout=5)
+
+    code, resp = run_with_server(service, scenario)
+    assert code == grpc.StatusCode.DEADLINE_EXCEEDED
+    assert resp.status == "success"
+    assert service.commit_index == 1 and service.decided == {}
+    assert list(session.hand("alice")) == [5]
+
+
+def test_play_card_replicates_and_applies(service):
+    session = GameSession("aiogame", ["alice", "bob"])
+    session.hands[0] = Hand([3, 5])
+    service.active_games["aiogame"] = session
+
+    async def scenario(client):
+        return await client.PlayCard(pb.PlayCardRequest(username="alice", game_id="aiogame", cards=[3]))
+
+    resp = run_with_server(service, scenario)
+    assert resp.status == "success"
+    assert list(session.hand("alice")) == [5]
+    assert service.commit_index == 0
+
+
+def test_many_streams_share_the_event_loop(service):
+    session = GameSession("crowd", ["alice", "bob"])
+    service.active_games["crowd"] = session
+    streams = 300
+
+    async def scenario(client):
+        calls = [client.SubscribeGameState(pb.GameStateRequest(game_id="crowd", username="alice")) for _ in range(streams)]
+        first = await asyncio.gather(*(call.read() for call in calls))
+        threads = threading.active_count()
+
+        session.pass_turn("alice")
+        second = await asyncio.gather(*(call.read() for call in calls))
+        for call in calls:
+            call.cancel()
+        return first, second, threads
+
+    before = threading.active_count()
+    first, second, threads = run_with_server(service, scenario)
+    assert all(s.current_turn == "alice" for s in first)
+    assert all(s.current_turn == "bob" for s in second)
+    assert threads - before < 50
+    assert session.listeners == ()
+
+
+def test_wait_for_match_pushes_the_game(service):
+    async def scenario(client):
+        first = client.WaitForMatch(pb.MatchRequest(username="alice", num_players=2))
+        waiting = await first.read()
+        leaver = client.WaitForMatch(pb.MatchRequest(username="carol", num_players=3))
+        await leaver.read()
+        leaver.cancel()
+
+        second = [update async for update in client.WaitForMatch(pb.MatchRequest(username="bob", num_players=2))]
+        ready = await first.read()
+        return waiting, ready, second[-1]
+
+    waiting, ready, other = run_with_server(service, scenario)
+    assert waiting.status == "waiting"
+    assert ready.status == other.status == "success"
+    assert ready.game_id == other.game_id
+    assert sorted(service.active_games[ready.game_id].players) == ["alice", "bob"]
+    assert "carol" not in service.match_queue
+    assert service.match_results == {}
+    assert service.match_listeners == []
+
+
+def test_wait_for_match_is_relayed_to_the_matchmaking_group(service, monkeypatch):
+    port = 60067
+    for path in (f"cardgame-{port}.db", f"cardgame-{port}.log", f"cardgame-{port}.snapshot"):
+        if os.path.exists(path):
+            os.remove(path)
+    members = [[f"127.0.0.1:{port}"], [f"127.0.0.1:{TEST_PORT}"]]
+    matchmaker = CardGameService(port=port, is_leader=True, monitor=False, group=0, group_members=members)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    stub.add_CardGameServiceServicer_to_server(matchmaker, server)
+    server.add_insecure_port(f"0.0.0.0:{port}")
+    server.start()
+    # our node leads group 1, which keeps no match queue of its own
+    monkeypatch.setattr(service, "group", 1)
+    monkeypatch.setattr(service, "group_members", members)
+    # run_with_server listens on loopback only, not on the address WhoIsLeader advertises
+    matchmaker.routes[1] = f"127.0.0.1:{TEST_PORT}"
+
+    async def scenario(client):
+        first = client.WaitForMatch(pb.MatchRequest(username="alice", num_players=2))
+        waiting = await first.read()
+        second = [update async for update in client.WaitForMatch(pb.MatchRequest(username="bob", num_players=2))]
+        ready = await first.read()
+        return waiting, ready, second[-1]
+
+    try:
+        waiting, ready, other = run_with_server(service, scenario)
+    finally:
+        server.stop(0)
+        matchmaker.stop_results()
+        matchmaker.turn_timer.stop()
+        matchmaker.storage.close()
+        matchmaker.log.close()
+        for path in (f"cardgame-{port}.db", f"cardgame-{port}.log", f"cardgame-{port}.snapshot"):
+            if os.path.exists(path):
+                os.remove(path)
+    assert waiting.status == "waiting", waiting.message
+    assert ready.status == other.status == "success"
+    assert ready.game_id == other.game_id
+    assert matchmaker.match_results == {}
+    assert service.match_results == {} and "alice" not in service.match_queue
+
+
+def test_cancelled_database_stream_closes_the_generator(service, monkeypatch):
+    closed = threading.Event()
+    streams = []  # held here, so only an explicit close() can finish them
+
+    def chunks():
+        try:
+            while True:
+                yield pb.DatabaseChunk(status="success", data=b"x" * 1024)
+        finally:
+            closed.set()
+
+    def stream(request, context):
+        streams.append(chunks())
+        return streams[-1]
+
+    monkeypatch.setattr(service, "StreamDatabase", stream)
+
+    async def scenario(client):
+        call = client.StreamDatabase(Empty())
+        await call.read()
+        call.cancel()
+        # the server notices the cancel on its next await
+        for _ in range(100):
+            if closed.is_set():
+                break
+            await asyncio.sleep(0.02)
+
+    run_with_server(service, scenario)
+    assert closed.is_set()
+
+
+def test_unimplemented_rpc(service):
+    async def scenario(client):
+        with pytest.raises(grpc.aio.AioRpcError) as err:
+            await client.FollowerSync(pb.FollowerSyncDataRequest(leader_address="127.0.0.1:1"))
+        return err.value.code()
+
+    assert run_with_server(service, scenario) == grpc.StatusCode.UNIMPLEMENTED
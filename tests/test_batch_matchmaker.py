@@ -0,0 +1,114 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from google.protobuf.empty_pb2 import Empty
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import card_game_pb2 as pb
+from batch_matchmaker import Histogram, form_tables
+from server import CardGameService
+
+TEST_PORT = 60066
+
+
+def remove_node_files(port):
+    for path in (f"cardgame-{port}.db", f"cardgame-{port}.log", f"cardgame-{port}.snapshot"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    remove_node_files(TEST_PORT)
+    # a tick long enough that the background thread never runs one; tests call tick() themselves
+    service = CardGameService(port=TEST_PORT, is_leader=True, monitor=False, match_tick=3600)
+    ratings = {"low1": 0.1, "low2": 0.15, "high1": 0.9, "high2": 0.85, "mid": 0.5}
+    monkeypatch.setattr(service.storage, "get_win_rate", lambda username: ratings.get(username, 0.0))
+    yield service
+    service.matchmaker.stop()
+    service.turn_timer.stop()
+    service.storage.close()
+    service.log.close()
+    remove_node_files(TEST_PORT)
+
+
+def test_histogram_buckets_are_inclusive_upper_bounds():
+    histogram = Histogram((1, 5))
+    histogram.observe([0, 1, 2, 5, 6, 100])
+    histogram.observe(3)
+    proto = histogram.to_proto()
+    assert list(proto.bounds) == [1.0, 5.0]
+    assert list(proto.counts) == [2, 3, 2]
+
+
+def test_form_tables_seats_players_of_similar_rating_together():
+    ratings = np.array([0.1, 0.9, 0.12, 0.88])
+    waits = np.zeros(4)
+    tables = form_tables(ratings, waits, 2)
+    assert sorted(sorted(row) for row in tables.tolist()) == [[0, 2], [1, 3]]
+
+
+def test_form_tables_widens_tolerance_with_waiting_time():
+    ratings = np.array([0.1, 0.9])
+    assert len(form_tables(ratings, np.array([0.0, 0.0]), 2)) == 0
+    assert len(form_tables(ratings, np.array([60.0, 1.0]), 2)) == 1
+
+
+def test_form_tables_leaves_the_newest_players_out():
+    ratings = np.array([0.5, 0.5, 0.5])
+    tables = form_tables(ratings, np.array([5.0, 1.0, 3.0]), 2)
+    assert sorted(tables[0].tolist()) == [0, 2]
+
+
+def test_start_match_waits_for_the_tick(service):
+    for username in ("low1", "high1", "low2", "high2"):
+        res = service.StartMatch(pb.MatchRequest(username=username, num_players=2), None)
+        assert res.status == "waiting"
+    assert len(service.match_queue) == 4
+
+    service.matchmaker.tick()
+
+    games = {username: service.match_results[username] for username in ("low1", "low2", "high1", "high2")}
+    assert games["low1"] == games["low2"] != games["high1"] == games["high2"]
+    assert sorted(service.active_games[games["high1"]].players) == ["high1", "high2"]
+    assert len(service.match_queue) == 0
+
+    res = service.StartMatch(pb.MatchRequest(username="low1", num_players=2), None)
+    assert res.status == "success" and games["low1"] in res.message
+
+
+def test_mismatched_players_keep_waiting(service):
+    for username in ("low1", "high1", "mid"):
+        service.StartMatch(pb.MatchRequest(username=username, num_players=2), None)
+    service.matchmaker.tick()
+    assert len(service.match_queue) == 3
+    assert not service.active_games
+
+
+def test_failed_games_are_requeued_with_their_join_times(service, monkeypatch):
+    for username in ("low1", "low2"):
+        service.StartMatch(pb.MatchRequest(username=username, num_players=2), None)
+    joined = dict(service.match_queue.entries(2))
+    monkeypatch.setattr(service, "create_games", lambda sessions: [False] * len(sessions))
+
+    service.matchmaker.tick()
+
+    assert dict(service.match_queue.entries(2)) == joined
+    assert "low1" not in service.match_results
+
+
+def test_matchmaking_stats(service):
+    res = service.GetMatchmakingStats(Empty(), None)
+    assert res.status == "success" and res.games_formed == 0
+
+    for username in ("low1", "low2"):
+        service.StartMatch(pb.MatchRequest(username=username, num_players=2), None)
+    service.matchmaker.tick()
+
+    res = service.GetMatchmakingStats(Empty(), None)
+    assert res.games_formed == 1
+    assert sum(res.queue_depth.counts) == 1
+    assert sum(res.time_to_match.counts) == 2
@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import card_game_pb2_grpc as stub
+from channel_pool import ChannelPool
+
+
+def test_stub_is_reused_per_address():
+    pool = ChannelPool()
+    first = pool.stub("127.0.0.1:1")
+    assert isinstance(first, stub.CardGameServiceStub)
+    assert pool.stub("127.0.0.1:1") is first
+    assert pool.stub("127.0.0.1:2") is not first
+    pool.close_all()
+
+
+def test_close_drops_channel():
+    pool = ChannelPool()
+    first = pool.stub("127.0.0.1:1")
+    pool.close("127.0.0.1:1")
+    assert "127.0.0.1:1" not in pool
+    assert pool.stub("127.0.0.1:1") is not first
+    pool.close_all()
+
+
+def test_retain_closes_everything_else():
+    pool = ChannelPool()
+    for port in (1, 2, 3):
+        pool.stub(f"127.0.0.1:{port}")
+    pool.retain(["127.0.0.1:2", None])
+    assert "127.0.0.1:2" in pool
+    assert "127.0.0.1:1" not in pool
+    assert "127.0.0.1:3" not in pool
+    pool.close_all()
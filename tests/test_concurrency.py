@@ -0,0 +1,188 @@
+import random
+import threading
+import time
+import os
+import sys
+from collections import Counter
+from concurrent import futures
+from unittest import mock
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import card_game_pb2 as pb
+from server import CardGameService, GameSession
+
+TEST_PORT = 60062
+TEST_DB = f"cardgame-{TEST_PORT}.db"
+
+
+def remove_node_files():
+    for path in (TEST_DB, f"{TEST_DB}-wal", f"{TEST_DB}-shm", f"cardgame-{TEST_PORT}.log", f"cardgame-{TEST_PORT}.snapshot"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@pytest.fixture
+def service():
+    remove_node_files()
+    service = CardGameService(port=TEST_PORT, is_leader=True, monitor=False)
+    yield service
+    service.turn_timer.stop()
+    service.storage.close()
+    service.log.close()
+    remove_node_files()
+
+
+def test_concurrent_matchmaking_seats_everyone_once(service):
+    users = [f"user{i}" for i in range(120)]
+    barrier = threading.Barrier(len(users))
+
+    def find_game(username):
+        barrier.wait()
+        while True:
+            resp = service.StartMatch(pb.MatchRequest(username=username, num_players=2), None)
+            if resp.status == "success":
+                return username, resp.message.split("ID: ")[1]
+            time.sleep(0.005)  # poll like the client does, without starving the thread setting up the game
+
+    with futures.ThreadPoolExecutor(max_workers=len(users)) as pool:
+        seats = dict(pool.map(find_game, users))
+
+    assert sorted(seats) == sorted(users)
+    per_game = Counter(seats.values())
+    assert set(per_game.values()) == {2}
+    for game_id, count in per_game.items():
+        assert sorted(service.active_games[game_id].players) == sorted(u for u, g in seats.items() if g == game_id)
+    assert service.match_queue.waiting(2) == []
+    assert service.match_results == {}
+
+
+def test_concurrent_moves_keep_every_game_consistent(service):
+    games = 16
+    for i in range(games):
+        service.apply_command(pb.Command(start_game=GameSession(f"g{i}", ["alice", "bob", "carol"]).to_snapshot()))
+    played = Counter()  # game_id -> cards removed from hands by successful plays
+    applied = Counter()  # game_id -> successful commands
+    counts_lock = threading.Lock()
+
+    def hammer(game_id, player, seed):
+        rng = random.Random(seed)
+        session = service.active_games[game_id]
+        for _ in range(60):
+            if session.winner:
+                return
+            if rng.random() < 0.5:
+                hand = session.get_game_state()["hands"][player]
+                if not hand:
+                    continue
+                card = rng.choice(hand)
+                resp = service.PlayCard(pb.PlayCardRequest(username=player, game_id=game_id, cards=[card]), None)
+                removed = 1
+            else:
+                resp = service.PassTurn(pb.GameActionRequest(username=player, game_id=game_id), None)
+                removed = 0
+            if resp.status == "success":
+                with counts_lock:
+                    played[game_id] += removed
+                    applied[game_id] += 1
+
+    # two threads per player, so the same player's moves race each other too
+    jobs = [
+        (f"g{i}", player, seed)
+        for i in range(games)
+        for seed, player in enumerate(["alice", "bob", "carol"] * 2)
+    ]
+    with futures.ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        list(pool.map(lambda job: hammer(*job), jobs))
+
+    for i in range(games):
+        game_id = f"g{i}"
+        session = service.active_games[game_id]
+        cards_left = sum(len(hand) for hand in session.hands)
+        assert cards_left + played[game_id] == 40
+        assert session.version == applied[game_id]
+        if session.winner:
+            assert len(session.hand(session.winner)) == 0
+    assert service.commit_index == service.next_log_index - 1
+
+
+def test_leader_applies_entries_in_log_order(service):
+    start = pb.Command(start_game=GameSession("ordered", ["alice", "bob", "carol"]).to_snapshot())
+    first = pb.Command(pass_turn=pb.GameActionRequest(game_id="ordered", username="alice"))
+    second = pb.Command(pass_turn=pb.GameActionRequest(game_id="ordered", username="bob"))
+    proposals = [service.propose(command) for command in (start, first, second)]
+    indices = [index for index, _, _ in proposals]
+
+    results = {}
+    later = threading.Thread(target=lambda: results.setdefault("second", service.commit(indices[2], second, True)))
+    later.start()
+    time.sleep(0.1)
+    # bob's pass reached a quorum first, but must wait for the entries before it
+    assert later.is_alive() and "ordered" not in service.active_games
+
+    assert service.commit(indices[0], start, True)[0]
+    assert service.commit(indices[1], first, True)[0]
+    later.join(5)
+    assert results["second"][0]
+    assert service.commit_index == indices[2]
+    assert service.active_games["ordered"].get_current_player() == "carol"
+
+
+def test_failed_entry_does_not_hold_back_later_ones(service):
+    start = pb.Command(start_game=GameSession("skipped", ["alice", "bob"]).to_snapshot())
+    other = pb.Command(start_game=GameSession("kept", ["alice", "bob"]).to_snapshot())
+    (skipped, _, _), (kept, _, _) = service.propose(start), service.propose(other)
+
+    assert service.commit(skipped, start, False) == (False, "Failed to replicate")
+    assert service.commit(kept, other, True)[0]
+    assert "skipped" not in service.active_games and "kept" in service.active_games
+
+
+def test_snapshot_for_a_replica_covers_its_dropped_entries(service):
+    command = pb.Command(start_game=GameSession("dropped", ["alice", "bob"]).to_snapshot())
+    index, _, _ = service.propose(command)
+    replica_stub = mock.MagicMock()
+    replica_stub.InstallSnapshot.return_value = pb.Response(status="success")
+
+    covered = {}
+    sender = threading.Thread(target=lambda: covered.setdefault("index", service.send_snapshot(replica_stub, index)))
+    sender.start()
+    time.sleep(0.1)
+    # the entry is not decided yet, so a snapshot now would leave the replica a gap
+    assert sender.is_alive()
+    replica_stub.InstallSnapshot.assert_not_called()
+
+    service.commit(index, command, True)
+    sender.join(5)
+    assert covered["index"] == index
+    assert [game.game_id for game in service.log.snapshot_games] == ["dropped"]
+
+
+def test_failed_and_undecided_entries_are_not_replayed(service):
+    def propose_game(game_id):
+        command = pb.Command(start_game=GameSession(game_id, ["alice", "bob"]).to_snapshot())
+        index, ticket, _ = service.propose(command)
+        service.log.sync(ticket)
+        return index, command
+
+    failed, command = propose_game("phantom")
+    assert service.commit(failed, command, False) == (False, "Failed to replicate")
+    kept, command = propose_game("kept")
+    assert service.commit(kept, command, True)[0]
+    undecided, _ = propose_game("undecided")  # the leader crashes before deciding it
+    service.log.sync()
+
+    restarted = CardGameService(port=TEST_PORT, is_leader=True, monitor=False)
+    try:
+        assert "kept" in restarted.active_games
+        assert "phantom" not in restarted.active_games
+        assert "undecided" not in restarted.active_games
+        assert {failed, undecided} <= restarted.log.aborted
+        assert restarted.commit_index == undecided
+        assert restarted.next_log_index == undecided + 1
+    finally:
+        restarted.turn_timer.stop()
+        restarted.storage.close()
+        restarted.log.close()
@@ -0,0 +1,56 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from failure_detector import PhiAccrualDetector
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def regular_detector(clock, beats=10):
+    detector = PhiAccrualDetector(3.0, acceptable_pause=3.0, clock=clock)
+    for _ in range(beats):
+        clock.now += 3.0
+        detector.heartbeat()
+    return detector
+
+
+def test_phi_stays_low_with_regular_heartbeats():
+    clock = FakeClock()
+    detector = regular_detector(clock)
+    clock.now += 3.0
+    assert detector.phi() < 1
+
+
+def test_single_missed_heartbeat_is_tolerated():
+    clock = FakeClock()
+    detector = regular_detector(clock)
+    clock.now += 6.0
+    assert detector.phi() < 8
+
+
+def test_phi_climbs_with_silence():
+    clock = FakeClock()
+    detector = regular_detector(clock)
+    last_heartbeat = clock.now
+    readings = []
+    for elapsed in (6.0, 8.0, 10.0):
+        clock.now = last_heartbeat + elapsed
+        readings.append(detector.phi())
+    assert readings[0] < readings[1] < readings[2]
+    assert readings[2] > 8
+
+
+def test_new_peer_judged_by_expected_interval():
+    clock = FakeClock()
+    detector = PhiAccrualDetector(3.0, acceptable_pause=3.0, clock=clock)
+    clock.now = 4.0
+    assert detector.phi() < 1
+    clock.now = 30.0
+    assert detector.phi() > 8
@@ -9,6 +9,7 @@ import sys
 import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import gui
 from gui import CardGameGUI
 import card_game_pb2 as pb
 
@@ -62,22 +63,61 @@ def test_update_card_display_logic(gui_app):
     assert gui_app.card_values == [1, 2, 3]
 
 
-def test_start_match_success(gui_app):
+def test_wait_for_match_enters_pushed_game(gui_app):
     gui_app.username = "test_user"
-    gui_app.num_players_entry = mock.Mock()
-    gui_app.num_players_entry.get.return_value = "2"
     gui_app.status_label = mock.Mock()
-    gui_app.root.update = mock.Mock()
+    gui_app.root.after = lambda delay, fn, *args: fn(*args)
+
+    updates = [
+        pb.MatchUpdate(status="waiting", message="Waiting for more players..."),
+        pb.MatchUpdate(status="success", message="Game ready! ID: game123", game_id="game123"),
+    ]
+    with mock.patch.object(gui_app.stub, 'WaitForMatch', return_value=iter(updates)):
+        with mock.patch.object(gui_app, 'game_screen') as mock_game_screen:
+            gui_app.wait_for_match(2)
+            assert gui_app.game_id == "game123"
+            mock_game_screen.assert_called_once()
+    gui_app.status_label.config.assert_any_call(text="Waiting for more players...")
+
+def test_wait_for_match_falls_back_to_polling(gui_app):
+    gui_app.username = "test_user"
+    gui_app.status_label = mock.Mock()
+    gui_app.root.after = lambda delay, fn, *args: fn(*args)
 
     mock_resp_waiting = pb.Response(status="waiting", message="Waiting for players...")
     mock_resp_success = pb.Response(status="success", message="Game ready! ID: game123")
 
-    with mock.patch.object(gui_app.stub, 'StartMatch', side_effect=[mock_resp_waiting, mock_resp_success]):
-        with mock.patch.object(gui_app, 'game_screen') as mock_game_screen:
-            with mock.patch("time.sleep", return_value=None): 
-                gui_app.start_match()
-                assert gui_app.game_id == "game123"
-                mock_game_screen.assert_called_once()
+    with mock.patch.object(gui_app.stub, 'WaitForMatch', side_effect=FakeRpcError(grpc.StatusCode.UNIMPLEMENTED)), \
+         mock.patch.object(gui_app.stub, 'StartMatch', side_effect=[mock_resp_waiting, mock_resp_success]), \
+         mock.patch.object(gui_app, 'game_screen') as mock_game_screen, \
+         mock.patch("time.sleep", return_value=None):
+        gui_app.wait_for_match(2)
+        assert gui_app.game_id == "game123"
+        assert not gui_app.use_match_stream
+        mock_game_screen.assert_called_once()
+
+def test_refused_match_stream_polls_start_match(gui_app):
+    gui_app.username = "test_user"
+    gui_app.status_label = mock.Mock()
+    gui_app.root.after = lambda delay, fn, *args: fn(*args)
+
+    mock_resp_success = pb.Response(status="success", message="Game ready! ID: game456")
+
+    with mock.patch.object(gui_app.stub, 'WaitForMatch', side_effect=FakeRpcError(grpc.StatusCode.RESOURCE_EXHAUSTED)), \
+         mock.patch.object(gui_app.stub, 'StartMatch', return_value=mock_resp_success), \
+         mock.patch.object(gui_app, 'game_screen'), \
+         mock.patch("time.sleep", return_value=None):
+        gui_app.wait_for_match(2)
+        assert gui_app.game_id == "game456"
+        # the next match tries the stream again
+        assert gui_app.use_match_stream
+
+def test_match_goes_to_the_matchmaking_group(gui_app):
+    table = pb.RoutingTable(group_leaders=["127.0.0.1:50061", "127.0.0.1:50062"])
+    with mock.patch.object(gui_app.stub, 'GetRoutingTable', return_value=table):
+        gui_app.route_match()
+    assert gui_app.match_address == "127.0.0.1:50061"
+    assert gui_app.match_stub is not gui_app.stub
 
 def test_start_match_invalid_input(gui_app):
     gui_app.num_players_entry = mock.Mock()
@@ -89,6 +129,7 @@ def test_start_match_invalid_input(gui_app):
 
 def test_poll_game_state_exits_and_calls_home_screen(gui_app):
     gui_app.game_id = "test-game"
+    gui_app.use_state_stream = False
     with mock.patch.object(gui_app, "refresh_game_state") as mock_refresh, \
          mock.patch.object(gui_app, "home_screen") as mock_home_screen, \
          mock.patch("time.sleep", return_value=None):
@@ -104,6 +145,70 @@ def test_poll_game_state_exits_and_calls_home_screen(gui_app):
         mock_home_screen.assert_called_once()
 
 
+class FakeRpcError(grpc.RpcError):
+    def __init__(self, code):
+        self._code = code
+
+    def code(self):
+        return self._code
+
+
+def test_stream_game_state_renders_pushed_states(gui_app):
+    gui_app.username = "alice"
+    gui_app.game_id = "game123"
+    gui_app.render_game_state = mock.Mock()
+
+    states = [
+        pb.GameStateResponse(status="success", current_turn="alice"),
+        pb.GameStateResponse(status="success", current_turn="bob"),
+    ]
+    with mock.patch.object(gui_app.stub, "SubscribeGameState", return_value=iter(states)) as mock_subscribe:
+        gui_app.stream_game_state()
+
+    mock_subscribe.assert_called_once_with(pb.GameStateRequest(
+        game_id="game123", username="alice", max_staleness_seconds=gui.MAX_READ_STALENESS))
+    assert gui_app.render_game_state.call_count == 2
+    assert gui_app.use_state_stream
+
+
+def test_stream_game_state_falls_back_to_polling(gui_app):
+    gui_app.username = "alice"
+    gui_app.game_id = "game123"
+
+    with mock.patch.object(gui_app.stub, "SubscribeGameState",
+                           side_effect=FakeRpcError(grpc.StatusCode.UNIMPLEMENTED)):
+        gui_app.stream_game_state()
+
+    assert not gui_app.use_state_stream
+
+
+def test_refused_stream_polls_for_a_while(gui_app):
+    gui_app.username = "alice"
+    gui_app.game_id = "game123"
+
+    with mock.patch.object(gui_app.stub, "SubscribeGameState",
+                           side_effect=FakeRpcError(grpc.StatusCode.RESOURCE_EXHAUSTED)):
+        gui_app.stream_game_state()
+
+    assert gui_app.use_state_stream
+    assert gui_app.state_stream_retry_at > gui.time.time()
+
+
+def test_stale_follower_stream_moves_reads_to_leader(gui_app):
+    gui_app.username = "alice"
+    gui_app.game_id = "game123"
+    gui_app.render_game_state = mock.Mock()
+    follower = mock.Mock()
+    follower.SubscribeGameState.return_value = iter([pb.GameStateResponse(status="error", message="behind")])
+    gui_app.read_address, gui_app.read_stub = "127.0.0.1:60052", follower
+
+    gui_app.stream_game_state()
+
+    gui_app.render_game_state.assert_not_called()
+    assert gui_app.read_address is None
+    assert gui_app.read_stub is gui_app.game_stub
+
+
 def test_refresh_game_state(gui_app):
     gui_app.username = "alice"
     gui_app.game_id = "game123"
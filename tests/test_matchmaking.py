@@ -0,0 +1,55 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from matchmaking import MatchQueue
+
+
+def test_take_returns_longest_waiting_players():
+    queue = MatchQueue()
+    for user in ("a", "b", "c"):
+        queue.enqueue(user, 2)
+    assert queue.take(2) == ["a", "b"]
+    assert queue.take(2) is None
+    assert queue.waiting(2) == ["c"]
+    assert "a" not in queue and "c" in queue
+
+
+def test_enqueue_again_keeps_place_and_changing_size_moves():
+    queue = MatchQueue()
+    queue.enqueue("a", 3)
+    queue.enqueue("b", 3)
+    queue.enqueue("a", 3)
+    assert queue.waiting(3) == ["a", "b"]
+
+    queue.enqueue("a", 2)
+    assert queue.waiting(3) == ["b"]
+    assert queue.waiting(2) == ["a"]
+    assert len(queue) == 2
+
+
+def test_cancel():
+    queue = MatchQueue()
+    queue.enqueue("a", 4)
+    assert queue.cancel("a")
+    assert not queue.cancel("a")
+    assert queue.waiting(4) == []
+    assert len(queue) == 0
+
+
+def test_requeue_puts_players_back_in_front():
+    queue = MatchQueue()
+    for user in ("a", "b", "c"):
+        queue.enqueue(user, 2)
+    players = queue.take(2)
+    queue.enqueue("d", 3)
+    queue.enqueue("a", 3)  # a gave up on the failed table and queued elsewhere
+    queue.requeue(players, 2)
+    assert queue.waiting(2) == ["b", "c"]
+    assert queue.waiting(3) == ["d", "a"]
+
+
+def test_accepts_only_known_sizes():
+    queue = MatchQueue()
+    assert queue.accepts(2) and queue.accepts(4)
+    assert not queue.accepts(5)
@@ -0,0 +1,161 @@
+import os
+import threading
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import card_game_pb2 as pb
+from raft_log import RaftLog
+
+
+def make_log(n):
+    log = RaftLog()
+    for i in range(n):
+        log.append(i, pb.Command())
+    return log
+
+
+def test_compact_drops_prefix():
+    log = make_log(10)
+    games = [pb.GameSnapshot(game_id="g1", version=3)]
+    log.compact(6, games)
+
+    assert len(log) == 3
+    assert [i for i, _ in log] == [7, 8, 9]
+    assert log.snapshot_index == 6
+    assert log.snapshot_games == games
+    assert log.last_index == 9
+
+
+def test_compact_never_moves_backwards():
+    log = make_log(10)
+    log.compact(6, [])
+    log.compact(4, [pb.GameSnapshot(game_id="stale")])
+    assert log.snapshot_index == 6
+    assert log.snapshot_games == []
+
+
+def test_entries_after():
+    log = make_log(10)
+    log.compact(4, [])
+    assert [i for i, _ in log.entries_after(7)] == [8, 9]
+    assert [i for i, _ in log.entries_after(4)] == [5, 6, 7, 8, 9]
+    assert log.entries_after(3) is None
+
+
+def test_reset_discards_all_entries():
+    log = make_log(10)
+    log.reset(2, [])
+    assert len(log) == 0
+    assert log.last_index == 2
+
+
+def test_log_file_survives_restart(tmp_path):
+    path = str(tmp_path / "node.log")
+    log = RaftLog(path)
+    for i in range(5):
+        log.sync(log.append(i, pb.Command(pass_turn=pb.GameActionRequest(username=f"p{i}", game_id="g"))))
+    log.close()
+
+    reopened = RaftLog(path)
+    assert [i for i, _ in reopened] == [0, 1, 2, 3, 4]
+    assert [c.pass_turn.username for _, c in reopened] == ["p0", "p1", "p2", "p3", "p4"]
+    reopened.close()
+
+
+def test_torn_record_is_cut_off(tmp_path):
+    path = str(tmp_path / "node.log")
+    log = RaftLog(path)
+    for i in range(3):
+        log.append(i, pb.Command(pass_turn=pb.GameActionRequest(username="alice", game_id="g")))
+    log.close()
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 2)
+
+    reopened = RaftLog(path)
+    assert [i for i, _ in reopened] == [0, 1]
+    reopened.sync(reopened.append(2, pb.Command()))
+    reopened.close()
+    assert [i for i, _ in RaftLog(path)] == [0, 1, 2]
+
+
+def test_compaction_is_durable(tmp_path):
+    path = str(tmp_path / "node.log")
+    log = RaftLog(path)
+    for i in range(10):
+        log.append(i, pb.Command())
+    log.compact(6, [pb.GameSnapshot(game_id="g1", version=3)])
+    log.close()
+
+    reopened = RaftLog(path)
+    assert reopened.snapshot_index == 6
+    assert [g.game_id for g in reopened.snapshot_games] == ["g1"]
+    assert [i for i, _ in reopened] == [7, 8, 9]
+    reopened.close()
+
+
+def test_concurrent_appends_share_fsyncs(tmp_path):
+    log = RaftLog(str(tmp_path / "node.log"))
+    lock = threading.Lock()
+    counter = iter(range(10000))
+
+    def writer():
+        for _ in range(25):
+            with lock:
+                ticket = log.append(next(counter), pb.Command())
+            log.sync(ticket)
+
+    threads = [threading.Thread(target=writer) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert log.file.durable == 200
+    assert log.file.fsyncs < 200
+    log.close()
+
+
+def test_abort_and_commit_survive_restart(tmp_path):
+    path = str(tmp_path / "node.log")
+    log = RaftLog(path)
+    for i in range(4):
+        log.append(i, pb.Command(pass_turn=pb.GameActionRequest(username=f"p{i}", game_id="g")))
+    log.abort(1)
+    log.mark_committed(2)
+    assert log.aborted == {1}
+    assert log.entries[1] == (1, pb.Command())
+    log.close()
+
+    reopened = RaftLog(path)
+    assert [i for i, _ in reopened] == [0, 1, 2, 3]
+    assert [c.pass_turn.username for _, c in reopened] == ["p0", "", "p2", "p3"]
+    assert reopened.aborted == {1}
+    assert reopened.committed == 2
+    reopened.close()
+
+
+def test_compaction_keeps_aborts_since_the_previous_snapshot():
+    log = make_log(10)
+    log.abort(2)
+    log.abort(7)
+    log.compact(4, [])
+    assert log.aborted_since == -1 and log.aborted == {2, 7}
+    log.compact(8, [])
+    assert log.aborted_since == 4 and log.aborted == {7}
+    assert log.committed == 8
+
+
+def test_truncate_drops_later_entries(tmp_path):
+    path = str(tmp_path / "node.log")
+    log = RaftLog(path)
+    for i in range(5):
+        log.append(i, pb.Command(pass_turn=pb.GameActionRequest(username="alice", game_id="g")))
+    log.mark_committed(1)
+    log.truncate(2)
+    log.close()
+
+    reopened = RaftLog(path)
+    assert [i for i, _ in reopened] == [0, 1, 2]
+    assert reopened.committed == 1
+    reopened.close()
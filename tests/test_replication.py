@@ -0,0 +1,228 @@
+import threading
+import time
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import card_game_pb2 as pb
+import replication
+from replication import QuorumWaiter, Replicator
+
+
+class FakeFuture:
+    def __init__(self):
+        self._callbacks = []
+        self._error = None
+        self._result = None
+        self.done = False
+
+    def finish(self, status="success", error=None, message=""):
+        self._result = pb.Response(status=status, message=message)
+        self._error = error
+        self.done = True
+        for fn in self._callbacks:
+            fn(self)
+
+    def exception(self):
+        return self._error
+
+    def result(self):
+        return self._result
+
+    def add_done_callback(self, fn):
+        if self.done:
+            fn(self)
+        else:
+            self._callbacks.append(fn)
+
+
+class FakeAppendLog:
+    """Stands in for stub.AppendLog; either acks at once or holds futures open."""
+
+    def __init__(self, auto_ack=True, fail_first=0):
+        self.auto_ack = auto_ack
+        self.fail_first = fail_first
+        self.sent = []
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def future(self, message, timeout=None):
+        f = FakeFuture()
+        with self.lock:
+            self.sent.append(message)
+            failing = self.fail_first > 0
+            if failing:
+                self.fail_first -= 1
+        if failing:
+            f.finish(error=Exception("unavailable"))
+        elif self.auto_ack:
+            f.finish()
+        else:
+            with self.lock:
+                self.pending.append(f)
+        return f
+
+
+class FakeStub:
+    def __init__(self, append_log):
+        self.AppendLog = append_log
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_quorum_waiter_majority():
+    waiter = QuorumWaiter(needed=1, total=2)
+    threading.Timer(0.05, waiter.ack).start()
+    assert waiter.wait(1.0)
+
+
+def test_quorum_waiter_gives_up_when_majority_unreachable():
+    waiter = QuorumWaiter(needed=2, total=2)
+    waiter.first_attempt_failed()
+    start = time.time()
+    assert not waiter.wait(5.0)
+    assert time.time() - start < 1.0
+
+
+def test_quorum_waiter_no_replicas():
+    assert QuorumWaiter(needed=0, total=0).wait(0)
+
+
+def test_quorum_waiter_done_callback():
+    waiter = QuorumWaiter(needed=1, total=2)
+    outcomes = []
+    waiter.add_done_callback(outcomes.append)
+    assert outcomes == []
+    waiter.ack()
+    waiter.ack()
+    waiter.add_done_callback(outcomes.append)
+    assert outcomes == [True, True]
+
+    failed = QuorumWaiter(needed=1, total=1)
+    failed.add_done_callback(outcomes.append)
+    failed.first_attempt_failed()
+    assert outcomes[-1] is False
+
+
+def test_replicator_sends_in_index_order():
+    append_log = FakeAppendLog()
+    replicator = Replicator("fake:1", FakeStub(append_log))
+    waiter = QuorumWaiter(needed=1, total=1)
+    for i in range(20):
+        replicator.send(pb.LogEntry(index=i), waiter)
+
+    assert wait_until(lambda: len(append_log.sent) == 20)
+    assert [m.index for m in append_log.sent] == list(range(20))
+    assert [m.first_entry for m in append_log.sent] == [True] + [False] * 19
+    replicator.stop()
+
+
+def test_replicator_limits_in_flight_window():
+    append_log = FakeAppendLog(auto_ack=False)
+    replicator = Replicator("fake:1", FakeStub(append_log), window=3)
+    waiter = QuorumWaiter(needed=1, total=1)
+    for i in range(5):
+        replicator.send(pb.LogEntry(index=i), waiter)
+
+    assert wait_until(lambda: len(append_log.sent) == 3)
+    time.sleep(0.05)
+    assert len(append_log.sent) == 3
+
+    append_log.pending[0].finish()
+    assert wait_until(lambda: len(append_log.sent) == 4)
+    replicator.stop()
+
+
+def test_replicator_retries_failed_entries(monkeypatch):
+    monkeypatch.setattr(replication, "RETRY_DELAY", 0.01)
+    append_log = FakeAppendLog(fail_first=2)
+    replicator = Replicator("fake:1", FakeStub(append_log))
+    waiter = QuorumWaiter(needed=1, total=1)
+    replicator.send(pb.LogEntry(index=0), waiter)
+
+    assert wait_until(lambda: waiter.acks == 1)
+    assert [m.index for m in append_log.sent] == [0, 0, 0]
+    replicator.stop()
+
+
+def test_replicator_sends_snapshot_to_lagging_replica(monkeypatch):
+    monkeypatch.setattr(replication, "MAX_BACKLOG", 3)
+    append_log = FakeAppendLog(auto_ack=False)
+    installs = []
+    replicator = Replicator("fake:1", FakeStub(append_log), window=1,
+                            install_snapshot=lambda s, through: installs.append(through) or 4)
+    waiters = [QuorumWaiter(needed=1, total=1) for _ in range(6)]
+
+    replicator.send(pb.LogEntry(index=0), waiters[0])
+    assert wait_until(lambda: len(append_log.sent) == 1)
+    # entry 0 stays in flight while 1-3 queue up; entry 4 overflows the backlog
+    for i in range(1, 6):
+        replicator.send(pb.LogEntry(index=i), waiters[i])
+
+    assert wait_until(lambda: len(installs) == 1)
+    assert installs == [3]  # the snapshot must cover every dropped entry
+    assert all(not w.wait(0) for w in waiters[1:4])
+
+    append_log.pending[0].finish()
+    assert wait_until(lambda: len(append_log.sent) == 2)
+    assert append_log.sent[-1].index == 5
+    assert append_log.sent[-1].first_entry
+    assert not waiters[4].wait(0)
+    replicator.stop()
+
+
+def test_replicator_retries_snapshot_that_leaves_a_gap(monkeypatch):
+    monkeypatch.setattr(replication, "MAX_BACKLOG", 2)
+    monkeypatch.setattr(replication, "RETRY_DELAY", 0.01)
+    append_log = FakeAppendLog(auto_ack=False)
+    covered = iter([1, 2])  # the first snapshot stops short of the dropped entries
+    installs = []
+    replicator = Replicator("fake:1", FakeStub(append_log), window=1,
+                            install_snapshot=lambda s, through: installs.append(through) or next(covered))
+
+    replicator.send(pb.LogEntry(index=0), QuorumWaiter(needed=1, total=1))
+    assert wait_until(lambda: len(append_log.sent) == 1)
+    for i in range(1, 4):
+        replicator.send(pb.LogEntry(index=i), QuorumWaiter(needed=1, total=1))
+
+    assert wait_until(lambda: len(installs) == 2)
+    assert installs == [2, 2]
+    assert replicator.snapshot_index == 2
+    replicator.stop()
+
+
+def test_replicator_stamps_entries_with_the_commit_when_sent():
+    append_log = FakeAppendLog()
+    commits = iter([pb.Commit(index=4), pb.Commit(index=5, aborted=[5])])
+    replicator = Replicator("fake:1", FakeStub(append_log), commit_info=lambda: next(commits))
+    for i in (5, 6):
+        replicator.send(pb.LogEntry(index=i), QuorumWaiter(needed=1, total=1))
+
+    assert wait_until(lambda: len(append_log.sent) == 2)
+    assert [m.commit.index for m in append_log.sent] == [4, 5]
+    assert list(append_log.sent[1].commit.aborted) == [5]
+    replicator.stop()
+
+
+def test_replicator_sends_snapshot_when_replica_asks():
+    append_log = FakeAppendLog(auto_ack=False)
+    installs = []
+    replicator = Replicator("fake:1", FakeStub(append_log),
+                            install_snapshot=lambda s, through: installs.append(through) or 7)
+    waiter = QuorumWaiter(needed=1, total=1)
+    replicator.send(pb.LogEntry(index=3), waiter)
+    assert wait_until(lambda: len(append_log.pending) == 1)
+
+    append_log.pending[0].finish(message=replication.SNAPSHOT_REQUESTED)
+    assert waiter.wait(0)  # the entry itself is on the replica's disk
+    assert wait_until(lambda: installs == [-1])
+    assert wait_until(lambda: replicator.snapshot_index == 7)
+    replicator.stop()
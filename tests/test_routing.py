@@ -0,0 +1,227 @@
+import os
+import sys
+import threading
+import time
+from concurrent import futures
+
+import grpc
+import pytest
+from google.protobuf.empty_pb2 import Empty
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import card_game_pb2 as pb
+import card_game_pb2_grpc as stub
+from routing import MATCHMAKING_GROUP, group_for, home_group, leader_for, matchmaker_for
+from server import CardGameService, GameSession
+
+GROUP_PORTS = [60064, 60065]
+GROUP_MEMBERS = [[f"127.0.0.1:{port}"] for port in GROUP_PORTS]
+
+
+def remove_node_files(port):
+    for path in (f"cardgame-{port}.db", f"cardgame-{port}.log", f"cardgame-{port}.snapshot"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def game_id_in(group, prefix="g"):
+    """A game id that group_for() places in `group`."""
+    return next(f"{prefix}{i}" for i in range(1000) if group_for(f"{prefix}{i}", len(GROUP_PORTS)) == group)
+
+
+def user_in(group, prefix="u"):
+    """A username that home_group() places in `group`."""
+    return next(f"{prefix}{i}" for i in range(1000) if home_group(f"{prefix}{i}", len(GROUP_PORTS)) == group)
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def user_row(service, username):
+    return service.storage.execute_query("SELECT num_win, num_lost FROM users WHERE username=?", (username,)).fetchone()
+
+
+@pytest.fixture(scope="module")
+def groups():
+    services, servers = [], []
+    for group, port in enumerate(GROUP_PORTS):
+        remove_node_files(port)
+        service = CardGameService(port=port, is_leader=True, monitor=False, group=group, group_members=GROUP_MEMBERS)
+        server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+        stub.add_CardGameServiceServicer_to_server(service, server)
+        server.add_insecure_port(f"0.0.0.0:{port}")
+        server.start()
+        services.append(service)
+        servers.append(server)
+    yield services
+    for service, server, port in zip(services, servers, GROUP_PORTS):
+        server.stop(0)
+        service.stop_results()
+        service.turn_timer.stop()
+        service.storage.close()
+        service.log.close()
+        remove_node_files(port)
+
+
+def test_group_for_spreads_games():
+    ids = [f"game{i}" for i in range(400)]
+    assert {group_for(gid, 4) for gid in ids} == {0, 1, 2, 3}
+
+
+def test_leader_for():
+    table = pb.RoutingTable(group_leaders=["a:1", "b:2"])
+    assert leader_for(table, game_id_in(1)) == "b:2"
+    assert leader_for(pb.RoutingTable(), "x") == ""
+
+
+def test_matchmaker_for():
+    table = pb.RoutingTable(group_leaders=["a:1", "b:2"])
+    assert matchmaker_for(table) == table.group_leaders[MATCHMAKING_GROUP]
+    assert matchmaker_for(pb.RoutingTable()) == ""
+
+
+def test_routing_table_lists_every_group_leader(groups):
+    first, second = groups
+    first.refresh_routes()
+    table = first.GetRoutingTable(Empty(), None)
+    assert table.group == 0
+    assert list(table.group_leaders) == [f"{first.ip}:{GROUP_PORTS[0]}", f"{second.ip}:{GROUP_PORTS[1]}"]
+
+
+def test_create_game_lands_in_the_owning_group(groups):
+    first, second = groups
+    local, remote = game_id_in(0), game_id_in(1)
+
+    assert first.create_game(GameSession(local, ["alice", "bob"]))
+    assert first.create_game(GameSession(remote, ["carol", "dave"]))
+
+    assert local in first.active_games and local not in second.active_games
+    assert remote in second.active_games and remote not in first.active_games
+    assert second.active_games[remote].players == ["carol", "dave"]
+
+
+def test_create_game_rejects_games_of_other_groups(groups):
+    _, second = groups
+    res = second.CreateGame(GameSession(game_id_in(0), ["alice", "bob"]).to_snapshot(), None)
+    assert res.status == "error"
+
+
+def test_matchmaking_hands_games_to_their_group(groups):
+    first, second = groups
+    results = {}
+
+    def find_game(username):
+        while True:
+            res = first.StartMatch(pb.MatchRequest(username=username, num_players=2), None)
+            if res.status == "success":
+                results[username] = res.message.split("ID: ")[1]
+                return
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=find_game, args=(u,)) for u in ("erin", "frank")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    game_id = results["erin"]
+    assert results["frank"] == game_id
+    owner = groups[group_for(game_id, len(groups))]
+    assert sorted(owner.active_games[game_id].players) == ["erin", "frank"]
+
+
+def test_players_of_different_groups_are_matched(groups):
+    first, second = groups
+    results = {}
+
+    def find_game(service, username):
+        while True:
+            res = service.StartMatch(pb.MatchRequest(username=username, num_players=2), None)
+            if res.status == "success":
+                results[username] = res.message.split("ID: ")[1]
+                return
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=find_game, args=(first, "gina")),
+               threading.Thread(target=find_game, args=(second, "hank"))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert results["gina"] == results["hank"]
+    # the second group forwarded its player to the matchmaking group's queue
+    assert second.match_results == {} and "hank" not in second.match_queue
+
+
+def test_wait_for_match_is_relayed_to_the_matchmaking_group(groups):
+    results = {}
+
+    def wait(port, username):
+        with grpc.insecure_channel(f"127.0.0.1:{port}") as channel:
+            updates = list(stub.CardGameServiceStub(channel).WaitForMatch(pb.MatchRequest(username=username, num_players=2)))
+        results[username] = updates[-1]
+
+    threads = [threading.Thread(target=wait, args=(GROUP_PORTS[0], "ivy")),
+               threading.Thread(target=wait, args=(GROUP_PORTS[1], "jack"))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert results["ivy"].status == results["jack"].status == "success"
+    assert results["ivy"].game_id == results["jack"].game_id
+    assert groups[MATCHMAKING_GROUP].match_results == {}
+
+
+def test_home_group_spreads_users():
+    assert {home_group(f"user{i}", 4) for i in range(400)} == {0, 1, 2, 3}
+
+
+def test_accounts_live_in_their_home_group(groups):
+    first, second = groups
+    username = user_in(1, "acct")
+
+    assert first.Login(pb.LoginRequest(username=username, password="pw"), None).status == "success"
+    assert user_row(second, username) and not user_row(first, username)
+    assert first.Login(pb.LoginRequest(username=username, password="wrong"), None).status == "error"
+
+    assert first.DeleteAccount(pb.DeleteAccountRequest(username=username, password="pw"), None).status == "success"
+    assert not user_row(second, username)
+
+
+def test_results_are_counted_in_the_players_home_groups(groups):
+    first, second = groups
+    home, away = user_in(0, "res"), user_in(1, "res")
+    for username in (home, away):
+        first.Login(pb.LoginRequest(username=username, password="pw"), None)
+    game_id = game_id_in(0, "result")
+    assert first.create_game(GameSession(game_id, [home, away]))
+
+    res = first.QuitGame(pb.GameActionRequest(username=home, game_id=game_id), None)
+    assert res.status == "success"
+
+    # the quitter is homed here; the winner's record is in the other group
+    assert tuple(user_row(first, home)) == (0, 2)
+    assert not user_row(first, away)
+    assert wait_until(lambda: tuple(user_row(second, away)) == (1, 0))
+    assert wait_until(lambda: not first.storage.queued_results())
+    assert wait_until(lambda: first.win_rate(away) == 1.0)
+
+    # a result delivered again, e.g. by a new leader, is not counted twice
+    res = second.RecordResult(pb.GameResult(result_id=f"{game_id}:winner", winners=[away]), None)
+    assert res.status == "success"
+    assert tuple(user_row(second, away)) == (1, 0)
+
+
+def test_record_result_rejects_players_of_other_groups(groups):
+    first, _ = groups
+    res = first.RecordResult(pb.GameResult(result_id="elsewhere", winners=[user_in(1)]), None)
+    assert res.status == "error"
@@ -0,0 +1,63 @@
+import threading
+import time
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from scheduler import DeadlineScheduler
+
+
+def test_fires_in_deadline_order():
+    scheduler = DeadlineScheduler()
+    fired = []
+    done = threading.Event()
+    now = time.time()
+
+    def record(key):
+        fired.append(key)
+        if len(fired) == 3:
+            done.set()
+
+    scheduler.schedule("c", now + 0.15, lambda: record("c"))
+    scheduler.schedule("a", now + 0.05, lambda: record("a"))
+    scheduler.schedule("b", now + 0.10, lambda: record("b"))
+
+    assert done.wait(2)
+    assert fired == ["a", "b", "c"]
+    assert len(scheduler) == 0
+    scheduler.stop()
+
+
+def test_reschedule_replaces_previous_deadline():
+    scheduler = DeadlineScheduler()
+    fired = []
+    done = threading.Event()
+
+    scheduler.schedule("game", time.time() + 0.05, lambda: fired.append("early"))
+    scheduler.schedule("game", time.time() + 0.1, lambda: (fired.append("late"), done.set()))
+
+    assert done.wait(2)
+    time.sleep(0.1)
+    assert fired == ["late"]
+    scheduler.stop()
+
+
+def test_cancel():
+    scheduler = DeadlineScheduler()
+    fired = []
+    scheduler.schedule("game", time.time() + 0.05, lambda: fired.append("game"))
+    scheduler.cancel("game")
+    time.sleep(0.15)
+    assert fired == []
+    assert len(scheduler) == 0
+    scheduler.stop()
+
+
+def test_many_keys_share_one_thread():
+    before = threading.active_count()
+    scheduler = DeadlineScheduler(workers=1)
+    for i in range(10000):
+        scheduler.schedule(i, time.time() + 60, lambda: None)
+    assert len(scheduler) == 10000
+    assert threading.active_count() <= before + 1
+    scheduler.stop()
@@ -13,7 +13,10 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import card_game_pb2 as pb
 import card_game_pb2_grpc as stub
+import gui
+import server
 from server import CardGameService, GameSession
+from session import Hand
 from storage import Storage
 
 TEST_PORT = 60051
@@ -24,10 +27,18 @@ TEST_USERNAME_2 = "bob2"
 TEST_GAME_ID = None
 
 
+def remove_log_files(port):
+    for path in (f"cardgame-{port}.log", f"cardgame-{port}.snapshot"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
 @pytest.fixture(scope="module")
 def grpc_server():
     if os.path.exists(TEST_DB):
         os.remove(TEST_DB)
+    remove_log_files(TEST_PORT)
+    remove_log_files(60052)
 
     server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
     servicer = CardGameService(port=TEST_PORT, is_leader=True, replica_addresses=[])
@@ -38,8 +49,12 @@ def grpc_server():
     time.sleep(1) 
     yield servicer 
     server.stop(0)
+    servicer.storage.close()
+    servicer.log.close()
     if os.path.exists(TEST_DB):
         os.remove(TEST_DB)
+    remove_log_files(TEST_PORT)
+    remove_log_files(60052)
 
 @pytest.fixture
 def stub_client():
@@ -70,6 +85,65 @@ def test_start_match(grpc_server, stub_client):
     TEST_GAME_ID = game_id
 
 
+def test_cancel_match(grpc_server, stub_client):
+    resp = stub_client.StartMatch(pb.MatchRequest(username="carol2", num_players=3))
+    assert resp.status == "waiting"
+    assert "carol2" in grpc_server.match_queue
+
+    resp = stub_client.CancelMatch(pb.MatchCancelRequest(username="carol2"))
+    assert resp.status == "success"
+    assert "carol2" not in grpc_server.match_queue
+
+    resp = stub_client.CancelMatch(pb.MatchCancelRequest(username="carol2"))
+    assert resp.status == "error"
+
+
+def test_wait_for_match_pushes_game_to_both_players(grpc_server, stub_client):
+    first = stub_client.WaitForMatch(pb.MatchRequest(username="wait_a", num_players=2))
+    assert next(first).status == "waiting"
+
+    second = list(stub_client.WaitForMatch(pb.MatchRequest(username="wait_b", num_players=2)))
+    first = list(first)
+
+    assert first[-1].status == second[-1].status == "success"
+    game_id = first[-1].game_id
+    assert game_id and second[-1].game_id == game_id
+    assert sorted(grpc_server.active_games[game_id].players) == ["wait_a", "wait_b"]
+    assert "wait_a" not in grpc_server.match_results and "wait_b" not in grpc_server.match_results
+
+
+def test_closing_wait_for_match_leaves_the_queue(grpc_server, stub_client):
+    updates = stub_client.WaitForMatch(pb.MatchRequest(username="wait_c", num_players=4))
+    assert next(updates).status == "waiting"
+    assert "wait_c" in grpc_server.match_queue
+
+    updates.cancel()
+    for _ in range(50):
+        if "wait_c" not in grpc_server.match_queue:
+            break
+        time.sleep(0.05)
+    assert "wait_c" not in grpc_server.match_queue
+    assert "wait_c" not in grpc_server.match_results
+
+
+def test_leaving_while_game_is_set_up_drops_the_result(grpc_server, monkeypatch):
+    create_game = grpc_server.create_game
+
+    def create_and_leave(session):
+        grpc_server.leave_match("wait_d")  # wait_d's stream closes mid-setup
+        return create_game(session)
+
+    monkeypatch.setattr(grpc_server, "create_game", create_and_leave)
+    grpc_server.join_match("wait_d", 2)
+    grpc_server.join_match("wait_e", 2)
+
+    assert "wait_d" not in grpc_server.match_results
+    assert not grpc_server.match_abandoned
+    status, _, game_id = grpc_server.join_match("wait_e", 2)
+    assert status == "success"
+    assert sorted(grpc_server.active_games[game_id].players) == ["wait_d", "wait_e"]
+
+
 def test_play_card_and_get_state(grpc_server, stub_client):
     global TEST_GAME_ID
     state = stub_client.GetGameState(pb.GameStateRequest(game_id=TEST_GAME_ID, username=TEST_USERNAME_1))
@@ -110,6 +184,65 @@ def test_quit_game_and_check_winner(grpc_server, stub_client):
     assert state2.game_over
     assert state2.winner != other
 
+def test_subscribe_game_state_pushes_changes(grpc_server, stub_client):
+    session = GameSession("subgame", ["alice", "bob"])
+    grpc_server.active_games["subgame"] = session
+
+    stream = stub_client.SubscribeGameState(pb.GameStateRequest(game_id="subgame", username="alice"))
+    first = next(stream)
+    assert first.status == "success"
+    assert first.current_turn == "alice"
+    assert len(next(p.cards for p in first.players if p.username == "alice")) == 20
+
+    session.pass_turn("alice")
+    second = next(stream)
+    assert second.current_turn == "bob"
+
+    session.quit_game("alice")
+    states = list(stream)
+    assert states[-1].game_over
+    assert states[-1].winner == "bob"
+
+def test_subscribe_game_state_invalid_game(grpc_server, stub_client):
+    states = list(stub_client.SubscribeGameState(pb.GameStateRequest(game_id="nope", username="alice")))
+    assert len(states) == 1
+    assert states[0].status == "error"
+
+def test_streams_past_the_cap_are_refused(grpc_server, stub_client, monkeypatch):
+    monkeypatch.setattr(grpc_server, "stream_slots", threading.BoundedSemaphore(1))
+    grpc_server.active_games["capped"] = GameSession("capped", ["alice", "bob"])
+    request = pb.GameStateRequest(game_id="capped", username="alice")
+
+    held = stub_client.SubscribeGameState(request)
+    assert next(held).status == "success"
+    with pytest.raises(grpc.RpcError) as refused:
+        next(stub_client.SubscribeGameState(request))
+    assert refused.value.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+    # the workers the cap keeps free still answer heartbeats
+    assert stub_client.Heartbeat(pb.HeartbeatRequest(), timeout=2).status == "alive"
+
+    held.cancel()
+    for _ in range(50):
+        if grpc_server.stream_slots.acquire(blocking=False):
+            grpc_server.stream_slots.release()
+            break
+        time.sleep(0.1)
+    assert next(stub_client.SubscribeGameState(request)).status == "success"
+
+def test_wait_for_match_shares_the_stream_cap(grpc_server, stub_client, monkeypatch):
+    monkeypatch.setattr(grpc_server, "stream_slots", threading.BoundedSemaphore(1))
+    held = stub_client.WaitForMatch(pb.MatchRequest(username="capped_a", num_players=4))
+    assert next(held).status == "waiting"
+
+    with pytest.raises(grpc.RpcError) as refused:
+        next(stub_client.WaitForMatch(pb.MatchRequest(username="capped_b", num_players=4)))
+    assert refused.value.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+    # the refused player can still queue the polling way
+    assert stub_client.StartMatch(pb.MatchRequest(username="capped_b", num_players=4)).status == "waiting"
+
+    held.cancel()
+    stub_client.CancelMatch(pb.MatchCancelRequest(username="capped_b"))
+
 def test_logout_and_relogin(grpc_server, stub_client):
     resp = stub_client.Logout(pb.LogoutRequest(username=TEST_USERNAME_1))
     assert resp.status == "success"
@@ -121,18 +254,139 @@ def test_who_is_leader(grpc_server, stub_client):
     resp = stub_client.WhoIsLeader(Empty())
     assert resp.is_leader
     assert resp.leader_address.endswith(str(TEST_PORT))
+    assert list(resp.replica_addresses) == grpc_server.replica_addresses
 
 def test_append_log(grpc_server, stub_client):
-    fake_command = {
-        "type": "play_card",
-        "username": TEST_USERNAME_1,
-        "game_id": TEST_GAME_ID,
-        "cards": [1]
-    }
-    entry = pb.LogEntry(index=999, command="play_card", payload=str(fake_command))
+    fake_command = pb.Command(play_card=pb.PlayCardRequest(
+        username=TEST_USERNAME_1,
+        game_id=TEST_GAME_ID,
+        cards=[1]
+    ))
+    entry = pb.LogEntry(index=999, command=fake_command, first_entry=True)
     resp = stub_client.AppendLog(entry)
     assert resp.status == "success"
 
+def decided(index, aborted=()):
+    """The commit info of a leader that decided every entry through `index`."""
+    return pb.Commit(index=index, aborted_since=-1, aborted=aborted)
+
+def test_append_log_applies_entries_in_index_order(grpc_server):
+    session = GameSession("ordergame", ["alice", "bob"])
+    grpc_server.active_games["ordergame"] = session
+    base = grpc_server.commit_index + 100
+    pass_alice = pb.Command(pass_turn=pb.GameActionRequest(username="alice", game_id="ordergame"))
+    pass_bob = pb.Command(pass_turn=pb.GameActionRequest(username="bob", game_id="ordergame"))
+
+    # the second entry overtakes the first one and is held until it arrives
+    with futures.ThreadPoolExecutor(max_workers=1) as pool:
+        overtaking = pool.submit(grpc_server.AppendLog, pb.LogEntry(index=base + 1, command=pass_bob), None)
+        time.sleep(0.1)
+        assert session.version == 0
+        assert not overtaking.done()
+
+        grpc_server.AppendLog(pb.LogEntry(index=base, command=pass_alice, first_entry=True), None)
+        assert overtaking.result(timeout=2).status == "success"
+    # logged, but not applied until the leader says they are decided
+    assert grpc_server.last_logged == base + 1
+    assert session.version == 0
+
+    grpc_server.AppendLog(pb.LogEntry(index=base + 1, command=pass_bob, commit=decided(base + 1)), None)
+    assert session.version == 2
+    assert session.get_current_player() == "alice"
+    assert grpc_server.commit_index == base + 1
+
+    resp = grpc_server.AppendLog(pb.LogEntry(index=base, command=pass_alice), None)
+    assert resp.message == "Already applied"
+    assert session.version == 2
+
+def test_append_log_compacts_committed_entries(grpc_server, monkeypatch):
+    monkeypatch.setattr(server, "LOG_COMPACTION_THRESHOLD", 4)
+    session = GameSession("compactgame", ["alice", "bob"])
+    grpc_server.active_games["compactgame"] = session
+    base = grpc_server.commit_index + 100
+
+    for i in range(5):
+        player = session.get_current_player()
+        command = pb.Command(pass_turn=pb.GameActionRequest(username=player, game_id="compactgame"))
+        grpc_server.AppendLog(pb.LogEntry(index=base + i, command=command, first_entry=(i == 0),
+                                          commit=decided(base + i)), None)
+
+    assert grpc_server.log.snapshot_index == grpc_server.commit_index == base + 4
+    assert len(grpc_server.log) == 0
+    snapshot = next(g for g in grpc_server.log.snapshot_games if g.game_id == "compactgame")
+    assert snapshot.version == session.version == 5
+    assert grpc_server.log.entries_after(base) is None
+
+def test_install_snapshot_rejected_on_leader(grpc_server):
+    resp = grpc_server.InstallSnapshot(iter([pb.SnapshotChunk(last_included_index=1)]), None)
+    assert resp.status == "error"
+
+class FakeHeartbeatCall:
+    def __init__(self, alive):
+        self.alive = alive
+
+    def result(self):
+        if not self.alive:
+            raise grpc.RpcError()
+        return pb.Response(status="alive")
+
+
+class FakeHeartbeatStub:
+    def __init__(self, alive, calls):
+        self.alive = alive
+        self.calls = calls
+        self.Heartbeat = self
+
+    def future(self, request, timeout=None):
+        self.calls.append(timeout)
+        return FakeHeartbeatCall(self.alive)
+
+
+def test_send_heartbeats_removes_replica_only_after_detector_threshold(grpc_server, monkeypatch):
+    from failure_detector import PhiAccrualDetector
+    clock = [0.0]
+    calls = []
+    addresses = ["10.0.0.1:1", "10.0.0.2:1"]
+    monkeypatch.setattr(grpc_server, "replica_addresses", list(addresses))
+    monkeypatch.setattr(grpc_server, "replicas", [FakeHeartbeatStub(True, calls), FakeHeartbeatStub(False, calls)])
+    monkeypatch.setattr(grpc_server, "replicators", {})
+    monkeypatch.setattr(grpc_server, "detectors", {
+        addr: PhiAccrualDetector(3.0, acceptable_pause=3.0, clock=lambda: clock[0]) for addr in addresses
+    })
+    monkeypatch.setattr(grpc_server, "broadcast_replica_list", MagicMock())
+
+    # one missed heartbeat is not enough
+    clock[0] = 3.0
+    grpc_server.send_heartbeats()
+    assert grpc_server.replica_addresses == addresses
+    assert calls == [server.HEARTBEAT_TIMEOUT] * 2
+
+    for _ in range(3):
+        clock[0] += 3.0
+        grpc_server.send_heartbeats()
+    assert grpc_server.replica_addresses == ["10.0.0.1:1"]
+    assert "10.0.0.2:1" not in grpc_server.detectors
+    assert "10.0.0.2:1" not in grpc_server.channels
+    grpc_server.broadcast_replica_list.assert_called_once()
+
+def test_become_leader_reuses_pooled_channels(grpc_server, monkeypatch):
+    monkeypatch.setattr(grpc_server, "leader_stub", None, raising=False)
+    for attr in ("replicas", "replicators", "detectors", "is_leader", "state"):
+        monkeypatch.setattr(grpc_server, attr, getattr(grpc_server, attr))
+    monkeypatch.setattr(grpc_server, "replica_addresses", ["127.0.0.1:9997"])
+    monkeypatch.setattr(grpc_server, "broadcast_replica_list", MagicMock())
+    monkeypatch.setattr(grpc_server, "leader_address", "127.0.0.1:9996")
+    old_leader = grpc_server.channels.stub("127.0.0.1:9996")
+    replica = grpc_server.channels.stub("127.0.0.1:9997")
+
+    with patch("server.stub.CardGameServiceStub") as mock_stub_cls:
+        grpc_server.become_leader()
+        mock_stub_cls.assert_not_called()
+
+    assert grpc_server.replicas == [replica]
+    assert "127.0.0.1:9996" not in grpc_server.channels
+    grpc_server.replicators["127.0.0.1:9997"].stop()
+
 def test_register_replica(grpc_server):
     resp = grpc_server.RegisterReplica(pb.RegisterReplicaRequest(replica_address="127.0.0.1:60052"), None)
     assert resp.status == "success"
@@ -148,6 +402,337 @@ def test_sync_all_games(grpc_server, stub_client):
     resp = stub_client.SyncAllGames(Empty())
     assert resp.status == "success"
 
+def test_sync_games_returns_only_changed_games(grpc_server, stub_client):
+    session = GameSession("deltagame", ["alice", "bob"])
+    grpc_server.active_games["deltagame"] = session
+    known = {gid: s.version for gid, s in grpc_server.active_games.items()}
+
+    resp = stub_client.SyncGames(pb.GameSyncRequest(known_versions=known))
+    assert resp.status == "success"
+    assert len(resp.games) == 0
+
+    session.pass_turn("alice")
+    known["gone"] = 3
+    resp = stub_client.SyncGames(pb.GameSyncRequest(known_versions=known))
+    assert [g.game_id for g in resp.games] == ["deltagame"]
+    assert resp.games[0].version == session.version
+    assert list(resp.removed_game_ids) == ["gone"]
+
+def test_follower_pulls_a_large_delta_a_page_at_a_time(grpc_server, monkeypatch):
+    monkeypatch.setattr(server, "GAMES_PER_MESSAGE", 2)
+    games = {f"pagegame{i}": GameSession(f"pagegame{i}", ["alice", "bob"]) for i in range(5)}
+    monkeypatch.setattr(grpc_server, "active_games", games)
+    follower = make_read_follower()
+    follower.active_games = {}
+    follower.leader_stub.SyncGames.side_effect = lambda request: grpc_server.SyncGames(request, None)
+
+    follower.pull_games_from_leader()
+
+    assert sorted(follower.active_games) == sorted(games)
+    assert follower.leader_stub.SyncGames.call_count == 3
+    close_node(follower)
+
+def test_finished_game_leaves_the_leader_and_its_followers(grpc_server, monkeypatch):
+    monkeypatch.setattr(server, "FINISHED_GAME_TTL", 0.05)
+    grpc_server.active_games["endgame"] = GameSession("endgame", ["alice", "bob"])
+    grpc_server.apply_command(pb.Command(quit_game=pb.GameActionRequest(username="bob", game_id="endgame")))
+    assert grpc_server.active_games["endgame"].winner == "alice"
+
+    deadline = time.time() + 2
+    while "endgame" in grpc_server.active_games and time.time() < deadline:
+        time.sleep(0.01)
+    assert "endgame" not in grpc_server.active_games
+    resp = grpc_server.SyncGames(pb.GameSyncRequest(known_versions={"endgame": 1}), None)
+    assert list(resp.removed_game_ids) == ["endgame"]
+
+def test_pull_games_from_leader_applies_delta():
+    with patch.object(CardGameService, "monitor_heartbeat"):
+        follower = CardGameService(port=60052, is_leader=False, leader_address="127.0.0.1:60051")
+    stale = GameSession("stale", ["alice", "bob"])
+    follower.active_games = {"stale": stale, "finished": GameSession("finished", ["carol", "dave"])}
+
+    leader_copy = GameSession("stale", ["alice", "bob"])
+    leader_copy.pass_turn("alice")
+    new_game = GameSession("fresh", ["erin", "frank"])
+    follower.leader_stub = MagicMock()
+    follower.leader_stub.SyncGames.return_value = pb.GameSyncResponse(
+        status="success",
+        games=[leader_copy.to_snapshot(), new_game.to_snapshot()],
+        removed_game_ids=["finished"]
+    )
+
+    follower.pull_games_from_leader()
+
+    request = follower.leader_stub.SyncGames.call_args[0][0]
+    assert dict(request.known_versions) == {"stale": 0, "finished": 0}
+    assert follower.active_games["stale"] is stale
+    assert stale.get_current_player() == "bob"
+    assert stale.hands == leader_copy.hands
+    assert follower.active_games["fresh"].hands == new_game.hands
+    assert "finished" not in follower.active_games
+
+def test_install_snapshot_replaces_follower_state(grpc_server):
+    with patch.object(CardGameService, "monitor_heartbeat"):
+        follower = CardGameService(port=60052, is_leader=False, leader_address="127.0.0.1:60051")
+    follower.active_games = {"old": GameSession("old", ["carol", "dave"])}
+    follower.pending_entries = {3: pb.Command(), 50: pb.Command()}
+
+    leader_game = GameSession("snapgame", ["alice", "bob"])
+    leader_game.pass_turn("alice")
+    chunks = [pb.SnapshotChunk(last_included_index=41, games=[leader_game.to_snapshot()])]
+    chunks += [pb.SnapshotChunk(data=data, sha256=sha256) for data, sha256 in grpc_server.storage.snapshot_chunks()]
+
+    resp = follower.InstallSnapshot(iter(chunks), None)
+
+    assert resp.status == "success"
+    assert list(follower.active_games) == ["snapgame"]
+    assert follower.active_games["snapgame"].hands == leader_game.hands
+    assert follower.active_games["snapgame"].version == leader_game.version
+    assert follower.commit_index == follower.log.snapshot_index == 41
+    assert list(follower.pending_entries) == [50]
+    assert follower.storage.get_win_rate("alice") == grpc_server.storage.get_win_rate("alice")
+
+    resp = follower.AppendLog(pb.LogEntry(index=41, command=pb.Command()), None)
+    assert resp.message == "Already applied"
+    follower.storage.close()
+
+def test_snapshot_games_are_split_across_chunks(grpc_server, monkeypatch):
+    monkeypatch.setattr(server, "GAMES_PER_MESSAGE", 2)
+    games = {f"chunkgame{i}": GameSession(f"chunkgame{i}", ["alice", "bob"]) for i in range(5)}
+    finished = GameSession("chunkwon", ["alice", "bob"])
+    finished.winner = "alice"
+    monkeypatch.setattr(grpc_server, "active_games", dict(games, chunkwon=finished))
+    with patch.object(CardGameService, "monitor_heartbeat"):
+        follower = CardGameService(port=60052, is_leader=False, leader_address="127.0.0.1:60051")
+    sent = []
+
+    def install(chunks, timeout):
+        chunks = list(chunks)
+        sent.extend(chunks)
+        return follower.InstallSnapshot(iter(chunks), None)
+
+    replica_stub = MagicMock()
+    replica_stub.InstallSnapshot.side_effect = install
+    assert grpc_server.send_snapshot(replica_stub) == grpc_server.commit_index
+
+    assert [len(chunk.games) for chunk in sent if chunk.games] == [2, 2, 1]
+    assert all(not chunk.games for chunk in sent[3:])
+    # a finished game is left out of the snapshot
+    assert sorted(follower.active_games) == sorted(games)
+    assert len(follower.log.snapshot_games) == 5
+    close_node(follower)
+
+def test_append_log_reports_gap_that_never_fills(grpc_server, monkeypatch):
+    monkeypatch.setattr(server, "ENTRY_GAP_TIMEOUT", 0.05)
+    index = grpc_server.commit_index + 2
+    resp = grpc_server.AppendLog(pb.LogEntry(index=index, command=pb.Command()), None)
+    assert resp.status == "error"
+    grpc_server.pending_entries.pop(index)
+
+def test_follower_replays_log_after_restart(grpc_server):
+    with patch.object(CardGameService, "monitor_heartbeat"):
+        follower = CardGameService(port=60052, is_leader=False, leader_address="127.0.0.1:60051")
+    game = GameSession("replaygame", ["alice", "bob"])
+    base = follower.commit_index + 1
+    follower.AppendLog(pb.LogEntry(index=base, command=pb.Command(start_game=game.to_snapshot()), first_entry=True), None)
+    follower.AppendLog(pb.LogEntry(index=base + 1, command=pb.Command(
+        pass_turn=pb.GameActionRequest(username="alice", game_id="replaygame")), commit=decided(base + 1)), None)
+    follower.storage.close()
+    follower.log.close()
+
+    with patch.object(CardGameService, "monitor_heartbeat"):
+        restarted = CardGameService(port=60052, is_leader=False, leader_address="127.0.0.1:60051")
+    session = restarted.active_games["replaygame"]
+    assert session.hands == game.hands
+    assert session.get_current_player() == "bob"
+    assert restarted.commit_index == base + 1
+    restarted.storage.close()
+    restarted.log.close()
+
+def test_follower_never_applies_an_aborted_entry(grpc_server):
+    with patch.object(CardGameService, "monitor_heartbeat"):
+        follower = CardGameService(port=60052, is_leader=False, leader_address="127.0.0.1:60051")
+    base = follower.commit_index + 1
+    phantom = pb.Command(start_game=GameSession("phantom", ["alice", "bob"]).to_snapshot())
+    real = pb.Command(start_game=GameSession("real", ["alice", "bob"]).to_snapshot())
+    late = pb.Command(start_game=GameSession("late", ["alice", "bob"]).to_snapshot())
+
+    follower.AppendLog(pb.LogEntry(index=base, command=phantom, first_entry=True), None)
+    assert "phantom" not in follower.active_games
+    # the leader failed to replicate `phantom`, and `late` before we even received it
+    follower.AppendLog(pb.LogEntry(index=base + 1, command=real, commit=decided(base + 1, aborted=[base, base + 2])), None)
+    follower.AppendLog(pb.LogEntry(index=base + 2, command=late, commit=decided(base + 2, aborted=[base, base + 2])), None)
+    assert "real" in follower.active_games
+    assert "phantom" not in follower.active_games and "late" not in follower.active_games
+    close_node(follower)
+
+    with patch.object(CardGameService, "monitor_heartbeat"):
+        restarted = CardGameService(port=60052, is_leader=False, leader_address="127.0.0.1:60051")
+    assert "real" in restarted.active_games
+    assert "phantom" not in restarted.active_games and "late" not in restarted.active_games
+    assert restarted.commit_index == base + 2
+    close_node(restarted)
+
+def test_follower_keeps_undecided_entries_across_restart(grpc_server):
+    with patch.object(CardGameService, "monitor_heartbeat"):
+        follower = CardGameService(port=60052, is_leader=False, leader_address="127.0.0.1:60051")
+    base = follower.commit_index + 1
+    pending = pb.Command(start_game=GameSession("pending", ["alice", "bob"]).to_snapshot())
+    follower.AppendLog(pb.LogEntry(index=base, command=pending, first_entry=True), None)
+    close_node(follower)
+
+    with patch.object(CardGameService, "monitor_heartbeat"):
+        restarted = CardGameService(port=60052, is_leader=False, leader_address="127.0.0.1:60051")
+    assert "pending" not in restarted.active_games
+    assert restarted.commit_index == base - 1
+    with restarted.applied:
+        restarted.follow_commit(decided(base))
+    assert "pending" in restarted.active_games
+    close_node(restarted)
+
+def test_follower_asks_for_snapshot_when_leader_forgot_its_aborts(grpc_server):
+    with patch.object(CardGameService, "monitor_heartbeat"):
+        follower = CardGameService(port=60052, is_leader=False, leader_address="127.0.0.1:60051")
+    base = follower.commit_index + 1
+    follower.AppendLog(pb.LogEntry(index=base, command=pb.Command(), first_entry=True), None)
+    commit = pb.Commit(index=base + 1, aborted_since=base + 1)
+    resp = follower.AppendLog(pb.LogEntry(index=base + 1, command=pb.Command(), commit=commit), None)
+    assert resp.status == "success"
+    assert resp.message == server.SNAPSHOT_REQUESTED
+    assert follower.commit_index == base - 1
+    close_node(follower)
+
+def make_read_follower():
+    with patch.object(CardGameService, "monitor_heartbeat"):
+        follower = CardGameService(port=60052, is_leader=False, leader_address="127.0.0.1:60051")
+    follower.active_games = {"readgame": GameSession("readgame", ["alice", "bob"])}
+    follower.leader_stub = MagicMock()
+    follower.leader_id = "127.0.0.1:60051"
+    return follower
+
+def close_node(node):
+    node.storage.close()
+    node.log.close()
+
+def test_follower_read_within_heartbeat_lease():
+    follower = make_read_follower()
+    follower.Heartbeat(pb.HeartbeatRequest(leader_address="127.0.0.1:60051", commit_index=follower.commit_index), None)
+
+    resp = follower.GetGameState(pb.GameStateRequest(game_id="readgame", username="alice", max_staleness_seconds=5), None)
+    assert resp.status == "success"
+    assert [p.username for p in resp.players] == ["alice", "bob"]
+    follower.leader_stub.ReadIndex.assert_not_called()
+    follower.leader_stub.GetGameState.assert_not_called()
+    close_node(follower)
+
+def test_follower_read_checks_leader_commit_index_when_lease_is_stale():
+    follower = make_read_follower()
+    follower.Heartbeat(pb.HeartbeatRequest(leader_address="127.0.0.1:60051", commit_index=follower.commit_index), None)
+    follower.leader_stub.ReadIndex.return_value = pb.ReadIndexResponse(status="success", commit_index=follower.commit_index)
+
+    # a bound of 0 always asks the leader how far it has committed
+    resp = follower.GetGameState(pb.GameStateRequest(game_id="readgame", username="alice"), None)
+    assert resp.status == "success"
+    follower.leader_stub.ReadIndex.assert_called_once()
+    follower.leader_stub.GetGameState.assert_not_called()
+    close_node(follower)
+
+def test_follower_forwards_read_it_cannot_catch_up_for(monkeypatch):
+    monkeypatch.setattr(server, "READ_INDEX_TIMEOUT", 0.05)
+    follower = make_read_follower()
+    follower.leader_stub.ReadIndex.return_value = pb.ReadIndexResponse(status="success", commit_index=follower.commit_index + 5)
+    follower.leader_stub.GetGameState.return_value = pb.GameStateResponse(status="success", message="from leader")
+
+    resp = follower.GetGameState(pb.GameStateRequest(game_id="readgame", username="alice", max_staleness_seconds=5), None)
+    assert resp.message == "from leader"
+    close_node(follower)
+
+def test_follower_ignores_heartbeats_from_other_leaders():
+    follower = make_read_follower()
+    follower.Heartbeat(pb.HeartbeatRequest(leader_address="127.0.0.1:60099", commit_index=follower.commit_index), None)
+    assert follower.read_lease[1] == 0
+    follower.Heartbeat(pb.HeartbeatRequest(leader_address="127.0.0.1:60051", commit_index=follower.commit_index), None)
+    assert follower.read_lease[1] > 0
+    close_node(follower)
+
+@pytest.fixture
+def real_follower(grpc_server, monkeypatch):
+    # the follower names the leader "localhost", the leader advertises its own IP
+    monkeypatch.setattr(grpc_server, "replica_addresses", [])
+    monkeypatch.setattr(grpc_server, "replicas", [])
+    remove_log_files(60053)
+    with patch.object(CardGameService, "monitor_heartbeat"):
+        follower = CardGameService(port=60053, is_leader=False, leader_address=f"localhost:{TEST_PORT}")
+    follower_server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    stub.add_CardGameServiceServicer_to_server(follower, follower_server)
+    follower_server.add_insecure_port("0.0.0.0:60053")
+    follower_server.start()
+    yield follower
+    # remove_replica would also close the channels of the replicas we hid above
+    grpc_server.replicators.pop(f"{follower.ip}:60053").stop()
+    grpc_server.detectors.pop(f"{follower.ip}:60053", None)
+    follower_server.stop(0)
+    close_node(follower)
+    remove_log_files(60053)
+    if os.path.exists("cardgame-60053.db"):
+        os.remove("cardgame-60053.db")
+
+def test_real_follower_renews_its_lease_from_leader_heartbeats(grpc_server, real_follower):
+    assert real_follower.leader_id == f"{grpc_server.ip}:{TEST_PORT}"
+    assert real_follower.read_lease[1] == 0
+    grpc_server.send_heartbeats()
+    assert real_follower.read_lease[1] > 0
+    assert real_follower.read_lease[0] == grpc_server.commit_index
+
+def test_gui_reads_from_a_real_follower_until_the_next_heartbeat(grpc_server, real_follower, monkeypatch):
+    # a write brings the new follower up to the leader's commit index
+    grpc_server.replicate_and_apply(pb.Command(pass_turn=pb.GameActionRequest(username="ghost", game_id="nonexistent")))
+    deadline = time.time() + 5
+    while real_follower.commit_index < grpc_server.commit_index and time.time() < deadline:
+        time.sleep(0.05)
+    grpc_server.send_heartbeats()
+    index, reported_at = real_follower.read_lease
+    # the read comes just before the next heartbeat round reaches the follower
+    real_follower.read_lease = (index, reported_at - server.HEARTBEAT_INTERVAL - server.HEARTBEAT_TIMEOUT)
+    real_follower.active_games["readgame"] = GameSession("readgame", ["alice", "bob"])
+    monkeypatch.setattr(real_follower, "leader_stub", MagicMock())
+
+    request = pb.GameStateRequest(game_id="readgame", username="alice", max_staleness_seconds=gui.MAX_READ_STALENESS)
+    assert real_follower.GetGameState(request, None).status == "success"
+    real_follower.leader_stub.ReadIndex.assert_not_called()
+    real_follower.leader_stub.GetGameState.assert_not_called()
+
+def test_follower_stream_ends_when_too_far_behind(monkeypatch):
+    monkeypatch.setattr(server, "READ_INDEX_TIMEOUT", 0.05)
+    follower = make_read_follower()
+    follower.Heartbeat(pb.HeartbeatRequest(leader_address="127.0.0.1:60051", commit_index=follower.commit_index), None)
+    follower.leader_stub.ReadIndex.return_value = pb.ReadIndexResponse(status="success", commit_index=follower.commit_index + 5)
+    context = MagicMock()
+    context.is_active.return_value = True
+    request = pb.GameStateRequest(game_id="readgame", username="alice", max_staleness_seconds=5)
+
+    stream = follower.SubscribeGameState(request, context)
+    assert next(stream).status == "success"
+    follower.read_lease = (follower.commit_index, 0)  # the lease runs out
+    assert next(stream).message == server.STALE_REPLICA_MESSAGE
+    assert next(stream, None) is None
+    close_node(follower)
+
+def test_read_index_only_on_leader(grpc_server):
+    resp = grpc_server.ReadIndex(Empty(), None)
+    assert resp.status == "success"
+    assert resp.commit_index == grpc_server.commit_index
+
+    follower = make_read_follower()
+    assert follower.ReadIndex(Empty(), None).status == "error"
+    close_node(follower)
+
+def test_stream_database(grpc_server, stub_client):
+    chunks = list(stub_client.StreamDatabase(Empty()))
+    assert all(c.status == "success" for c in chunks)
+    assert chunks[-1].sha256
+    assert b"".join(c.data for c in chunks).startswith(b"SQLite format 3")
+
 def test_delete_account(grpc_server, stub_client):
     stub_client.Login(pb.LoginRequest(username="user_del", password="pwd"))
     resp = stub_client.DeleteAccount(pb.DeleteAccountRequest(username="user_del", password="pwd"))
@@ -205,29 +790,39 @@ def test_announce_leader(grpc_server):
 def test_apply_command_play_card(grpc_server):
     session = GameSession("testgame", ["alice", "bob"])
     grpc_server.active_games["testgame"] = session
-    session.hands["alice"] = [3]
+    session.hands[0] = Hand([3])  # alice
     session.current_turn_index = 0
 
-    command = {
-        "type": "play_card",
-        "username": "alice",
-        "game_id": "testgame",
-        "cards": [3]
-    }
+    command = pb.Command(play_card=pb.PlayCardRequest(
+        username="alice",
+        game_id="testgame",
+        cards=[3]
+    ))
     success, msg = grpc_server.apply_command(command)
     assert success
     assert "won the game" in msg or "successfully" in msg
 
 
+def test_apply_command_records_winner_once(grpc_server):
+    session = GameSession("wingame", ["alice", "bob"])
+    grpc_server.active_games["wingame"] = session
+    session.hands[0] = Hand([3])  # alice
+
+    with patch.object(grpc_server.storage, "finish_game") as finish_game:
+        grpc_server.apply_command(pb.Command(play_card=pb.PlayCardRequest(username="alice", game_id="wingame", cards=[3])))
+        grpc_server.apply_command(pb.Command(quit_game=pb.GameActionRequest(username="bob", game_id="wingame")))
+
+    finish_game.assert_called_once_with("wingame", "alice")
+
+
 def test_apply_command_pass_turn(grpc_server):
     session = GameSession("testgame2", ["alice", "bob"])
     grpc_server.active_games["testgame2"] = session
 
-    command = {
-        "type": "pass_turn",
-        "username": "alice",
-        "game_id": "testgame2"
-    }
+    command = pb.Command(pass_turn=pb.GameActionRequest(
+        username="alice",
+        game_id="testgame2"
+    ))
     success, msg = grpc_server.apply_command(command)
     assert success
     assert "passed" in msg or "starts a new round" in msg
@@ -237,11 +832,10 @@ def test_apply_command_quit_game(grpc_server):
     session = GameSession("testgame3", ["alice", "bob"])
     grpc_server.active_games["testgame3"] = session
 
-    command = {
-        "type": "quit_game",
-        "username": "bob",
-        "game_id": "testgame3"
-    }
+    command = pb.Command(quit_game=pb.GameActionRequest(
+        username="bob",
+        game_id="testgame3"
+    ))
     success, msg = grpc_server.apply_command(command)
     assert success
     assert "quit" in msg
@@ -251,26 +845,63 @@ def test_apply_command_unknown_type(grpc_server):
     session = GameSession("testgame4", ["alice", "bob"])
     grpc_server.active_games["testgame4"] = session
 
-    command = {
-        "type": "invalid_type",
-        "username": "alice",
-        "game_id": "testgame4"
-    }
+    # a Command with no operation set
+    command = pb.Command()
     success, msg = grpc_server.apply_command(command)
     assert not success
     assert msg == "Unknown command"
 
 
 def test_apply_command_game_not_found(grpc_server):
-    command = {
-        "type": "pass_turn",
-        "username": "ghost",
-        "game_id": "nonexistent"
-    }
+    command = pb.Command(pass_turn=pb.GameActionRequest(
+        username="ghost",
+        game_id="nonexistent"
+    ))
     success, msg = grpc_server.apply_command(command)
     assert not success
     assert msg == "Game not found"
 
+def test_game_state_is_cached_until_the_session_changes(grpc_server):
+    session = GameSession("cachedgame", ["alice", "bob"])
+
+    first = grpc_server._build_game_state(session, "alice")
+    assert grpc_server._build_game_state(session, "alice") is first
+    assert grpc_server._build_game_state(session, "bob") is not first
+
+    session.turn_start_time -= 5
+    assert grpc_server._build_game_state(session, "alice").countdown_seconds == session.get_countdown()
+
+    session.pass_turn(session.get_current_player())
+    moved = grpc_server._build_game_state(session, "alice")
+    assert moved is not first
+    assert moved.current_turn == session.get_current_player()
+
+    grpc_server.storage.stats_version += 1  # e.g. alice finished another game
+    assert grpc_server._build_game_state(session, "alice") is not moved
+
+def test_on_turn_timeout_auto_passes_expired_turn(grpc_server):
+    grpc_server.is_leader = True
+    session = GameSession("slowgame", ["alice", "bob"])
+    grpc_server.active_games["slowgame"] = session
+    session.turn_start_time = time.time() - 25
+
+    grpc_server.on_turn_timeout("slowgame")
+
+    assert session.get_current_player() == "bob"
+    assert session.turn_deadline() > time.time()
+    assert grpc_server.turn_timer.pending.get("slowgame") is not None
+
+def test_on_turn_timeout_reschedules_when_turn_moved_on(grpc_server):
+    grpc_server.is_leader = True
+    session = GameSession("busygame", ["alice", "bob"])
+    grpc_server.active_games["busygame"] = session
+
+    grpc_server.on_turn_timeout("busygame")
+
+    assert session.get_current_player() == "alice"
+    assert session.version == 0
+    assert grpc_server.turn_timer.pending.get("busygame") is not None
+
 def test_initiate_election_wins(grpc_server):
     grpc_server.replica_addresses = ["127.0.0.1:9999", "127.0.0.1:8888"]
 
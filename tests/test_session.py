@@ -3,12 +3,13 @@ import sys
 import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from session import GameSession, get_pattern_type
+import card_game_pb2 as pb
+from session import PATTERNS, GameSession, Hand, _classify, get_pattern_type
 
 def test_game_initialization():
     session = GameSession("game1", ["alice", "bob"])
     assert set(session.players) == {"alice", "bob"}
-    assert sum(len(cards) for cards in session.hands.values()) == 40
+    assert sum(len(cards) for cards in session.hands) == 40
     assert session.get_current_player() in session.players
 
 def test_get_current_player_rotates():
@@ -22,7 +23,7 @@ def test_get_current_player_rotates():
 def test_valid_card_play():
     session = GameSession("game3", ["alice", "bob"])
     player = session.get_current_player()
-    cards = session.hands[player][:1]
+    cards = list(session.hand(player))[:1]
     success, msg = session.play_cards(player, cards)
     assert success
     assert msg == "Cards played successfully" or "Player won the game!" in msg
@@ -58,7 +59,7 @@ def test_quit_game_and_win_by_default():
 def test_winning_condition():
     session = GameSession("game8", ["alice", "bob"])
     player = session.get_current_player()
-    session.hands[player] = [3] 
+    session.hands[session.current_turn_index] = Hand([3])
     success, msg = session.play_cards(player, [3])
     assert success
     assert session.winner == player
@@ -70,13 +71,28 @@ def test_get_pattern_type_invalid():
     assert get_pattern_type([2, 2, 3]) == ("invalid", None)   
     assert get_pattern_type([4, 4, 4, 5]) == ("triple_plus_one", 4)
 
+def test_pattern_table_covers_every_play_of_up_to_four_cards():
+    assert len(PATTERNS) == 10 + 55 + 220 + 715
+    assert get_pattern_type([7, 4, 7, 7]) == ("triple_plus_one", 7)
+    assert get_pattern_type([4, 7, 7, 7]) == _classify([7, 7, 7, 4])
+    assert get_pattern_type([2, 2, 2, 2, 2]) == ("invalid", None)
+    assert get_pattern_type([11]) == ("invalid", None)
+
+def test_last_played_pattern_is_cached():
+    session = GameSession("game17", ["alice", "bob"])
+    assert session.last_pattern == ("invalid", None)
+    session.last_played = [6, 6]
+    assert session.last_pattern == ("pair", 6)
+    restored = GameSession.from_snapshot(session.to_snapshot())
+    assert restored.last_pattern == ("pair", 6)
+
 def test_bomb_beats_non_bomb():
     session = GameSession("game9", ["alice", "bob"])
     player = session.get_current_player()
     session.last_played = [2] 
     session.last_played_player = "bob" 
 
-    session.hands[player] = [9, 9, 9, 9]
+    session.hands[session.current_turn_index] = Hand([9, 9, 9, 9])
     success, msg = session.play_cards(player, [9, 9, 9, 9])
     assert success
 
@@ -85,13 +101,80 @@ def test_same_pattern_higher_rank():
     player = session.get_current_player()
     session.last_played = [3, 3]
     session.last_played_player = "bob"
-    session.hands[player] = [5, 5]
+    session.hands[session.current_turn_index] = Hand([5, 5])
     success, _ = session.play_cards(player, [5, 5])
     assert success
 
+def test_play_needs_every_copy_of_a_rank():
+    session = GameSession("game15", ["alice", "bob"])
+    player = session.get_current_player()
+    session.hands[session.current_turn_index] = Hand([5, 7])
+    success, msg = session.play_cards(player, [5, 5])
+    assert not success
+    assert msg == "You don't have those cards."
+    assert list(session.hand(player)) == [5, 7]
+
+def test_hand_counts_and_bytes():
+    hand = Hand([4, 1, 4, 10])
+    assert list(hand) == [1, 4, 4, 10]
+    assert len(hand) == 4
+    assert hand.has([4, 4]) and not hand.has([4, 4, 4]) and not hand.has([0])
+    hand.remove([4, 10])
+    assert list(hand) == [1, 4] and len(hand) == 2
+    assert len(hand.to_bytes()) == 10
+    assert Hand.from_bytes(hand.to_bytes()) == hand
+
+def test_countdown_follows_turn_start():
+    session = GameSession("game11", ["alice", "bob"])
+    assert session.get_countdown() in (19, 20)
+    session.turn_start_time -= 30
+    assert session.get_countdown() == 0
+    assert session.get_game_state()["countdown_seconds"] == 0
+
 def test_serialize_deserialize_roundtrip():
     session = GameSession("game12", ["alice", "bob"])
     data = session.serialize()
     new_session = GameSession.deserialize(data)
     assert new_session.players == session.players
     assert new_session.hands == session.hands
+
+def test_snapshot_roundtrip():
+    session = GameSession("game13", ["alice", "bob"])
+    player = session.get_current_player()
+    session.play_cards(player, list(session.hand(player))[:1])
+    new_session = GameSession.from_snapshot(session.to_snapshot())
+    assert new_session.players == session.players
+    assert new_session.hands == session.hands
+    assert new_session.last_played == session.last_played
+    assert new_session.last_played_player == player
+    assert new_session.winner is None
+    assert new_session.version == session.version
+
+def test_snapshot_with_card_lists_still_loads():
+    snapshot = pb.GameSnapshot(game_id="game16", players=["alice", "bob"],
+                               hands=[pb.Hand(cards=[2, 2, 7]), pb.Hand(cards=[])])
+    session = GameSession.from_snapshot(snapshot)
+    assert list(session.hand("alice")) == [2, 2, 7]
+    assert len(session.hand("bob")) == 0
+
+def test_session_state_is_kept_as_indices():
+    session = GameSession("game18", ["alice", "bob", "carol"])
+    assert not hasattr(session, "__dict__")
+    session.quit_game("bob")
+    assert session.quit_mask == 0b010
+    assert session.quit_players == {"bob"}
+    session.quit_game("carol")
+    assert session.winner_index == 0 and session.winner == "alice"
+    restored = GameSession.from_snapshot(session.to_snapshot())
+    assert restored.quit_mask == 0b110 and restored.winner == "alice"
+
+def test_listeners_called_on_change():
+    session = GameSession("game14", ["alice", "bob"])
+    calls = []
+    listener = lambda: calls.append(session.version)
+    session.add_listener(listener)
+    session.pass_turn(session.get_current_player())
+    session.apply_snapshot(session.to_snapshot())
+    session.remove_listener(listener)
+    session.pass_turn(session.get_current_player())
+    assert calls == [1, 1]
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from session import PATTERNS
+from simulator import Simulator
+
+
+@pytest.mark.parametrize("bot", ["heuristic", "random"])
+def test_bots_only_make_moves_the_engine_accepts(bot):
+    simulator = Simulator(100, players=3, bot=bot, seed=7)
+    result = simulator.run(steps=200)
+    assert result["turns"] == 100 * 200
+    assert result["games"] > 0
+    assert result["rejected"] == 0
+    assert all(session.winner is None for session in simulator.sessions)
+
+
+@pytest.mark.parametrize("bot", ["heuristic", "random"])
+def test_planned_moves_match_the_rules(bot):
+    simulator = Simulator(100, players=4, bot=bot, seed=3)
+    for _ in range(15):
+        for session, cards in zip(simulator.sessions, simulator.plan(simulator.sessions)):
+            player = session.get_current_player()
+            hand = session.hand(player)
+            if cards:
+                assert hand.has(cards) and session.is_valid_play(cards, player)
+            else:
+                # a bot passes only when nothing in its hand beats the table
+                assert not any(hand.has(play) and session.is_valid_play(list(play), player) for play in PATTERNS)
+        simulator.step()
+
+
+def test_unknown_bot():
+    with pytest.raises(ValueError):
+        Simulator(1, bot="perfect")
@@ -2,6 +2,7 @@ import os
 import pytest
 import sys
 import sqlite3
+from unittest import mock
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from storage import Storage
@@ -14,6 +15,7 @@ def storage():
         os.remove(TEST_DB)
     s = Storage(TEST_DB)
     yield s
+    s.close()
     if os.path.exists(TEST_DB):
         os.remove(TEST_DB)
 
@@ -57,3 +59,94 @@ def test_declare_winner(storage):
     stats = storage.execute_query("SELECT num_win, num_lost FROM users WHERE username='winner'").fetchone()
     assert stats["num_win"] == 1
     assert stats["num_lost"] == 0
+
+def test_win_rate_is_cached(storage):
+    storage.login_register_user("frank", "pw")
+    assert storage.get_win_rate("frank") == 0.0
+    with mock.patch.object(storage, "execute_query", side_effect=AssertionError("no SQL on cached lookup")):
+        assert storage.get_win_rate("frank") == 0.0
+
+def test_win_rate_cache_follows_results(storage):
+    for user in ("grace", "heidi"):
+        storage.login_register_user(user, "pw")
+        assert storage.get_win_rate(user) == 0.0
+    storage.create_game("gameY")
+    storage.add_player_to_game("gameY", "grace", [1])
+    storage.add_player_to_game("gameY", "heidi", [2])
+
+    storage.declare_winner("gameY", "grace")
+    assert storage.get_win_rate("grace") == 1.0
+    assert storage.get_win_rate("heidi") == 0.0
+
+    storage.quit_game("gameY", "grace")
+    assert storage.get_win_rate("grace") == 0.5
+
+def test_wal_mode(storage):
+    mode = storage.execute_query("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+def test_transaction_commits_once(storage):
+    conn = storage.get_connection()
+    with mock.patch.object(storage, "get_connection", return_value=mock.Mock(wraps=conn)) as get_conn:
+        with storage.transaction():
+            storage.create_game("gameZ")
+            storage.add_player_to_game("gameZ", "ivan", [1, 2])
+            storage.add_player_to_game("gameZ", "judy", [3])
+        assert get_conn.return_value.commit.call_count == 1
+
+    other = sqlite3.connect(TEST_DB)
+    assert other.execute("SELECT COUNT(*) FROM game_players WHERE game_id='gameZ'").fetchone()[0] == 2
+    other.close()
+
+def test_transaction_rolls_back_on_error(storage):
+    with pytest.raises(RuntimeError):
+        with storage.transaction():
+            storage.create_game("gameR")
+            raise RuntimeError("boom")
+    assert storage.execute_query("SELECT * FROM games WHERE game_id='gameR'").fetchone() is None
+
+def test_snapshot_roundtrip(storage):
+    storage.login_register_user("kate", "pw")
+    storage.create_game("gameS")
+    chunks = list(storage.snapshot_chunks(chunk_size=1024))
+    assert all(len(data) <= 1024 for data, _ in chunks)
+    assert [sha for _, sha in chunks[:-1]] == [""] * (len(chunks) - 1)
+    assert chunks[-1][1]
+
+    replica = Storage("test_replica.db")
+    try:
+        assert replica.get_win_rate("kate") == 0.0
+        assert replica.restore_snapshot(iter(chunks))["status"] == "success"
+        assert replica.execute_query("SELECT username FROM users").fetchone()["username"] == "kate"
+        assert replica.execute_query("SELECT game_id FROM games").fetchone()["game_id"] == "gameS"
+        assert replica.win_stats == {}
+        assert replica.execute_query("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        replica.close()
+        os.remove("test_replica.db")
+
+def test_snapshot_checksum_mismatch_keeps_database(storage):
+    storage.login_register_user("leo", "pw")
+    chunks = list(storage.snapshot_chunks())
+    chunks[-1] = (b"", "0" * 64)
+
+    res = storage.restore_snapshot(iter(chunks))
+    assert res["status"] == "error"
+    assert storage.execute_query("SELECT username FROM users").fetchone()["username"] == "leo"
+    assert not [f for f in os.listdir(".") if f.endswith(".part")]
+
+def test_snapshot_stream_ended_early(storage):
+    chunks = list(storage.snapshot_chunks())[:-1]
+    assert storage.restore_snapshot(iter(chunks))["status"] == "error"
+
+def test_restore_drops_cached_win_rates(storage):
+    storage.login_register_user("mia", "pw")
+    dump = b"".join(data for data, _ in storage.snapshot_chunks())
+    storage.execute_query("UPDATE users SET num_win = 1 WHERE username = 'mia'", commit=True)
+    assert storage.get_win_rate("mia") == 1.0
+    version = storage.stats_version
+
+    storage.restore(dump)
+    assert storage.win_stats == {}
+    assert storage.stats_version == version + 1
+    assert storage.get_win_rate("mia") == 0.0